@@ -0,0 +1,86 @@
+"""Allocation benchmark for per-message body buffering and response building.
+
+Compares the old per-stream handling (``bytearray.extend`` per chunk, then a
+``bytes`` copy, and a fresh ``ProcessingResponse`` per message) with
+``ChunkBuffer`` and the prebuilt responses in ``server.py``.
+
+Run from the repository root with the generated protos on the path:
+
+    PYTHONPATH=src python benchmarks/bench_body_buffering.py
+"""
+
+# Standard
+import argparse
+import time
+import tracemalloc
+
+# Third-Party
+from envoy.service.ext_proc.v3 import external_processor_pb2 as ep
+
+# Local
+from chunks import ChunkBuffer
+
+
+def bytearray_buffering(chunks):
+    buf = bytearray()
+    for chunk in chunks:
+        buf.extend(chunk)
+    return bytes(buf)
+
+
+def chunk_buffering(chunks):
+    buf = ChunkBuffer()
+    for chunk in chunks:
+        buf.append(chunk)
+    return buf.join()
+
+
+def fresh_responses(count):
+    for _ in range(count):
+        ep.ProcessingResponse(response_body=ep.BodyResponse(response=ep.CommonResponse()))
+
+
+EMPTY = ep.ProcessingResponse(response_body=ep.BodyResponse(response=ep.CommonResponse()))
+
+
+def prebuilt_responses(count):
+    for _ in range(count):
+        _ = EMPTY
+
+
+def measure(fn, *args, repeat):
+    """Return (seconds per call, peak traced bytes of one call)."""
+    tracemalloc.start()
+    fn(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(*args)
+    return (time.perf_counter() - start) / repeat, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunk-size", type=int, default=16 * 1024)
+    parser.add_argument("--chunks", type=int, default=64)
+    parser.add_argument("--messages", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    chunks = [bytes(args.chunk_size) for _ in range(args.chunks)]
+    body_size = args.chunk_size * args.chunks
+    print(f"Body of {args.chunks} x {args.chunk_size} B chunks ({body_size} B)")
+    for name, fn in (("bytearray.extend", bytearray_buffering), ("ChunkBuffer", chunk_buffering)):
+        seconds, peak = measure(fn, chunks, repeat=args.repeat)
+        print(f"  {name:<18} {seconds * 1e6:9.1f} us  peak {peak / body_size:5.2f} x body")
+
+    print(f"{args.messages} empty body responses")
+    for name, fn in (("fresh", fresh_responses), ("prebuilt", prebuilt_responses)):
+        seconds, peak = measure(fn, args.messages, repeat=args.repeat // 10 or 1)
+        print(f"  {name:<18} {seconds * 1e3:9.2f} ms  peak {peak} B")
+
+
+if __name__ == "__main__":
+    main()
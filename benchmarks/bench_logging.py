@@ -0,0 +1,114 @@
+"""Throughput of the request-path log messages at each log level.
+
+Logs the ProcessingResponse of a modified tool result (a body mutation of
+``--body-size`` bytes), the message the adapter used to log on every
+request, in the styles the adapter has used:
+
+- ``f-string``: ``logger.info(f"... {response}")``, formatted even when the
+  level is disabled.
+- ``lazy``: ``logger.debug("... %s", response)``, formatted only when logged.
+- ``payload``: lazy, on the ``payload`` category with the ``PayloadFilter``
+  of ``--sample-rate`` and ``--max-chars``.
+
+Each style is written by a ``StreamHandler`` on the logging thread
+(``inline``) and through the ``DroppingQueueHandler`` of ``configure_logging``
+(``queue``); the thread writing the queued records competes for the GIL, so
+the queue does not come for free. Output goes to ``/dev/null``.
+
+Run from the repository root:
+
+    PYTHONPATH=src python benchmarks/bench_logging.py
+"""
+
+# Standard
+import argparse
+import logging
+import os
+import time
+
+# Third-Party
+from envoy.service.ext_proc.v3 import external_processor_pb2 as ep
+
+# Local
+from log_setup import LOG_FORMAT, category_logger, configure_logging
+
+LEVELS = ("WARNING", "INFO", "DEBUG")
+
+
+def response(body_size):
+    mutation = ep.BodyMutation(body=b"x" * body_size)
+    return ep.ProcessingResponse(response_body=ep.BodyResponse(response=ep.CommonResponse(body_mutation=mutation)))
+
+
+def styles(logger, payload_logger):
+    def f_string(message):
+        logger.info(f"****Tool Post Invoke Return body: {message}****")
+
+    def lazy(message):
+        logger.debug("Tool post-invoke response: %s", message)
+
+    def payload(message):
+        payload_logger.debug("Tool post-invoke response: %s", message)
+
+    return {"f-string": f_string, "lazy": lazy, "payload": payload}
+
+
+def configure(output, handling, level, sample_rate, max_chars):
+    """Send all records to ``output``, inline or from a queue; returns the queue's listener, if any."""
+    root = logging.getLogger()
+    root.handlers.clear()
+    logging.getLogger("bench").setLevel(level)
+    category_logger("payload").setLevel(level)
+    listener = configure_logging(
+        payload_sample_rate=sample_rate, payload_max_chars=max_chars, queue_size=100_000 if handling == "queue" else 0
+    )
+    handler = logging.StreamHandler(output)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    if listener is None:
+        root.addHandler(handler)
+    else:
+        listener.handlers = (handler,)
+    return listener
+
+
+def measure(log, message, seconds):
+    """Messages logged per second, for about ``seconds``."""
+    count, start = 0, time.perf_counter()
+    while (elapsed := time.perf_counter() - start) < seconds:
+        for _ in range(100):
+            log(message)
+        count += 100
+    return count / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--body-size", type=int, default=4096)
+    parser.add_argument("--sample-rate", type=float, default=0.01)
+    parser.add_argument("--max-chars", type=int, default=1024)
+    parser.add_argument("--seconds", type=float, default=1.0)
+    args = parser.parse_args()
+
+    message = response(args.body_size)
+    logger = logging.getLogger("bench")
+    # Let the payload category follow the level under test
+    logging.getLogger("ext-proc-PM").setLevel(logging.NOTSET)
+    print(f"ProcessingResponse with a {args.body_size} B body; messages/s")
+    print(f"  {'level':<8} {'handler':<8} " + " ".join(f"{name:>12}" for name in styles(logger, logger)))
+    with open(os.devnull, "w") as output:
+        for level in LEVELS:
+            for handling in ("inline", "queue"):
+                listener = configure(output, handling, level, args.sample_rate, args.max_chars)
+                try:
+                    rates = [
+                        measure(log, message, args.seconds)
+                        for log in styles(logger, category_logger("payload")).values()
+                    ]
+                finally:
+                    if listener is not None:
+                        listener.stop()
+                print(f"  {level:<8} {handling:<8} " + " ".join(f"{rate:12,.0f}" for rate in rates))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""Throughput and event-loop lag of the plugin executors.
+
+Runs two guardrails through ``AdapterExecutor`` with each plugin executor
+(``inline``, ``thread``, ``process`` and, on Python 3.14+ or on 3.13 with the
+``interpreters-pep-734`` backport, ``subinterpreter``):
+
+- ``nemocheck``: blocks on an HTTP call to a local stub of the guardrails
+  server, like the NemoCheck example plugin.
+- ``pii``: regex scan of the tool arguments, like the ``detect_pii`` action
+  of the NeMo PII example.
+
+Lag is how late a 1 ms timer on the event loop fires while hooks run; it is
+what every other stream served by the adapter waits.
+
+Run from the repository root:
+
+    PYTHONPATH=src:benchmarks python benchmarks/bench_plugin_executors.py
+"""
+
+# Standard
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Third-Party
+from cpex.framework import Plugin, PluginConfig, PluginContext, ToolPreInvokePayload, ToolPreInvokeResult
+from cpex.framework.base import HookRef, PluginRef
+from cpex.framework.models import GlobalContext, PluginViolation
+
+# Local
+from executor import AdapterExecutor
+from offload import ThreadOffload
+from process_pool import ProcessOffload
+from subinterpreters import InterpreterOffload, interpreters_supported
+
+EMAIL_RE = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
+SSN_RE = re.compile(r"\b\d{3}-\d{2}-\d{4}\b")
+
+
+class NemoCheckLike(Plugin):
+    """Posts the tool call to ``CHECK_ENDPOINT`` with a blocking client."""
+
+    async def tool_pre_invoke(self, payload: ToolPreInvokePayload, context: PluginContext) -> ToolPreInvokeResult:
+        request = urllib.request.Request(
+            os.environ["CHECK_ENDPOINT"],
+            data=json.dumps({"tool": payload.name, "args": payload.args}).encode(),
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(request) as response:
+            allowed = json.load(response)["status"] == "success"
+        return ToolPreInvokeResult(continue_processing=allowed)
+
+
+class PiiDetect(Plugin):
+    """Blocks tool calls whose arguments contain an email address or an SSN."""
+
+    async def tool_pre_invoke(self, payload: ToolPreInvokePayload, context: PluginContext) -> ToolPreInvokeResult:
+        text = str(payload.args)
+        findings = [name for name, pattern in (("email", EMAIL_RE), ("ssn", SSN_RE)) if pattern.search(text)]
+        if not findings:
+            return ToolPreInvokeResult()
+        violation = PluginViolation(reason="PII", description=", ".join(findings), code="PII")
+        return ToolPreInvokeResult(continue_processing=False, violation=violation)
+
+
+def stub_guardrails(delay):
+    """Start a local guardrails stub answering after ``delay`` seconds; return its URL."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            time.sleep(delay)
+            body = b'{"status": "success"}'
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}/v1/guardrail/checks"
+
+
+async def start_offload(executor, config, workers):
+    if executor == "thread":
+        return ThreadOffload(max_workers=workers, max_queue=1024)
+    if executor == "process":
+        offload = ProcessOffload(config, workers=workers)
+    else:
+        offload = InterpreterOffload(config, interpreters=workers)
+    await offload.start()
+    return offload
+
+
+async def measure(hook_ref, offload, payload, calls, concurrency):
+    """Return (calls per second, worst loop lag in seconds)."""
+    executor = AdapterExecutor(offloads={hook_ref.plugin_ref.name: offload} if offload else None)
+    lag = 0.0
+    done = asyncio.Event()
+
+    async def ticker():
+        nonlocal lag
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lag = max(lag, time.perf_counter() - start - 0.001)
+
+    async def client(count):
+        for _ in range(count):
+            await executor.execute([hook_ref], payload, GlobalContext(request_id="1"), "tool_pre_invoke")
+
+    tick = asyncio.ensure_future(ticker())
+    start = time.perf_counter()
+    await asyncio.gather(*(client(calls // concurrency) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await tick
+    return (calls // concurrency) * concurrency / elapsed, lag
+
+
+async def run(args):
+    os.environ["CHECK_ENDPOINT"] = stub_guardrails(args.delay)
+    # PII at the end, so both patterns scan the whole text
+    text = "lorem ipsum " * (args.text_size // 12) + "Contact jane.doe@example.com, SSN 123-45-6789."
+    executors = ["inline", "thread", "process"] + (["subinterpreter"] if interpreters_supported() else [])
+    for name, kind, payload in (
+        ("nemocheck", "NemoCheckLike", ToolPreInvokePayload(name="search", args={"query": "weather"})),
+        ("pii", "PiiDetect", ToolPreInvokePayload(name="send", args={"text": text})),
+    ):
+        config = PluginConfig(name=name, kind=f"bench_plugin_executors.{kind}", hooks=["tool_pre_invoke"])
+        plugin = globals()[kind](config)
+        hook_ref = HookRef("tool_pre_invoke", PluginRef(plugin))
+        print(f"{name}: {args.calls} calls, {args.concurrency} concurrent, {args.workers} workers")
+        for executor in executors:
+            offload = None if executor == "inline" else await start_offload(executor, config, args.workers)
+            rate, lag = await measure(hook_ref, offload, payload, args.calls, args.concurrency)
+            print(f"  {executor:<15} {rate:9.0f} calls/s  max loop lag {lag * 1e3:8.1f} ms")
+            if offload:
+                await offload.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--delay", type=float, default=0.005, help="guardrails stub latency in seconds")
+    parser.add_argument("--text-size", type=int, default=200_000, help="bytes of tool arguments scanned for PII")
+    args = parser.parse_args()
+    # Every pii call is blocked; keep the violation logs out of the tables
+    logging.disable(logging.WARNING)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,7 @@ This module provides the core Nemo Check guardrails plugin implementation.
 
 # First-Party
 
+import asyncio
 import logging
 import os
 
@@ -40,6 +41,49 @@ CHECK_PATH = "/v1/guardrail/checks"
 HEADERS = {
     "Content-Type": "application/json",
 }
+# Tool output chunking: disabled by default, so a result is checked in one request
+DEFAULT_CHUNK_SIZE = 0
+DEFAULT_CHUNK_OVERLAP = 200
+DEFAULT_MAX_CONCURRENT_CHECKS = 4
+
+
+def split_text(text: str, chunk_size: int, overlap: int = 0) -> list[str]:
+    """Split text into chunks of at most chunk_size characters.
+
+    Chunks end at the last whitespace within the size limit when there is one,
+    so words are not cut in half. Consecutive chunks share ``overlap``
+    characters, so text spanning a boundary is seen whole by at least one check.
+
+    Args:
+        text: The text to split.
+        chunk_size: Maximum characters per chunk; 0 returns the text as one chunk.
+        overlap: Characters repeated at the start of each following chunk (at most half a chunk).
+
+    Returns:
+        The chunks, in order.
+    """
+    if chunk_size <= 0 or len(text) <= chunk_size:
+        return [text]
+    overlap = max(0, min(overlap, chunk_size // 2))
+    chunks = []
+    start = 0
+    while start + chunk_size < len(text):
+        end = start + chunk_size
+        boundary = max(text.rfind(" ", start + overlap + 1, end), text.rfind("\n", start + overlap + 1, end))
+        if boundary > 0:
+            end = boundary + 1
+        chunks.append(text[start:end])
+        start = end - overlap
+    chunks.append(text[start:])
+    return chunks
+
+
+def merge_rails_status(merged: dict, rails_status: dict | None) -> dict:
+    """Merge one check's rails_status into merged; a rail that did not succeed wins."""
+    for rail, status in (rails_status or {}).items():
+        if rail not in merged or (isinstance(status, dict) and status.get("status") != "success"):
+            merged[rail] = status
+    return merged
 
 
 class NemoCheck(Plugin):
@@ -58,10 +102,18 @@ class NemoCheck(Plugin):
             server_url = config.config.get("nemo_guardrails_url", DEFAULT_GUARDRAILS_SERVER_URL)
             self.model_name = config.config.get("nemo_model", DEFAULT_MODEL_NAME)
             self.nemo_config_id = config.config.get("nemo_config_id", DEFAULT_NEMO_CONFIG_ID)
+            self.chunk_size = int(config.config.get("chunk_size", DEFAULT_CHUNK_SIZE))
+            self.chunk_overlap = int(config.config.get("chunk_overlap", DEFAULT_CHUNK_OVERLAP))
+            self.max_concurrent_checks = max(
+                1, int(config.config.get("max_concurrent_checks", DEFAULT_MAX_CONCURRENT_CHECKS))
+            )
         else:
             server_url = DEFAULT_GUARDRAILS_SERVER_URL
             self.model_name = DEFAULT_MODEL_NAME
             self.nemo_config_id = DEFAULT_NEMO_CONFIG_ID
+            self.chunk_size = DEFAULT_CHUNK_SIZE
+            self.chunk_overlap = DEFAULT_CHUNK_OVERLAP
+            self.max_concurrent_checks = DEFAULT_MAX_CONCURRENT_CHECKS
             logger.warning("Plugin config is empty or invalid, using default server URL and model")
 
         # Construct full endpoint URL
@@ -206,55 +258,16 @@ class NemoCheck(Plugin):
             if item.get("type") == "text":
                 text_content += item.get("text", "")
 
-        # Build NeMo check payload for tool response
-        check_nemo_payload = {
-            "model": self.model_name,
-            "guardrails": {"config_id": self.nemo_config_id},
-            "messages": [{"role": "tool", "content": text_content, "name": tool_name}],
-        }
-
-        logger.debug(f"[NemoCheck] Payload for guardrail check: {check_nemo_payload}")
+        chunks = split_text(text_content, self.chunk_size, self.chunk_overlap)
 
-        violation = None
         try:
-            response = requests.post(self.check_endpoint, headers=HEADERS, json=check_nemo_payload)
-            if response.status_code == 200:
-                data = response.json()
-                status = data.get("status", "blocked")
-                logger.debug(f"[NemoCheck] Rails reply: {data}")
-                metadata = data.get("rails_status")
-
-                if status == "success":
-                    result = ToolPostInvokeResult(continue_processing=True, metadata=metadata)
-                else:  # blocked
-                    logger.info(f"[NemoCheck] Tool response blocked. Full NeMo response: {data}")
-                    # Extract rail names from rails_status for more informative description
-                    rails_run = list(metadata.keys()) if metadata else []
-                    rails_info = f"Rails: {', '.join(rails_run)}" if rails_run else "No rails info"
-                    violation = PluginViolation(
-                        reason=f"Tool response check failed: {status}",
-                        description=f"{rails_info}",
-                        code="NEMO_RAILS_BLOCKED",
-                        details=metadata,
-                        # Internal error for invalid tool response
-                        mcp_error_code=-32603,
-                    )
-                    result = ToolPostInvokeResult(
-                        continue_processing=False,
-                        violation=violation,
-                        metadata=metadata,
-                    )
+            if len(chunks) > 1:
+                result = await self._check_tool_response_chunks(chunks, tool_name)
             else:
-                violation = PluginViolation(
-                    reason="Tool Check Unavailable",
-                    description=(
-                        f"Tool response check server returned error. "
-                        f"Status code: {response.status_code}, Response: {response.text}"
-                    ),
-                    code="NEMO_SERVER_ERROR",
-                    details={"status_code": response.status_code},
+                response = requests.post(
+                    self.check_endpoint, headers=HEADERS, json=self._tool_response_check(text_content, tool_name)
                 )
-                result = ToolPostInvokeResult(continue_processing=False, violation=violation)
+                result = self._tool_response_result(response)
 
             logger.info(f"[NemoCheck] Tool post invoke result: {result}")
             return result
@@ -268,3 +281,94 @@ class NemoCheck(Plugin):
                 details={"error": str(e)},
             )
             return ToolPostInvokeResult(continue_processing=False, violation=violation)
+
+    def _tool_response_check(self, text_content: str, tool_name: str) -> dict:
+        """Build the NeMo check payload for (a chunk of) a tool response."""
+        check_nemo_payload = {
+            "model": self.model_name,
+            "guardrails": {"config_id": self.nemo_config_id},
+            "messages": [{"role": "tool", "content": text_content, "name": tool_name}],
+        }
+        logger.debug(f"[NemoCheck] Payload for guardrail check: {check_nemo_payload}")
+        return check_nemo_payload
+
+    def _tool_response_result(self, response: requests.Response) -> ToolPostInvokeResult:
+        """Turn the check server's reply for a tool response into a hook result."""
+        if response.status_code == 200:
+            data = response.json()
+            status = data.get("status", "blocked")
+            logger.debug(f"[NemoCheck] Rails reply: {data}")
+            metadata = data.get("rails_status")
+
+            if status == "success":
+                return ToolPostInvokeResult(continue_processing=True, metadata=metadata)
+            # blocked
+            logger.info(f"[NemoCheck] Tool response blocked. Full NeMo response: {data}")
+            # Extract rail names from rails_status for more informative description
+            rails_run = list(metadata.keys()) if metadata else []
+            rails_info = f"Rails: {', '.join(rails_run)}" if rails_run else "No rails info"
+            violation = PluginViolation(
+                reason=f"Tool response check failed: {status}",
+                description=f"{rails_info}",
+                code="NEMO_RAILS_BLOCKED",
+                details=metadata,
+                # Internal error for invalid tool response
+                mcp_error_code=-32603,
+            )
+            return ToolPostInvokeResult(
+                continue_processing=False,
+                violation=violation,
+                metadata=metadata,
+            )
+        violation = PluginViolation(
+            reason="Tool Check Unavailable",
+            description=(
+                f"Tool response check server returned error. "
+                f"Status code: {response.status_code}, Response: {response.text}"
+            ),
+            code="NEMO_SERVER_ERROR",
+            details={"status_code": response.status_code},
+        )
+        return ToolPostInvokeResult(continue_processing=False, violation=violation)
+
+    async def _check_tool_response_chunks(self, chunks: list[str], tool_name: str) -> ToolPostInvokeResult:
+        """Check the chunks of a large tool response concurrently.
+
+        At most ``max_concurrent_checks`` requests are in flight. The first chunk
+        that does not pass decides the result, and checks not yet started are
+        cancelled; otherwise the rails_status of all chunks is merged.
+
+        Args:
+            chunks: The text chunks of the tool response.
+            tool_name: The name of the tool.
+
+        Returns:
+            The combined result of the chunk checks.
+        """
+        logger.debug(f"[NemoCheck] Checking tool response in {len(chunks)} chunks")
+        limit = asyncio.Semaphore(self.max_concurrent_checks)
+
+        async def check(chunk: str) -> ToolPostInvokeResult:
+            check_nemo_payload = self._tool_response_check(chunk, tool_name)
+            async with limit:
+                response = await asyncio.to_thread(
+                    requests.post, self.check_endpoint, headers=HEADERS, json=check_nemo_payload
+                )
+            return self._tool_response_result(response)
+
+        tasks = [asyncio.create_task(check(chunk)) for chunk in chunks]
+        merged: dict = {}
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                merge_rails_status(merged, result.metadata)
+                if not result.continue_processing:
+                    if result.metadata is not None:
+                        result.metadata = merged
+                    return result
+        finally:
+            for task in tasks:
+                task.cancel()
+            # Requests already sent finish in their threads; only their results are dropped
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return ToolPostInvokeResult(continue_processing=True, metadata=merged)
@@ -17,7 +17,7 @@ from cpex.framework import (
 )
 
 # Local
-from plugin import NemoCheck
+from plugin import NemoCheck, merge_rails_status, split_text
 
 
 @pytest.fixture
@@ -366,3 +366,102 @@ async def test_violation_includes_rail_names(plugin, context, hook_name, payload
         assert result.violation.mcp_error_code == -32602
     else:
         assert result.violation.mcp_error_code == -32603
+
+
+# ---------------------------------------------------------------------------
+# Chunked checks of large tool outputs
+# ---------------------------------------------------------------------------
+
+
+@pytest.fixture
+def chunking_plugin():
+    """Create a NemoCheck plugin that checks tool outputs in 40-character chunks."""
+    config = PluginConfig(
+        name="test",
+        kind="nemocheck.NemoCheck",
+        hooks=["tool_post_invoke"],
+        config={"chunk_size": 40, "chunk_overlap": 10, "max_concurrent_checks": 2},
+    )
+    return NemoCheck(config)
+
+
+def test_split_text_overlaps_and_keeps_words():
+    text = " ".join(f"word{i}" for i in range(30))
+
+    chunks = split_text(text, 40, 10)
+
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 40 for chunk in chunks)
+    assert all(chunk.endswith(" ") for chunk in chunks[:-1])
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert previous[-10:] == chunk[:10]
+    # Dropping each overlap reassembles the text
+    assert chunks[0] + "".join(chunk[10:] for chunk in chunks[1:]) == text
+
+
+def test_split_text_without_whitespace_or_when_disabled():
+    assert split_text("x" * 100, 40, 10) == ["x" * 40, "x" * 40, "x" * 40]
+    assert split_text("x" * 100, 0, 10) == ["x" * 100]
+    assert split_text("short", 40, 10) == ["short"]
+
+
+def test_merge_rails_status_keeps_failures():
+    merged = merge_rails_status({}, {"a": {"status": "success"}, "b": {"status": "success"}})
+    merge_rails_status(merged, {"b": {"status": "blocked"}})
+    merge_rails_status(merged, {"b": {"status": "success"}, "c": {"status": "success"}})
+
+    assert merged == {"a": {"status": "success"}, "b": {"status": "blocked"}, "c": {"status": "success"}}
+
+
+@pytest.mark.asyncio
+async def test_tool_post_invoke_checks_chunks_and_merges_status(chunking_plugin, context):
+    """Every chunk is checked and the rails_status of all checks is merged."""
+    text = " ".join(f"word{i}" for i in range(30))
+    payload = ToolPostInvokePayload(name="test_tool", result={"content": [{"type": "text", "text": text}]})
+    replies = iter(
+        [
+            mock_http_response(200, {"status": "success", "rails_status": {"a": {"status": "success"}}}),
+            mock_http_response(200, {"status": "success", "rails_status": {"b": {"status": "success"}}}),
+        ]
+        * 10
+    )
+
+    with patch("plugin.requests.post", side_effect=lambda *a, **kw: next(replies)) as mock_post:
+        result = await chunking_plugin.tool_post_invoke(payload, context)
+
+    sent = [call[1]["json"]["messages"][0]["content"] for call in mock_post.call_args_list]
+    assert sorted(sent) == sorted(split_text(text, 40, 10))
+    assert result.continue_processing
+    assert result.metadata == {"a": {"status": "success"}, "b": {"status": "success"}}
+
+
+@pytest.mark.asyncio
+async def test_tool_post_invoke_blocked_chunk_cancels_remaining(chunking_plugin, context):
+    """The first blocked chunk decides the result; chunks not yet sent are not checked."""
+    text = "x" * 40 + "BAD" + "x" * 400
+    payload = ToolPostInvokePayload(name="test_tool", result={"content": [{"type": "text", "text": text}]})
+
+    def check(*args, **kwargs):
+        if "BAD" in kwargs["json"]["messages"][0]["content"]:
+            return mock_http_response(200, {"status": "blocked", "rails_status": {"a": {"status": "blocked"}}})
+        return mock_http_response(200, {"status": "success", "rails_status": {"a": {"status": "success"}}})
+
+    with patch("plugin.requests.post", side_effect=check) as mock_post:
+        result = await chunking_plugin.tool_post_invoke(payload, context)
+
+    assert not result.continue_processing
+    assert result.violation.code == "NEMO_RAILS_BLOCKED"
+    assert result.metadata == {"a": {"status": "blocked"}}
+    assert mock_post.call_count < len(split_text(text, 40, 10))
+
+
+@pytest.mark.asyncio
+async def test_tool_post_invoke_chunk_connection_error(chunking_plugin, context):
+    """A failing chunk request fails the whole check closed."""
+    payload = ToolPostInvokePayload(name="test_tool", result={"content": [{"type": "text", "text": "x" * 200}]})
+
+    with patch("plugin.requests.post", side_effect=Exception("Network error")):
+        result = await chunking_plugin.tool_post_invoke(payload, context)
+
+    assert not result.continue_processing
+    assert result.violation.code == "NEMO_CONNECTION_ERROR"
@@ -0,0 +1,405 @@
+"""Adapter-level settings.
+
+The plugin manager owns the ``plugins``/``plugin_dirs``/``plugin_settings``
+sections of the plugin configuration file and ignores any other top-level
+keys. Settings that control the adapter itself (as opposed to the plugins it
+runs) live under an ``adapter_settings`` section of the same file:
+
+    adapter_settings:
+      audit_mode:
+        hooks: ["tool_post_invoke"]
+        tools: ["get_weather"]
+"""
+
+# Standard
+import dataclasses
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Any
+
+# Third-Party
+import yaml
+
+logger = logging.getLogger("ext-proc-PM")
+
+ADAPTER_SETTINGS_KEY = "adapter_settings"
+
+OVER_LIMIT_POLICIES = ("passthrough", "deny", "prefix")
+
+# Values of the per-plugin ``executor`` key, next to ``mode`` and ``priority``
+PLUGIN_EXECUTORS = ("inline", "thread", "process", "subinterpreter")
+
+
+@dataclass
+class AuditModeSettings:
+    """Audit (shadow) mode for guardrail hooks.
+
+    Hooks or tools listed here are not enforced on the request path: the body is
+    forwarded unchanged and the plugins run in the background, with their verdict
+    only recorded.
+
+    Attributes:
+        hooks: Hook types (e.g. ``tool_post_invoke``) that always run in audit mode.
+        tools: Tool names whose tool hooks always run in audit mode.
+        max_concurrency: Maximum number of audit hook invocations running at once.
+        max_pending: Maximum number of queued plus running invocations; new ones are dropped past it.
+        drain_timeout: Seconds to wait for outstanding invocations on shutdown.
+    """
+
+    hooks: list[str] = field(default_factory=list)
+    tools: list[str] = field(default_factory=list)
+    max_concurrency: int = 8
+    max_pending: int = 256
+    drain_timeout: float = 10.0
+
+    def applies_to(self, hook_type: str, tool_name: str | None = None) -> bool:
+        """Return True if the given hook invocation should run in audit mode."""
+        return hook_type in self.hooks or (tool_name is not None and tool_name in self.tools)
+
+
+@dataclass
+class BodyLimitSettings:
+    """Bounds on the memory used for buffered bodies.
+
+    Attributes:
+        max_total_bytes: Bytes all streams together may buffer; 0 means unlimited.
+        max_stream_bytes: Bytes one body may buffer; 0 means unlimited.
+        spill_threshold: Bodies larger than this move to a memory-mapped temp file; 0 never spills.
+        spill_dir: Directory for spill files; the system temp directory if empty.
+        idle_timeout: Seconds after which a buffer with no new chunk is freed; 0 disables it.
+        over_limit: What to do with a body over the limits: ``passthrough`` (forward
+            unchecked), ``deny`` (return an MCP error) or ``prefix`` (check the message
+            cut off at the end of the part that was buffered; block if it blocks,
+            otherwise forward unchanged).
+    """
+
+    max_total_bytes: int = 512 * 1024 * 1024
+    max_stream_bytes: int = 64 * 1024 * 1024
+    spill_threshold: int = 8 * 1024 * 1024
+    spill_dir: str = ""
+    idle_timeout: float = 300.0
+    over_limit: str = "passthrough"
+
+    def __post_init__(self):
+        if self.over_limit not in OVER_LIMIT_POLICIES:
+            raise ValueError(f"body_limits.over_limit must be one of {OVER_LIMIT_POLICIES}, not {self.over_limit!r}")
+
+
+@dataclass
+class CorrelationSettings:
+    """Bounds on the table of in-flight tool calls shared across streams.
+
+    Attributes:
+        max_entries: Most calls remembered; the oldest are dropped past it. 0 disables the table.
+        ttl: Seconds a call is remembered if no result arrives for it.
+    """
+
+    max_entries: int = 65536
+    ttl: float = 300.0
+
+
+@dataclass
+class PluginOrderingSettings:
+    """Cost-aware ordering of ``sequential`` (enforce) plugins.
+
+    Attributes:
+        enabled: Reorder sequential plugins by their observed latency and block rate.
+        reorderable: Plugins that may move: independent of the others and never modifying the payload.
+        alpha: Smoothing factor of the latency and block-rate averages.
+        min_samples: Runs of each plugin observed before its position may change.
+    """
+
+    enabled: bool = False
+    reorderable: list[str] = field(default_factory=list)
+    alpha: float = 0.1
+    min_samples: int = 50
+
+
+@dataclass
+class ThreadPoolSettings:
+    """Pool running the hooks of plugins configured with ``executor: thread``.
+
+    Attributes:
+        max_workers: Threads running hooks at once.
+        max_queue: Hooks that may wait for a free thread; more fail with a plugin error.
+    """
+
+    max_workers: int = 8
+    max_queue: int = 64
+
+
+@dataclass
+class ProcessPoolSettings:
+    """Worker processes running the hooks of plugins configured with ``executor: process``.
+
+    Attributes:
+        workers: Worker processes per plugin; each loads its own instance of the plugin.
+        transfer_threshold: Payloads of at least this many bytes (pickled) go through shared memory.
+        health_interval: Seconds between health checks of idle workers.
+        health_timeout: Seconds a worker has to answer a health check, or to finish a
+            call that timed out, before it is replaced.
+        start_timeout: Seconds a worker has to load the plugin.
+    """
+
+    workers: int = 2
+    transfer_threshold: int = 32 * 1024
+    health_interval: float = 10.0
+    health_timeout: float = 5.0
+    start_timeout: float = 60.0
+
+
+@dataclass
+class SubinterpreterSettings:
+    """Subinterpreters running the hooks of plugins configured with ``executor: subinterpreter``.
+
+    Attributes:
+        interpreters: Subinterpreters per plugin; each loads its own instance of the plugin.
+    """
+
+    interpreters: int = 1
+
+
+@dataclass
+class LoopMonitorSettings:
+    """Monitor of the event loop's scheduling delay.
+
+    Attributes:
+        enabled: Measure the delay and attribute stalls to the plugin blocking the loop.
+        interval: Seconds between measurements.
+        threshold: Delay, in seconds, from which the loop counts as blocked.
+        log_interval: Minimum seconds between two logged stacks of the same plugin and hook.
+    """
+
+    enabled: bool = True
+    interval: float = 0.1
+    threshold: float = 0.1
+    log_interval: float = 60.0
+
+
+@dataclass
+class AdminSettings:
+    """Admin HTTP endpoints for profiling a live adapter.
+
+    Attributes:
+        port: Port of the admin endpoints; 0 disables them.
+        host: Address the admin endpoints listen on. They are unauthenticated.
+        max_profile_seconds: Longest CPU profile that may be requested.
+    """
+
+    port: int = 0
+    host: str = "127.0.0.1"
+    max_profile_seconds: float = 60.0
+
+
+@dataclass
+class ServerTimingSettings:
+    """Latency breakdown added to the response headers of each request.
+
+    Attributes:
+        enabled: Add the time spent in each hook and plugin to the response headers.
+        header: Name of the header, ``server-timing`` or e.g. ``x-plugins-adapter-timing``.
+    """
+
+    enabled: bool = False
+    header: str = "server-timing"
+
+
+@dataclass
+class DynamicMetadataSettings:
+    """Plugin verdicts and timings returned to Envoy as dynamic metadata.
+
+    Attributes:
+        enabled: Return the verdict, violation, timings and metadata of each hook invocation.
+        namespace: Dynamic metadata namespace; Envoy must list it in the ext_proc
+            filter's ``metadata_options.receiving_namespaces``.
+        metadata_keys: Keys of the plugins' result metadata to return, e.g. ``rails_status``.
+    """
+
+    enabled: bool = False
+    namespace: str = "plugins_adapter"
+    metadata_keys: list[str] = field(default_factory=list)
+
+
+@dataclass
+class AuditLogSettings:
+    """Audit log of plugin verdicts, one record per hook invocation.
+
+    Attributes:
+        path: File the records are appended to; empty disables the audit log.
+        format: ``jsonl``, or ``length_prefixed`` (a 4-byte big-endian length before each JSON record).
+        max_queue: Records waiting to be written; new ones are dropped and counted past it.
+        batch_size: Most records written at once.
+        flush_interval: Seconds a record may wait for a batch to fill.
+        max_bytes: Size at which the file is rotated; 0 never rotates.
+        backups: Rotated files kept.
+        drain_timeout: Seconds to wait on shutdown for the queued records to be written.
+    """
+
+    path: str = ""
+    format: str = "jsonl"
+    max_queue: int = 10000
+    batch_size: int = 512
+    flush_interval: float = 1.0
+    max_bytes: int = 64 * 1024 * 1024
+    backups: int = 5
+    drain_timeout: float = 5.0
+
+
+@dataclass
+class LoggingSettings:
+    """Logging of the request path, by category (see ``log_setup``).
+
+    Attributes:
+        categories: Level by category (``stream``, ``payload``), e.g. ``{"payload": "DEBUG"}``;
+            categories not listed follow ``LOGLEVEL``.
+        payload_sample_rate: Share of the ``payload`` messages (bodies, hook payloads and results,
+            responses) that are logged.
+        payload_max_chars: Longest body or message in a ``payload`` message; 0 does not truncate.
+        queue_size: Log records waiting for the thread writing them to stderr; more are dropped.
+            0 writes them from the event loop.
+    """
+
+    categories: dict[str, str] = field(default_factory=dict)
+    payload_sample_rate: float = 1.0
+    payload_max_chars: int = 4096
+    queue_size: int = 10000
+
+
+@dataclass
+class TrafficProfileSettings:
+    """Heavy hitters and latency quantiles of the tools called through the adapter.
+
+    Attributes:
+        enabled: Keep the profile and report it on ``/admin/traffic`` and in the Prometheus metrics.
+        top_k: Most (tenant, tool) pairs tracked by calls and by bytes, and most tools with latency quantiles.
+        relative_accuracy: Relative error of the latency quantiles.
+        tenant_header: Request header naming the tenant, e.g. ``x-tenant-id``; empty counts all traffic as one tenant.
+    """
+
+    enabled: bool = False
+    top_k: int = 100
+    relative_accuracy: float = 0.01
+    tenant_header: str = ""
+
+
+@dataclass
+class AdapterSettings:
+    """Root of the ``adapter_settings`` configuration section.
+
+    Attributes:
+        metrics_port: Port for the Prometheus exporter; 0 disables it.
+        full_duplex_streamed: Assume the FULL_DUPLEX_STREAMED body mode in both
+            directions for Envoy versions that do not send ``protocol_config``.
+        max_decoded_body_bytes: Cap on the decoded size of a content-encoded
+            response body; larger bodies are passed through unchecked.
+        opaque_min_bytes: base64 strings at least this long in content ``data``/``blob``
+            members of tool results are hidden from plugins behind placeholders and
+            passed through undecoded; 0 disables this.
+        opaque_requests: Also hide ``data``/``blob`` members of request bodies
+            (``tools/call`` arguments) from the pre-invoke plugins.
+        first_deny_wins: Return as soon as one ``concurrent`` plugin blocks, without
+            waiting for the other plugins of the band to finish cancelling; how each
+            of those ended is logged and counted.
+        audit_mode: Audit (shadow) mode settings.
+        body_limits: Memory bounds for buffered bodies.
+        correlation: Bounds on the table matching tool results to the calls they answer.
+        plugin_ordering: Cost-aware ordering of sequential plugins.
+        thread_pool: Pool for the hooks of plugins run with ``executor: thread``.
+        process_pool: Worker processes for plugins run with ``executor: process``.
+        subinterpreters: Subinterpreters for plugins run with ``executor: subinterpreter``.
+        loop_monitor: Event-loop lag monitor.
+        admin: Admin HTTP endpoints.
+        server_timing: Per-plugin latency header on responses.
+        dynamic_metadata: Plugin verdicts and timings returned to Envoy as dynamic metadata.
+        audit_log: Audit log of plugin verdicts.
+        logging: Log levels by category, payload sampling and the log writer thread.
+        traffic_profile: Heavy hitters and latency quantiles of the tools called.
+    """
+
+    metrics_port: int = 0
+    full_duplex_streamed: bool = False
+    max_decoded_body_bytes: int = 16 * 1024 * 1024
+    opaque_min_bytes: int = 4096
+    opaque_requests: bool = False
+    first_deny_wins: bool = False
+    audit_mode: AuditModeSettings = field(default_factory=AuditModeSettings)
+    body_limits: BodyLimitSettings = field(default_factory=BodyLimitSettings)
+    correlation: CorrelationSettings = field(default_factory=CorrelationSettings)
+    plugin_ordering: PluginOrderingSettings = field(default_factory=PluginOrderingSettings)
+    thread_pool: ThreadPoolSettings = field(default_factory=ThreadPoolSettings)
+    process_pool: ProcessPoolSettings = field(default_factory=ProcessPoolSettings)
+    subinterpreters: SubinterpreterSettings = field(default_factory=SubinterpreterSettings)
+    loop_monitor: LoopMonitorSettings = field(default_factory=LoopMonitorSettings)
+    admin: AdminSettings = field(default_factory=AdminSettings)
+    server_timing: ServerTimingSettings = field(default_factory=ServerTimingSettings)
+    dynamic_metadata: DynamicMetadataSettings = field(default_factory=DynamicMetadataSettings)
+    audit_log: AuditLogSettings = field(default_factory=AuditLogSettings)
+    logging: LoggingSettings = field(default_factory=LoggingSettings)
+    traffic_profile: TrafficProfileSettings = field(default_factory=TrafficProfileSettings)
+
+
+def _from_dict(cls, data: dict[str, Any], path: str):
+    """Build dataclass ``cls`` from ``data``, recursing into nested dataclasses.
+
+    Unknown keys are logged and ignored so that a newer config file does not
+    prevent an older adapter from starting.
+    """
+    kwargs = {}
+    fields = {f.name: f for f in dataclasses.fields(cls)}
+    for key, value in (data or {}).items():
+        if key not in fields:
+            logger.warning("Ignoring unknown adapter setting %s.%s", path, key)
+            continue
+        default = fields[key].default_factory() if fields[key].default_factory is not dataclasses.MISSING else None
+        if dataclasses.is_dataclass(default) and isinstance(value, dict):
+            value = _from_dict(type(default), value, f"{path}.{key}")
+        kwargs[key] = value
+    return cls(**kwargs)
+
+
+def _load_config(config_path: str) -> dict[str, Any] | None:
+    """Read the plugin configuration file; None if it does not exist."""
+    try:
+        with open(os.path.normpath(config_path), "r", encoding="utf-8") as file:
+            return yaml.safe_load(file) or {}
+    except FileNotFoundError:
+        return None
+
+
+def load_adapter_settings(config_path: str) -> AdapterSettings:
+    """Load the ``adapter_settings`` section from the plugin configuration file.
+
+    Args:
+        config_path: Path to the plugin manager YAML configuration.
+
+    Returns:
+        AdapterSettings with defaults for anything not configured.
+    """
+    config_data = _load_config(config_path)
+    if config_data is None:
+        logger.warning("Plugin config %s not found; using default adapter settings", config_path)
+        return AdapterSettings()
+    return _from_dict(AdapterSettings, config_data.get(ADAPTER_SETTINGS_KEY) or {}, ADAPTER_SETTINGS_KEY)
+
+
+def load_plugin_executors(config_path: str) -> dict[str, str]:
+    """Read the ``executor`` key of each plugin entry, which the plugin manager ignores.
+
+    Args:
+        config_path: Path to the plugin manager YAML configuration.
+
+    Returns:
+        Executor by plugin name, for plugins not run inline on the event loop.
+
+    Raises:
+        ValueError: If a plugin names an unknown executor.
+    """
+    executors = {}
+    for plugin in (_load_config(config_path) or {}).get("plugins") or []:
+        name, executor = plugin.get("name"), plugin.get("executor", "inline")
+        if executor not in PLUGIN_EXECUTORS:
+            raise ValueError(f"Plugin {name!r}: executor must be one of {PLUGIN_EXECUTORS}, not {executor!r}")
+        if executor != "inline":
+            executors[name] = executor
+    return executors
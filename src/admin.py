@@ -0,0 +1,182 @@
+"""Admin HTTP endpoints for debugging a live adapter.
+
+Served from a background thread, like the Prometheus exporter, only when
+``adapter_settings.admin.port`` is set. The endpoints are unauthenticated:
+bind them to localhost (the default) and reach them with
+``kubectl port-forward``.
+
+    GET  /debug/profile?seconds=10&interval=0.005
+         Sample the stacks of all threads for ``seconds``; returns collapsed
+         stacks for flamegraph.pl or speedscope.
+    POST /debug/heap/start?frames=1
+         Start tracing allocations with ``tracemalloc``.
+    GET  /debug/heap?top=20&group=lineno&diff=1
+         Report the top allocation sites; with ``diff``, the sites that grew
+         the most since the previous snapshot.
+    POST /debug/heap/stop
+         Stop tracing allocations.
+
+The server adds ``/admin/...`` endpoints reporting its live state with
+``json_endpoint``.
+"""
+
+# Standard
+import asyncio
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Optional, Union
+from urllib.parse import parse_qsl, urlsplit
+
+# Local
+from profiling import HeapProfiler, collapsed, sample_stacks
+
+logger = logging.getLogger("ext-proc-PM")
+
+# An endpoint: query parameters -> (status, body, content type)
+Handler = Callable[[dict[str, str]], tuple[int, Union[str, bytes], str]]
+
+TEXT = "text/plain; charset=utf-8"
+JSON = "application/json"
+
+
+def json_endpoint(
+    loop: asyncio.AbstractEventLoop, state: Callable[[dict[str, str]], Any], timeout: float = 5.0
+) -> Handler:
+    """An endpoint returning ``state(query)`` as JSON.
+
+    ``state`` runs on ``loop``, so it may read whatever the loop's coroutines
+    mutate; if the loop does not get to it within ``timeout`` seconds, the
+    endpoint answers 503.
+    """
+
+    async def read(query: dict[str, str]) -> Any:
+        return state(query)
+
+    def handler(query: dict[str, str]) -> tuple[int, str, str]:
+        future = asyncio.run_coroutine_threadsafe(read(query), loop)
+        try:
+            value = future.result(timeout)
+        except TimeoutError:
+            future.cancel()
+            raise TimeoutError(f"The event loop did not answer within {timeout} s") from None
+        return 200, json.dumps(value, indent=2, default=str) + "\n", JSON
+
+    return handler
+
+
+def _number(query: dict[str, str], name: str, default: float, kind: type = float) -> float:
+    try:
+        return kind(query.get(name, default))
+    except ValueError:
+        raise ValueError(f"{name} must be a number, not {query[name]!r}") from None
+
+
+class AdminServer:
+    """Admin endpoints on ``host:port``.
+
+    Attributes:
+        host: Address the endpoints are served on.
+        port: Port the endpoints are served on; 0 picks a free one on ``start``.
+        max_profile_seconds: Longest CPU profile that may be requested.
+        routes: Endpoints by (method, path); ``route`` adds more.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, max_profile_seconds: float = 60.0):
+        self.host = host
+        self.port = port
+        self.max_profile_seconds = max_profile_seconds
+        self.routes: dict[tuple[str, str], Handler] = {}
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._profiling = threading.Lock()
+        self._heap = HeapProfiler()
+        self.route("GET", "/debug/profile", self._profile)
+        self.route("POST", "/debug/heap/start", self._heap_start)
+        self.route("GET", "/debug/heap", self._heap_snapshot)
+        self.route("POST", "/debug/heap/stop", self._heap_stop)
+
+    def route(self, method: str, path: str, handler: Handler) -> None:
+        """Serve ``handler`` for ``method`` requests to ``path``."""
+        self.routes[(method, path)] = handler
+
+    def start(self) -> None:
+        """Serve the endpoints from a background thread."""
+        admin = self
+
+        class RequestHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                admin._dispatch(self, "GET")
+
+            def do_POST(self):
+                admin._dispatch(self, "POST")
+
+            def log_message(self, format, *args):
+                logger.debug("Admin request: " + format, *args)
+
+        self._server = ThreadingHTTPServer((self.host, self.port), RequestHandler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_port
+        threading.Thread(target=self._server.serve_forever, name="admin", daemon=True).start()
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def _dispatch(self, request: BaseHTTPRequestHandler, method: str) -> None:
+        url = urlsplit(request.path)
+        handler = self.routes.get((method, url.path))
+        if handler is None:
+            status, body, content_type = 404, f"No endpoint {method} {url.path}\n", TEXT
+        else:
+            try:
+                status, body, content_type = handler(dict(parse_qsl(url.query)))
+            except ValueError as e:
+                status, body, content_type = 400, f"{e}\n", TEXT
+            except TimeoutError as e:
+                status, body, content_type = 503, f"{e}\n", TEXT
+            except RuntimeError as e:
+                status, body, content_type = 409, f"{e}\n", TEXT
+            except Exception as e:
+                logger.exception("Admin endpoint %s %s failed", method, url.path)
+                status, body, content_type = 500, f"{e}\n", TEXT
+        if isinstance(body, str):
+            body = body.encode()
+        request.send_response(status)
+        request.send_header("Content-Type", content_type)
+        request.send_header("Content-Length", str(len(body)))
+        request.end_headers()
+        request.wfile.write(body)
+
+    def _profile(self, query: dict[str, str]) -> tuple[int, str, str]:
+        seconds = _number(query, "seconds", 10.0)
+        interval = _number(query, "interval", 0.005)
+        if not 0 < seconds <= self.max_profile_seconds:
+            raise ValueError(f"seconds must be in (0, {self.max_profile_seconds}]")
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        if not self._profiling.acquire(blocking=False):
+            raise RuntimeError("A CPU profile is already running")
+        try:
+            logger.info("Sampling stacks for %.1f s", seconds)
+            return 200, collapsed(sample_stacks(seconds, interval)), TEXT
+        finally:
+            self._profiling.release()
+
+    def _heap_start(self, query: dict[str, str]) -> tuple[int, str, str]:
+        frames = int(_number(query, "frames", 1, int))
+        self._heap.start(frames)
+        logger.info("Tracing allocations with %d frames", frames)
+        return 200, "tracemalloc started\n", TEXT
+
+    def _heap_snapshot(self, query: dict[str, str]) -> tuple[int, str, str]:
+        top = int(_number(query, "top", 20, int))
+        diff = query.get("diff", "") not in ("", "0", "false")
+        return 200, self._heap.snapshot(top, query.get("group", "lineno"), diff), TEXT
+
+    def _heap_stop(self, query: dict[str, str]) -> tuple[int, str, str]:
+        self._heap.stop()
+        logger.info("Stopped tracing allocations")
+        return 200, "tracemalloc stopped\n", TEXT
@@ -0,0 +1,186 @@
+"""Audit log of plugin verdicts, written off the event loop.
+
+One compact record per hook invocation:
+
+    {"ts": 1760874000.123, "request_id": "7", "tool": "get_weather", "hook": "tool_pre_invoke",
+     "plugin": "NemoCheck", "verdict": "deny", "enforced": true, "violation_code": "PII", "latency_ms": 12.4}
+
+``enforced`` is false for hooks run in audit (shadow) or observability
+mode, whose ``deny`` only says what would have been denied.
+
+``AuditLog.record`` only appends a tuple to a bounded queue, so recording
+costs the event loop next to nothing; a background thread encodes the
+records and writes them in batches. When the queue is full, records are
+dropped and counted rather than slowing down requests. Files are rotated by
+size, like ``logging.handlers.RotatingFileHandler``, and are either JSON
+Lines or length-prefixed: each record a 4-byte big-endian length followed by
+that many bytes of JSON, for readers that must not split on newlines.
+
+Not to be confused with audit (shadow) mode, whose verdicts are recorded
+here like any other, marked as not enforced.
+"""
+
+# Standard
+import json
+import logging
+import os
+import queue
+import struct
+import threading
+import time
+from typing import Optional
+
+# Local
+import metrics
+
+logger = logging.getLogger("ext-proc-PM")
+
+FORMATS = ("jsonl", "length_prefixed")
+
+FIELDS = ("ts", "request_id", "tool", "hook", "plugin", "verdict", "enforced", "violation_code", "latency_ms")
+
+_LENGTH = struct.Struct(">I")
+
+
+class AuditLog:
+    """Bounded queue of audit records and the thread writing them to ``path``.
+
+    Attributes:
+        path: File the records are written to; rotated files get a ``.1``, ``.2``, ... suffix.
+        format: ``jsonl`` or ``length_prefixed``.
+        max_queue: Records waiting to be written; new ones are dropped past it.
+        batch_size: Most records written at once.
+        flush_interval: Seconds a record may wait for a batch to fill.
+        max_bytes: Size at which the file is rotated; 0 never rotates.
+        backups: Rotated files kept.
+        written: Records written so far.
+        dropped: Records dropped because the queue was full or the log was closing.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        format: str = "jsonl",
+        max_queue: int = 10000,
+        batch_size: int = 512,
+        flush_interval: float = 1.0,
+        max_bytes: int = 64 * 1024 * 1024,
+        backups: int = 5,
+    ):
+        if format not in FORMATS:
+            raise ValueError(f"Audit log format must be one of {FORMATS}, not {format!r}")
+        self.path = path
+        self.format = format
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.written = 0
+        self.dropped = 0
+        self._queue: queue.Queue[tuple] = queue.Queue(max_queue)
+        self._closing = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._file = None
+
+    @property
+    def pending(self) -> int:
+        """Records waiting to be written."""
+        return self._queue.qsize()
+
+    def record(
+        self,
+        request_id: Optional[str],
+        tool: Optional[str],
+        hook: str,
+        plugin: Optional[str],
+        verdict: str,
+        violation_code: Optional[str],
+        seconds: float,
+        enforced: bool = True,
+    ) -> bool:
+        """Queue a record of a hook invocation; ``enforced`` is False for audit-mode invocations.
+
+        Returns:
+            False if the record was dropped because the queue was full or the log is closing.
+        """
+        if self._closing.is_set():
+            self.dropped += 1
+            metrics.AUDIT_LOG_DROPPED.inc()
+            return False
+        try:
+            self._queue.put_nowait(
+                (
+                    time.time(),
+                    request_id,
+                    tool,
+                    hook,
+                    plugin,
+                    verdict,
+                    enforced,
+                    violation_code,
+                    round(seconds * 1000, 1),
+                )
+            )
+        except queue.Full:
+            self.dropped += 1
+            metrics.AUDIT_LOG_DROPPED.inc()
+            return False
+        return True
+
+    def start(self) -> None:
+        """Open ``path`` for appending and start writing queued records."""
+        self._file = open(self.path, "ab")
+        self._thread = threading.Thread(target=self._run, name="audit-log", daemon=True)
+        self._thread.start()
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Write the queued records and close the file, waiting up to ``timeout`` seconds."""
+        self._closing.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                logger.warning("Audit log writer did not finish within %s s; %d records lost", timeout, self.pending)
+            self._thread = None
+
+    def _run(self) -> None:
+        try:
+            while not (self._closing.is_set() and self._queue.empty()):
+                try:
+                    batch = [self._queue.get(timeout=self.flush_interval)]
+                except queue.Empty:
+                    continue
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                self._write(batch)
+        except Exception:
+            logger.exception("Audit log writer failed; records are no longer written")
+        finally:
+            self._file.close()
+
+    def _write(self, batch: list[tuple]) -> None:
+        encoded = [json.dumps(dict(zip(FIELDS, values)), separators=(",", ":")).encode() for values in batch]
+        if self.format == "jsonl":
+            data = b"".join(line + b"\n" for line in encoded)
+        else:
+            data = b"".join(_LENGTH.pack(len(line)) + line for line in encoded)
+        self._file.write(data)
+        self._file.flush()
+        self.written += len(batch)
+        if self.max_bytes and self._file.tell() >= self.max_bytes:
+            self._rotate()
+
+    def _rotate(self) -> None:
+        self._file.close()
+        if self.backups > 0:
+            for index in range(self.backups - 1, 0, -1):
+                source = f"{self.path}.{index}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.path}.{index + 1}")
+            os.replace(self.path, f"{self.path}.1")
+            self._file = open(self.path, "ab")
+        else:
+            self._file = open(self.path, "wb")
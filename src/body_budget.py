@@ -0,0 +1,222 @@
+"""Process-wide memory budget for buffered bodies.
+
+Every body the adapter buffers is a ``BodyBuffer`` drawing on one shared
+``BodyBudget``. A buffer stops accepting chunks once it would exceed its
+per-stream cap or the process-wide budget, and what to do with such a body
+is left to the caller (see ``adapter_settings.BodyLimitSettings.over_limit``).
+Buffers past a size threshold move their contents to an anonymous temporary
+file and are read back through ``mmap``, so large bodies do not grow the heap.
+Spill files are written, mapped and closed by one background thread, chunk
+by chunk and in order, so disk I/O does not stall the event loop.
+"""
+
+# Standard
+import asyncio
+import logging
+import mmap
+import tempfile
+import time
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Union
+
+# Local
+import metrics
+from chunks import Chunk, ChunkBuffer
+
+logger = logging.getLogger("ext-proc-PM")
+
+# One thread runs every spill file operation, in the order submitted
+_spill_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="body-spill")
+
+
+def _map_file(spill_file) -> mmap.mmap:
+    spill_file.flush()
+    return mmap.mmap(spill_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class BodyBudget:
+    """Byte budget shared by all buffered bodies of the process.
+
+    Attributes:
+        max_bytes: Total bytes that may be buffered at once; 0 means unlimited.
+        used: Bytes currently buffered, in memory or spilled to disk.
+    """
+
+    def __init__(self, max_bytes: int = 0):
+        self.max_bytes = max_bytes
+        self.used = 0
+        self._buffers: "weakref.WeakSet[BodyBuffer]" = weakref.WeakSet()
+
+    def reserve(self, size: int) -> bool:
+        """Take ``size`` bytes from the budget; return False if they are not available."""
+        if self.max_bytes and self.used + size > self.max_bytes:
+            return False
+        self.used += size
+        return True
+
+    def release(self, size: int) -> None:
+        self.used -= size
+
+    def register(self, buffer: "BodyBuffer") -> None:
+        self._buffers.add(buffer)
+
+    def reap_idle(self, idle_timeout: float, now: Optional[float] = None) -> int:
+        """Free buffers that have held data without a new chunk for ``idle_timeout`` seconds.
+
+        Returns:
+            The number of buffers freed.
+        """
+        now = time.monotonic() if now is None else now
+        reaped = 0
+        for buffer in list(self._buffers):
+            if buffer and now - buffer.last_active > idle_timeout:
+                logger.warning("Freeing %d-byte body buffer idle for %.0fs", len(buffer), now - buffer.last_active)
+                buffer.expire()
+                reaped += 1
+        return reaped
+
+    async def run_reaper(self, idle_timeout: float) -> None:
+        """Reap idle buffers every ``idle_timeout / 2`` seconds until cancelled."""
+        interval = max(idle_timeout / 2, 1.0)
+        while True:
+            await asyncio.sleep(interval)
+            self.reap_idle(idle_timeout)
+
+
+class BodyBuffer:
+    """A buffered body bounded by a per-stream cap and a shared ``BodyBudget``.
+
+    ``append`` refuses chunks that do not fit and marks the buffer
+    ``over_limit``; chunks accepted before that are kept (a prefix of the
+    body) until ``clear``. ``over_limit`` stays set for the life of the buffer.
+    """
+
+    __slots__ = (
+        "budget",
+        "max_bytes",
+        "spill_threshold",
+        "spill_dir",
+        "over_limit",
+        "last_active",
+        "_memory",
+        "_file",
+        "_map",
+        "_size",
+        "_written",
+        "__weakref__",
+    )
+
+    def __init__(self, budget: BodyBudget, max_bytes: int = 0, spill_threshold: int = 0, spill_dir: str = ""):
+        self.budget = budget
+        self.max_bytes = max_bytes
+        self.spill_threshold = spill_threshold
+        self.spill_dir = spill_dir or None
+        self.over_limit = False
+        self.last_active = time.monotonic()
+        self._memory = ChunkBuffer()
+        self._file = None
+        self._map: Optional[mmap.mmap] = None
+        self._size = 0
+        # Last write submitted to the spill thread
+        self._written: Optional[Future] = None
+        budget.register(self)
+
+    @property
+    def spilled(self) -> bool:
+        return self._file is not None
+
+    def append(self, chunk: Chunk) -> bool:
+        """Buffer ``chunk``.
+
+        Returns:
+            False if the chunk was refused because the body is over its limits.
+        """
+        if not chunk:
+            return not self.over_limit
+        self.last_active = time.monotonic()
+        size = len(chunk)
+        if self.over_limit or (self.max_bytes and self._size + size > self.max_bytes):
+            self.over_limit = True
+            return False
+        if not self.budget.reserve(size):
+            logger.warning("Body buffer budget of %d bytes exhausted", self.budget.max_bytes)
+            self.over_limit = True
+            return False
+        self._size += size
+        if self._file is not None:
+            self._written = _spill_writer.submit(self._file.write, chunk)
+            metrics.BUFFERED_BODY_BYTES.labels(storage="disk").inc(size)
+        else:
+            self._memory.append(chunk)
+            metrics.BUFFERED_BODY_BYTES.labels(storage="memory").inc(size)
+            if self.spill_threshold and self._size > self.spill_threshold:
+                self._spill()
+        return True
+
+    def _spill(self) -> None:
+        self._file = tempfile.TemporaryFile(dir=self.spill_dir)
+        # The chunks are written as they are; the spill thread keeps them alive until then
+        for chunk in self._memory:
+            self._written = _spill_writer.submit(self._file.write, chunk)
+        self._memory.clear()
+        metrics.BUFFERED_BODY_BYTES.labels(storage="memory").dec(self._size)
+        metrics.BUFFERED_BODY_BYTES.labels(storage="disk").inc(self._size)
+        logger.debug("Spilled %d-byte body to disk", self._size)
+
+    async def join(self) -> Union[bytes, mmap.mmap]:
+        """Return the buffered body; spilled bodies are returned as a read-only ``mmap``.
+
+        A spilled body waits, off the event loop, for the writes still in
+        flight, and raises the ``OSError`` of a write that failed.
+        """
+        if self._file is None:
+            return self._memory.join()
+        if self._map is None:
+            spill_file = self._file
+            if self._written is not None:
+                await asyncio.wrap_future(self._written)
+            mapped = await asyncio.wrap_future(_spill_writer.submit(_map_file, spill_file))
+            if self._file is not spill_file:
+                # Cleared while mapping (e.g. reaped); the map is only the caller's
+                return mapped
+            self._map = mapped
+        return self._map
+
+    def clear(self) -> None:
+        """Free the buffered data and return its bytes to the budget."""
+        if self._size:
+            self.budget.release(self._size)
+            metrics.BUFFERED_BODY_BYTES.labels(storage="disk" if self._file else "memory").dec(self._size)
+        self._memory.clear()
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                # Still referenced by a caller; it is unmapped when collected
+                pass
+            self._map = None
+        if self._file is not None:
+            try:
+                # After the writes still queued for it
+                _spill_writer.submit(self._file.close)
+            except RuntimeError:
+                # The spill thread is shut down (interpreter exit), so no write is queued
+                self._file.close()
+            self._file = None
+            self._written = None
+        self._size = 0
+
+    def expire(self) -> None:
+        """Free the data of an idle buffer; the body can no longer be checked."""
+        self.clear()
+        self.over_limit = True
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __bool__(self) -> bool:
+        return self._size > 0
+
+    def __del__(self):
+        self.clear()
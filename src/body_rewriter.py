@@ -0,0 +1,258 @@
+"""Locate JSON-RPC messages in response bodies and splice in modified results.
+
+A post-invoke plugin that modifies a tool result only changes the ``result``
+member of one JSON-RPC message. Rather than re-serializing the whole body,
+the rewriter finds the byte span of that member in the original body and
+replaces just that span, so SSE framing and every other byte of the body are
+kept as they were.
+"""
+
+# Standard
+import json
+import mmap
+import re
+from dataclasses import dataclass
+from typing import Any, Optional, Union
+
+# Local
+from sse import looks_like_sse
+
+_DECODER = json.JSONDecoder()
+_WS = re.compile(r"[ \t\n\r]*")
+_LINE = re.compile(rb"[^\r\n]*(?:\r\n|\n|\r|$)")
+_NOT_WS = re.compile(rb"[^ \t\n\r]")
+_WS_BYTES = re.compile(rb"[ \t\n\r]*")
+_STRING_PART = re.compile(rb'[^"\\]*')
+_SCALAR = re.compile(rb"[^ \t\n\r,:\]}]*")
+_DATA_FIELD = re.compile(rb"^data:[ \t]*", re.MULTILINE)
+
+# Anything sliceable to bytes, including the mmap of a body spilled to disk
+Body = Union[bytes, bytearray, mmap.mmap]
+
+
+@dataclass
+class LocatedMessage:
+    """A parsed JSON-RPC message and the byte span of its JSON text in ``body``."""
+
+    data: Any
+    body: Body
+    start: int
+    end: int
+
+
+def _decode_at(body: Body, start: int, end: Optional[int] = None) -> Optional[tuple[Any, int]]:
+    """Parse the JSON value starting at byte ``start``; return it and its end byte offset."""
+    chunk = body[start:end]
+    try:
+        text = chunk.decode("utf-8")
+        data, stop = _DECODER.raw_decode(text)
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        return None
+    if len(text) != len(chunk):
+        # Non-ASCII text: character and byte offsets differ
+        stop = len(text[:stop].encode("utf-8"))
+    return data, start + stop
+
+
+def locate_message(body: Body) -> Optional[LocatedMessage]:
+    """Find the first JSON-RPC message in an SSE or plain JSON body.
+
+    For SSE bodies this is the first ``data:`` line holding valid JSON; for
+    plain bodies it is the JSON value at the start of the body.
+
+    Returns:
+        The message, or None if no JSON could be parsed.
+    """
+    if looks_like_sse(body[:64]):
+        for line in _LINE.finditer(body):
+            if body[line.start() : line.start() + 5] != b"data:":
+                continue
+            first = _NOT_WS.search(body, line.start() + 5, line.end())
+            if first is None:
+                continue
+            parsed = _decode_at(body, first.start(), line.end())
+            if parsed is not None:
+                return LocatedMessage(parsed[0], body, first.start(), parsed[1])
+        return None
+    first = _NOT_WS.search(body)
+    if first is None:
+        return None
+    parsed = _decode_at(body, first.start())
+    if parsed is None:
+        return None
+    return LocatedMessage(parsed[0], body, first.start(), parsed[1])
+
+
+def complete_prefix(body: Body) -> Optional[bytes]:
+    """Close the JSON-RPC message cut off at the end of ``body`` so the part that arrived can be parsed.
+
+    ``body`` is the start of a plain JSON body, or of an SSE body whose first
+    ``data:`` line holds the message. The JSON is cut back to the last point
+    where closing the open string and containers gives valid JSON: inside a
+    string value, after a complete value, or right after an opening bracket.
+    A member or element cut off before that point is left out.
+
+    Returns:
+        The completed JSON text, or None if ``body`` does not start with an object or array.
+    """
+    end = len(body)
+    if looks_like_sse(body[:64]):
+        data = _DATA_FIELD.search(body)
+        start = _NOT_WS.search(body, data.end()) if data is not None else None
+        if start is not None:
+            end = _LINE.match(body, start.start()).end()
+    else:
+        start = _NOT_WS.search(body)
+    if start is None or body[start.start()] not in b"{[":
+        return None
+    # Closing bracket and what comes next ("key", "colon", "value" or "comma") of each open container
+    stack: list[list] = []
+    cut, suffix = start.start(), b""
+    i = start.start()
+    while i < end:
+        i = _WS_BYTES.match(body, i, end).end()
+        if i >= end:
+            break
+        c = body[i : i + 1]
+        if c in (b"{", b"["):
+            stack.append([b"}" if c == b"{" else b"]", "key" if c == b"{" else "value"])
+            i += 1
+            cut, suffix = i, _closers(stack)
+        elif c in (b"}", b"]"):
+            if not stack:
+                return None
+            stack.pop()
+            i += 1
+            if not stack:
+                return bytes(body[start.start() : i])
+            stack[-1][1] = "comma"
+            cut, suffix = i, _closers(stack)
+        elif c == b",":
+            if not stack:
+                return None
+            stack[-1][1] = "key" if stack[-1][0] == b"}" else "value"
+            i += 1
+        elif c == b":":
+            if not stack:
+                return None
+            stack[-1][1] = "value"
+            i += 1
+        elif c == b'"':
+            is_key = bool(stack) and stack[-1][1] == "key"
+            j = i + 1
+            while True:
+                j = _STRING_PART.match(body, j, end).end()
+                if j >= end or body[j : j + 1] == b'"':
+                    break
+                # An escape, dropped if it was cut off
+                width = 6 if body[j + 1 : j + 2] == b"u" else 2
+                if j + width > end:
+                    end = j
+                    break
+                j += width
+            if j >= end:
+                if not is_key and stack:
+                    cut, suffix = _utf8_boundary(body, start.start(), end), b'"' + _closers(stack)
+                break
+            i = j + 1
+            if is_key:
+                stack[-1][1] = "colon"
+            elif stack:
+                stack[-1][1] = "comma"
+                cut, suffix = i, _closers(stack)
+        else:
+            j = _SCALAR.match(body, i, end).end()
+            if j >= end or not stack:
+                break
+            i = j
+            stack[-1][1] = "comma"
+            cut, suffix = i, _closers(stack)
+    if not suffix:
+        return None
+    return bytes(body[start.start() : cut]) + suffix
+
+
+def _closers(stack: list[list]) -> bytes:
+    return b"".join(closer for closer, _ in reversed(stack))
+
+
+def _utf8_boundary(body: Body, start: int, end: int) -> int:
+    """Move ``end`` back before a UTF-8 character cut off at the end of ``body[start:end]``."""
+    i = end
+    while i > start and i > end - 4 and body[i - 1] & 0xC0 == 0x80:
+        i -= 1
+    if i > start and body[i - 1] >= 0xC0:
+        lead = body[i - 1]
+        width = 4 if lead >= 0xF0 else 3 if lead >= 0xE0 else 2
+        if end - (i - 1) < width:
+            return i - 1
+    return end
+
+
+def member_span(text: str, key: str) -> Optional[tuple[int, int, Any]]:
+    """Find a top-level member of the JSON object in ``text``.
+
+    Returns:
+        Start and end character offsets of the member's value and the parsed
+        value, or None if ``text`` is not an object with that key.
+    """
+    i = _WS.match(text).end()
+    if not text.startswith("{", i):
+        return None
+    i = _WS.match(text, i + 1).end()
+    try:
+        while i < len(text) and text[i] == '"':
+            name, i = _DECODER.raw_decode(text, i)
+            i = _WS.match(text, i).end()
+            if not text.startswith(":", i):
+                return None
+            start = _WS.match(text, i + 1).end()
+            value, end = _DECODER.raw_decode(text, start)
+            if name == key:
+                return start, end, value
+            i = _WS.match(text, end).end()
+            if not text.startswith(",", i):
+                return None
+            i = _WS.match(text, i + 1).end()
+    except json.JSONDecodeError:
+        return None
+    return None
+
+
+def splice_result(message: LocatedMessage, new_result: Any) -> Optional[bytes]:
+    """Return ``message.body`` with the message's ``result`` replaced by ``new_result``.
+
+    Only the bytes of the original ``result`` value are replaced; everything
+    around it, including SSE framing, is copied through once.
+
+    Returns:
+        The new body, or None if ``new_result`` equals the original result.
+    """
+    raw = message.body[message.start : message.end]
+    text = raw.decode("utf-8")
+    span = member_span(text, "result")
+    if span is None:
+        # Not located: rewrite the whole message, still in place within the body
+        if message.data.get("result") == new_result:
+            return None
+        start, end = message.start, message.end
+        replacement = dict(message.data, result=new_result)
+    else:
+        start, end, original = span
+        if original == new_result:
+            return None
+        if len(text) != len(raw):
+            start, end = len(text[:start].encode("utf-8")), len(text[:end].encode("utf-8"))
+        start, end = message.start + start, message.start + end
+        replacement = new_result
+    return _replace_span(message.body, start, end, replacement)
+
+
+def splice_message(message: LocatedMessage, new_data: Any) -> bytes:
+    """Return ``message.body`` with the whole message replaced by ``new_data``, serialized once."""
+    return _replace_span(message.body, message.start, message.end, new_data)
+
+
+def _replace_span(body: Body, start: int, end: int, value: Any) -> bytes:
+    view = memoryview(body)
+    return b"".join((view[:start], json.dumps(value).encode("utf-8"), view[end:]))
@@ -0,0 +1,52 @@
+"""Body chunk accumulation without per-chunk copies."""
+
+# Standard
+from typing import Iterator, Union
+
+Chunk = Union[bytes, bytearray, memoryview]
+
+
+class ChunkBuffer:
+    """Collect body chunks and join them at most once.
+
+    Chunks are kept as ``memoryview``s of the message bytes, so appending is
+    O(1) and copies nothing. ``join`` builds the body in a single copy (none at
+    all for a body that arrived in one chunk) and keeps the result, so asking
+    again is free.
+    """
+
+    __slots__ = ("_chunks", "_size")
+
+    def __init__(self):
+        self._chunks: list[memoryview] = []
+        self._size = 0
+
+    def append(self, chunk: Chunk) -> None:
+        if chunk:
+            self._chunks.append(memoryview(chunk))
+            self._size += len(chunk)
+
+    def join(self) -> bytes:
+        """Return the buffered body as one ``bytes`` object."""
+        chunks = self._chunks
+        if not chunks:
+            return b""
+        if len(chunks) == 1 and isinstance(chunks[0].obj, bytes) and chunks[0].nbytes == len(chunks[0].obj):
+            return chunks[0].obj
+        body = b"".join(chunks)
+        self._chunks = [memoryview(body)]
+        return body
+
+    def __iter__(self) -> Iterator[memoryview]:
+        """Iterate over the buffered chunks without joining them."""
+        return iter(self._chunks)
+
+    def clear(self) -> None:
+        self._chunks = []
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __bool__(self) -> bool:
+        return self._size > 0
@@ -0,0 +1,167 @@
+"""HTTP content-coding (gzip, deflate, br, zstd) for response bodies.
+
+Decoding is incremental and capped, so a small compressed body cannot expand
+into an unbounded amount of memory. ``br`` and ``zstd`` need the optional
+``brotli`` and ``zstandard`` packages; without them those codings are
+reported as unsupported and the body is passed through unchecked.
+"""
+
+# Standard
+import zlib
+from typing import Callable, Optional
+
+try:
+    # Third-Party
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    # Third-Party
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+# Compressed input is fed to codecs without an output limit in slices of this
+# size, bounding how far past the cap a single step can expand
+_SLICE = 4096
+
+# wbits for zlib: gzip framing, zlib framing
+_GZIP_WBITS = 16 + zlib.MAX_WBITS
+_DEFLATE_WBITS = zlib.MAX_WBITS
+
+
+class BodyTooLarge(ValueError):
+    """Raised when a decoded body exceeds the configured size cap."""
+
+
+def normalize(content_encoding: Optional[str]) -> Optional[str]:
+    """Return the single coding named by a ``content-encoding`` header, or None for identity.
+
+    Stacked codings (``gzip, br``) are returned unchanged and are unsupported.
+    """
+    if not content_encoding:
+        return None
+    coding = content_encoding.strip().lower()
+    if coding in ("", "identity"):
+        return None
+    return "gzip" if coding == "x-gzip" else coding
+
+
+def is_supported(coding: str) -> bool:
+    """Return True if ``coding`` can be decoded and re-encoded here."""
+    if coding in ("gzip", "deflate"):
+        return True
+    if coding == "br":
+        return brotli is not None
+    if coding == "zstd":
+        return zstandard is not None
+    return False
+
+
+class Decoder:
+    """Incrementally decode one body, failing once it grows past ``max_size`` bytes.
+
+    Decoded bytes count toward ``max_size`` until the caller says it has
+    ``consumed`` them, so a body checked piece by piece (an SSE stream) is
+    capped per piece rather than as a whole.
+    """
+
+    def __init__(self, coding: str, max_size: int):
+        if not is_supported(coding):
+            raise ValueError(f"Unsupported content-encoding: {coding}")
+        self.coding = coding
+        self.max_size = max_size
+        self.size = 0
+        self._step = self._make_step(coding)
+
+    @staticmethod
+    def _make_step(coding: str) -> Callable[[bytes, int], bytes]:
+        if coding in ("gzip", "deflate"):
+            obj = zlib.decompressobj(_GZIP_WBITS if coding == "gzip" else _DEFLATE_WBITS)
+
+            # Output stops at ``limit``, one byte past the cap, so overflow shows up in the size
+            return lambda data, limit: obj.decompress(data, limit)
+        if coding == "br":
+            process = brotli.Decompressor().process
+        else:
+            process = zstandard.ZstdDecompressor().decompressobj().decompress
+
+        def sliced(data: bytes, limit: int) -> bytes:
+            out = bytearray()
+            view = memoryview(data)
+            for start in range(0, len(view), _SLICE):
+                out += process(bytes(view[start : start + _SLICE]))
+                if len(out) > limit:
+                    break
+            return bytes(out)
+
+        return sliced
+
+    def decode(self, chunk: bytes) -> bytes:
+        """Decode the next compressed chunk.
+
+        Raises:
+            BodyTooLarge: If the decoded body would exceed ``max_size``.
+            ValueError: If the chunk is not valid for the coding.
+        """
+        if not chunk:
+            return b""
+        try:
+            out = self._step(chunk, self.max_size - self.size + 1)
+        except zlib.error as e:
+            raise ValueError(f"Invalid {self.coding} body: {e}") from e
+        except Exception as e:
+            if (brotli and isinstance(e, brotli.error)) or (zstandard and isinstance(e, zstandard.ZstdError)):
+                raise ValueError(f"Invalid {self.coding} body: {e}") from e
+            raise
+        self.size += len(out)
+        if self.size > self.max_size:
+            raise BodyTooLarge(f"Decoded {self.coding} body exceeds {self.max_size} bytes")
+        return out
+
+    def consumed(self, size: int) -> None:
+        """Stop counting ``size`` decoded bytes, no longer held by the caller, toward ``max_size``."""
+        self.size = max(self.size - size, 0)
+
+
+class Encoder:
+    """Incrementally encode one body with ``coding``.
+
+    ``encode`` returns everything that can be sent so far (the compressor is
+    flushed), so each piece can be forwarded on its own; ``finish`` closes the
+    stream.
+    """
+
+    def __init__(self, coding: str):
+        if not is_supported(coding):
+            raise ValueError(f"Unsupported content-encoding: {coding}")
+        if coding in ("gzip", "deflate"):
+            obj = zlib.compressobj(wbits=_GZIP_WBITS if coding == "gzip" else _DEFLATE_WBITS)
+            self._encode = lambda data: obj.compress(data) + obj.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = lambda: obj.flush(zlib.Z_FINISH)
+        elif coding == "br":
+            obj = brotli.Compressor()
+            self._encode = lambda data: obj.process(data) + obj.flush()
+            self._finish = obj.finish
+        else:
+            obj = zstandard.ZstdCompressor().compressobj()
+            self._encode = lambda data: obj.compress(data) + obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+            self._finish = obj.flush
+
+    def encode(self, data: bytes) -> bytes:
+        return self._encode(data) if data else b""
+
+    def finish(self) -> bytes:
+        return self._finish()
+
+
+def decode_body(coding: str, body: bytes, max_size: int) -> bytes:
+    """Decode a complete body; see ``Decoder.decode`` for the errors raised."""
+    return Decoder(coding, max_size).decode(body)
+
+
+def encode_body(coding: str, body: bytes) -> bytes:
+    """Encode a complete body with ``coding``."""
+    encoder = Encoder(coding)
+    return encoder.encode(body) + encoder.finish()
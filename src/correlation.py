@@ -0,0 +1,85 @@
+"""In-flight MCP tool calls, shared across ext_proc streams.
+
+With MCP streamable HTTP the result of a ``tools/call`` can come back on a
+different HTTP stream than the request, e.g. the session's GET SSE channel.
+The stream that carries the result then never saw the call, so the pre-invoke
+path records each call under (``mcp-session-id``, JSON-RPC id) and the
+post-invoke path of any stream of the same session looks it up.
+"""
+
+# Standard
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable, Optional
+
+
+@dataclass
+class Call:
+    """A tool call waiting for its result.
+
+    Attributes:
+        tool_name: The tool called.
+        request_id: ``GlobalContext.request_id`` of the call's hooks; the
+            post-invoke hook reuses it so plugins find their pre-invoke context.
+        contexts: The plugin context table returned by the pre-invoke hook.
+    """
+
+    tool_name: str
+    request_id: str
+    contexts: Optional[dict[str, Any]] = None
+
+
+class CorrelationTable:
+    """Bounded, TTL-evicted map from (session id, JSON-RPC id) to a ``Call``.
+
+    Entries are kept in insertion order. All entries live for the same
+    ``ttl``, so the oldest entry is always the first to expire and eviction
+    only ever looks at the front; every operation is O(1) amortized.
+
+    Attributes:
+        max_entries: Most entries kept; the oldest are dropped past it. 0 disables the table.
+        ttl: Seconds an entry is kept if no result claims it.
+        hits: Lookups that found their call.
+        misses: Lookups of unknown or expired calls.
+    """
+
+    def __init__(self, max_entries: int = 65536, ttl: float = 300.0, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[str, Hashable], tuple[float, Call]] = OrderedDict()
+
+    def put(self, session_id: str, request_id: Hashable, call: Call) -> None:
+        """Record the call made by request ``request_id`` of session ``session_id``."""
+        if not self.max_entries:
+            return
+        now = self._clock()
+        self._expire(now)
+        key = (session_id, request_id)
+        self._entries.pop(key, None)
+        self._entries[key] = (now + self.ttl, call)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def pop(self, session_id: str, request_id: Hashable) -> Optional[Call]:
+        """Return and forget the call made by ``request_id``, or None if unknown or expired."""
+        entry = self._entries.pop((session_id, request_id), None)
+        if entry is None or entry[0] < self._clock():
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[1]
+
+    def _expire(self, now: float) -> None:
+        entries = self._entries
+        while entries:
+            key, (deadline, _) = next(iter(entries.items()))
+            if deadline >= now:
+                break
+            del entries[key]
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,382 @@
+"""Plugin executor with adapter-specific scheduling of plugins.
+
+cpex runs the plugins of one hook in phases: ``sequential`` (enforce),
+``transform`` and ``audit`` plugins one after another, then the
+``concurrent`` plugins side by side, cancelling the rest of them when one
+blocks. ``AdapterExecutor`` replaces the manager's executor when one of the
+following adapter settings is enabled:
+
+``first_deny_wins``
+    cpex awaits every cancelled plugin of the concurrent band before
+    returning, and the cancelled plugins leave no trace. Here the first block
+    is returned at once, the other plugins are cancelled without waiting for
+    them, and what each of them did (cancelled, or finished anyway with a
+    verdict or error) is logged and counted in ``metrics.PLUGINS_ABANDONED``.
+    ``fire_and_forget`` plugins are only started once the band has allowed
+    the request.
+
+``plugin_ordering``
+    Sequential plugins run in the order chosen by an ``ordering.PluginCostModel``
+    from their observed latency and block rate, instead of by priority.
+
+``executor: thread`` / ``process`` / ``subinterpreter`` (per plugin)
+    The plugin's hooks run on an ``offload.ThreadOffload``, in the worker
+    processes of a ``process_pool.ProcessOffload`` or in the subinterpreters
+    of a ``subinterpreters.InterpreterOffload`` instead of on the event loop.
+
+``admin``
+    In-flight invocations and latencies of each plugin are tracked by an
+    ``introspection.PluginActivity`` for the admin endpoints.
+
+``server_timing`` / ``dynamic_metadata``
+    The duration of each hook invocation and of each plugin, and the verdict
+    of each hook invocation, are recorded in the ``request_record.RequestRecord``
+    of the request being processed, for its ``Server-Timing`` header and its
+    dynamic metadata.
+
+``audit_log``
+    The verdict of each hook invocation is queued on an ``audit_log.AuditLog``.
+"""
+
+# Standard
+import asyncio
+import logging
+import time
+from typing import Any, Optional, Union
+
+# First-Party
+from cpex.framework.base import HookRef
+from cpex.framework.errors import PluginViolationError
+from cpex.framework.extensions.extensions import Extensions
+from cpex.framework.manager import ExecutionContext, PluginExecutor
+from cpex.framework.models import (
+    GlobalContext,
+    PluginContextTable,
+    PluginMode,
+    PluginPayload,
+    PluginResult,
+    PluginViolation,
+)
+from cpex.framework.settings import settings
+
+# Local
+import metrics
+from audit_log import AuditLog
+from introspection import PluginActivity
+from offload import OffloadedHookRef, ThreadOffload
+from ordering import PluginCostModel
+from process_pool import ProcessOffload
+from request_record import RequestRecord, request_record, timed
+from shadow import enforcing
+from subinterpreters import InterpreterOffload
+
+logger = logging.getLogger("ext-proc-PM")
+
+
+class AdapterExecutor(PluginExecutor):
+    """``PluginExecutor`` with first-deny-wins concurrent bands and cost-aware sequential ordering.
+
+    Attributes:
+        first_deny_wins: Return the first block of the concurrent band without waiting for the rest.
+        cost_model: Orders sequential plugins; None keeps the configured order.
+        offloads: Where to run the hooks of each plugin not run on the event loop, by plugin name.
+        activity: Counts in-flight invocations and latencies of each plugin, for the admin endpoints.
+        record_requests: Record durations and verdicts in ``request_record.request_record``.
+        audit_log: Where to record the verdict of each hook invocation.
+    """
+
+    def __init__(
+        self,
+        *args: Any,
+        first_deny_wins: bool = False,
+        cost_model: Optional[PluginCostModel] = None,
+        offloads: Optional[dict[str, Union[ThreadOffload, ProcessOffload, InterpreterOffload]]] = None,
+        activity: Optional[PluginActivity] = None,
+        record_requests: bool = False,
+        audit_log: Optional[AuditLog] = None,
+        **kwargs: Any,
+    ):
+        super().__init__(*args, **kwargs)
+        self.first_deny_wins = first_deny_wins
+        self.cost_model = cost_model
+        self.offloads = offloads or {}
+        self.activity = activity
+        self.record_requests = record_requests
+        self.audit_log = audit_log
+        # Cancelled plugin tasks, kept alive until they report how they ended
+        self._abandoned: set[asyncio.Task] = set()
+
+    @classmethod
+    def replacing(cls, executor: PluginExecutor, **options: Any) -> "AdapterExecutor":
+        """Build an executor with the configuration of the manager's current ``executor``."""
+        replacement = cls(
+            config=executor.config, timeout=executor.timeout, observability=executor.observability, **options
+        )
+        replacement.hook_policies = executor.hook_policies
+        replacement.default_hook_policy = executor.default_hook_policy
+        return replacement
+
+    @property
+    def abandoned(self) -> int:
+        """Number of cancelled plugin invocations that have not finished yet."""
+        return len(self._abandoned)
+
+    async def execute(
+        self,
+        hook_refs: list[HookRef],
+        payload: PluginPayload,
+        global_context: GlobalContext,
+        hook_type: str,
+        local_contexts: Optional[PluginContextTable] = None,
+        violations_as_exceptions: bool = False,
+        extensions: Optional[Extensions] = None,
+    ) -> tuple[PluginResult, PluginContextTable | None]:
+        run = self._execute(
+            hook_refs, payload, global_context, hook_type, local_contexts, violations_as_exceptions, extensions
+        )
+        record = request_record.get() if self.record_requests else None
+        if record is None and self.audit_log is None:
+            return await run
+        start = time.perf_counter()
+        try:
+            result, contexts = await run
+        except PluginViolationError as e:
+            self._report(record, start, hook_type, payload, global_context, True, e.violation, None)
+            raise
+        blocked = not result.continue_processing
+        self._report(record, start, hook_type, payload, global_context, blocked, result.violation, result.metadata)
+        return result, contexts
+
+    def _report(
+        self,
+        record: Optional[RequestRecord],
+        start: float,
+        hook_type: str,
+        payload: PluginPayload,
+        global_context: GlobalContext,
+        blocked: bool,
+        violation: Optional[PluginViolation],
+        metadata: Optional[dict[str, Any]],
+    ) -> None:
+        """Record the duration and verdict of a hook invocation that started at ``start``."""
+        seconds = time.perf_counter() - start
+        if record is not None:
+            record.add_timing(hook_type, seconds)
+            record.add_verdict(hook_type, seconds, blocked, violation, metadata)
+        if self.audit_log is not None:
+            reported = violation if blocked else None
+            self.audit_log.record(
+                global_context.request_id,
+                getattr(payload, "name", None),
+                hook_type,
+                reported.plugin_name if reported else None,
+                "deny" if blocked else "allow",
+                reported.code if reported else None,
+                seconds,
+                enforced=enforcing.get(),
+            )
+
+    async def _execute(
+        self,
+        hook_refs: list[HookRef],
+        payload: PluginPayload,
+        global_context: GlobalContext,
+        hook_type: str,
+        local_contexts: Optional[PluginContextTable],
+        violations_as_exceptions: bool,
+        extensions: Optional[Extensions],
+    ) -> tuple[PluginResult, PluginContextTable | None]:
+        concurrent_refs = [ref for ref in hook_refs if ref.plugin_ref.mode == PluginMode.CONCURRENT]
+        if not self.first_deny_wins or not concurrent_refs:
+            return await super().execute(
+                hook_refs, payload, global_context, hook_type, local_contexts, violations_as_exceptions, extensions
+            )
+        # Fire-and-forget plugins may have side effects, so they wait for the band's verdict
+        background_modes = (PluginMode.CONCURRENT, PluginMode.FIRE_AND_FORGET)
+        serial_refs = [ref for ref in hook_refs if ref.plugin_ref.mode not in background_modes]
+        fire_and_forget_refs = [ref for ref in hook_refs if ref.plugin_ref.mode == PluginMode.FIRE_AND_FORGET]
+        result, contexts = await super().execute(
+            serial_refs, payload, global_context, hook_type, local_contexts, violations_as_exceptions, extensions
+        )
+        if not result.continue_processing:
+            return result, contexts
+        # Conditions and runtime-disabled plugins are applied as for the other phases
+        _, _, _, concurrent_refs, fire_and_forget_refs = self._group_by_mode(
+            concurrent_refs + fire_and_forget_refs, payload, hook_type, global_context, ExecutionContext()
+        )
+        effective_payload = result.modified_payload if result.modified_payload is not None else payload
+        contexts = dict(contexts or {})
+        metadata = dict(result.metadata or {})
+        blocked = await self._run_concurrent_band(
+            concurrent_refs,
+            effective_payload,
+            global_context,
+            hook_type,
+            local_contexts,
+            contexts,
+            metadata,
+            violations_as_exceptions,
+            extensions,
+        )
+        background_tasks = list(result.background_tasks or [])
+        if blocked is None and fire_and_forget_refs:
+            semaphore = asyncio.Semaphore(int(settings.execution_pool)) if settings.execution_pool else None
+            background_tasks += self._fire_and_forget_tasks(
+                fire_and_forget_refs, payload, global_context, contexts, semaphore, extensions=extensions
+            )
+        return (
+            PluginResult(
+                continue_processing=blocked is None,
+                modified_payload=result.modified_payload,
+                modified_extensions=result.modified_extensions,
+                violation=blocked.violation if blocked else None,
+                metadata=metadata,
+                background_tasks=background_tasks,
+                retry_delay_ms=max(result.retry_delay_ms, blocked.retry_delay_ms if blocked else 0),
+            ),
+            contexts,
+        )
+
+    def _group_by_mode(
+        self,
+        hook_refs: list[HookRef],
+        payload: PluginPayload,
+        hook_type: str,
+        global_context: GlobalContext,
+        ctx: ExecutionContext,
+    ) -> tuple[list[HookRef], list[HookRef], list[HookRef], list[HookRef], list[HookRef]]:
+        groups = super()._group_by_mode(hook_refs, payload, hook_type, global_context, ctx)
+        sequential_refs = groups[0]
+        if self.cost_model is None or len(sequential_refs) < 2:
+            return groups
+        tool = _tool_name(payload)
+        by_name = {ref.plugin_ref.name: ref for ref in sequential_refs}
+        order = self.cost_model.order(hook_type, tool, list(by_name))
+        if order.saving > 0:
+            # The estimates can rate the chosen order slower; counters only go up
+            metrics.PLUGIN_ORDER_SAVED.labels(hook=hook_type).inc(order.saving)
+        if order.chosen == order.configured:
+            return groups
+        logger.debug("Running %s plugins for %s as %s", hook_type, tool, order.chosen)
+        return ([by_name[name] for name in order.chosen], *groups[1:])
+
+    async def execute_plugin(
+        self,
+        hook_ref: HookRef,
+        payload: PluginPayload,
+        local_context: Any,
+        violations_as_exceptions: bool,
+        global_context: Optional[GlobalContext] = None,
+        combined_metadata: Optional[dict[str, Any]] = None,
+        extensions: Optional[Extensions] = None,
+    ) -> PluginResult:
+        run = super().execute_plugin(
+            hook_ref, payload, local_context, violations_as_exceptions, global_context, combined_metadata, extensions
+        )
+        if self.activity is not None:
+            run = self.activity.track(hook_ref.plugin_ref.name, run)
+        if self.record_requests:
+            run = timed(f"{hook_ref.name}.{hook_ref.plugin_ref.name}", run)
+        if self.cost_model is None or hook_ref.plugin_ref.mode != PluginMode.SEQUENTIAL:
+            return await run
+        start = time.perf_counter()
+        try:
+            result = await run
+        except PluginViolationError:
+            self._record_cost(hook_ref, payload, time.perf_counter() - start, blocked=True, modified=False)
+            raise
+        self._record_cost(
+            hook_ref,
+            payload,
+            time.perf_counter() - start,
+            blocked=not result.continue_processing,
+            modified=result.modified_payload is not None,
+        )
+        return result
+
+    def _record_cost(self, hook_ref: HookRef, payload: PluginPayload, seconds: float, blocked: bool, modified: bool):
+        self.cost_model.record(hook_ref.name, _tool_name(payload), hook_ref.plugin_ref.name, seconds, blocked, modified)
+
+    async def _execute_with_timeout(
+        self,
+        hook_ref: HookRef,
+        payload: PluginPayload,
+        context: Any,
+        extensions: Optional[Extensions] = None,
+    ) -> PluginResult:
+        offload = self.offloads.get(hook_ref.plugin_ref.name)
+        if offload is not None:
+            hook_ref = OffloadedHookRef(hook_ref, offload)
+        return await super()._execute_with_timeout(hook_ref, payload, context, extensions=extensions)
+
+    async def _run_concurrent_band(
+        self,
+        refs: list[HookRef],
+        payload: PluginPayload,
+        global_context: GlobalContext,
+        hook_type: str,
+        local_contexts: Optional[PluginContextTable],
+        res_local_contexts: dict,
+        combined_metadata: dict[str, Any],
+        violations_as_exceptions: bool,
+        extensions: Optional[Extensions],
+    ) -> Optional[PluginResult]:
+        """Run ``refs`` concurrently.
+
+        Returns:
+            The result of the first plugin to block, or None if none blocked.
+        """
+        policy = self.hook_policies.get(hook_type)
+        semaphore = asyncio.Semaphore(int(settings.execution_pool)) if settings.execution_pool else None
+        tasks: dict[asyncio.Task, HookRef] = {}
+        for ref in refs:
+            local_context = self._prepare_plugin_context(ref, global_context, local_contexts, res_local_contexts)
+            coro = self.execute_plugin(
+                ref,
+                self._isolate_payload(payload, policy),
+                local_context,
+                violations_as_exceptions,
+                global_context,
+                combined_metadata,
+                extensions=extensions,
+            )
+            if semaphore:
+                coro = self._with_semaphore(semaphore, coro)
+            tasks[asyncio.ensure_future(coro)] = ref
+        try:
+            for completed in asyncio.as_completed(tasks):
+                result = await completed
+                if not result.continue_processing:
+                    return result
+            return None
+        finally:
+            pending = [task for task in tasks if not task.done()]
+            if pending:
+                logger.info(
+                    "First deny on hook %s; cancelling %s",
+                    hook_type,
+                    ", ".join(tasks[task].plugin_ref.name for task in pending),
+                )
+            for task in pending:
+                task.cancel()
+                self._abandoned.add(task)
+                name = tasks[task].plugin_ref.name
+                task.add_done_callback(lambda done, name=name: self._record(done, hook_type, name))
+
+    def _record(self, task: asyncio.Task, hook_type: str, plugin: str) -> None:
+        """Record how a plugin cancelled after the first deny ended."""
+        self._abandoned.discard(task)
+        if task.cancelled():
+            outcome = "cancelled"
+        elif task.exception() is not None:
+            outcome = "error"
+        else:
+            # The plugin did not yield to the cancellation before it finished
+            outcome = "allowed" if task.result().continue_processing else "blocked"
+        logger.info("Plugin %s on hook %s abandoned after first deny: %s", plugin, hook_type, outcome)
+        metrics.PLUGINS_ABANDONED.labels(hook=hook_type, plugin=plugin, outcome=outcome).inc()
+
+
+def _tool_name(payload: PluginPayload) -> str:
+    """The tool (or prompt) a hook payload is for."""
+    return getattr(payload, "name", None) or getattr(payload, "prompt_id", None) or ""
@@ -0,0 +1,104 @@
+"""Live state of the adapter, for the admin endpoints.
+
+``PluginActivity`` counts the in-flight invocations of each plugin and keeps
+its recent latencies; ``AdapterExecutor`` feeds it when the admin endpoints
+are enabled. ``channelz`` reads gRPC's channelz data for the adapter's
+server and channels; it needs the optional ``grpcio-channelz`` package.
+"""
+
+# Standard
+import time
+from collections import deque
+from typing import Any, Awaitable, Optional
+
+# First-Party
+from cpex.framework.errors import PluginViolationError
+
+try:
+    # Third-Party
+    from google.protobuf import json_format
+    from grpc_channelz.v1 import channelz, channelz_pb2
+except ImportError:  # pragma: no cover - optional dependency
+    channelz = None
+
+
+class _Activity:
+    __slots__ = ("in_flight", "calls", "blocked", "errors", "latencies")
+
+    def __init__(self, window: int):
+        self.in_flight = 0
+        self.calls = 0
+        self.blocked = 0
+        self.errors = 0
+        self.latencies: deque[float] = deque(maxlen=window)
+
+
+def _quantile(ordered: list[float], q: float) -> float:
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)] if ordered else 0.0
+
+
+class PluginActivity:
+    """In-flight invocations and recent latencies of each plugin.
+
+    Attributes:
+        window: Latencies kept per plugin; the oldest are dropped first.
+    """
+
+    def __init__(self, window: int = 256):
+        self.window = window
+        self._plugins: dict[str, _Activity] = {}
+
+    async def track(self, plugin: str, run: Awaitable[Any]) -> Any:
+        """Await ``run``, an invocation of ``plugin``, counting it while in flight."""
+        activity = self._plugins.get(plugin)
+        if activity is None:
+            activity = self._plugins[plugin] = _Activity(self.window)
+        activity.in_flight += 1
+        start = time.perf_counter()
+        try:
+            result = await run
+        except PluginViolationError:
+            activity.blocked += 1
+            raise
+        except Exception:
+            activity.errors += 1
+            raise
+        else:
+            activity.blocked += not result.continue_processing
+            return result
+        finally:
+            activity.in_flight -= 1
+            activity.calls += 1
+            activity.latencies.append(time.perf_counter() - start)
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        """Counts and recent latency quantiles (in seconds) of each plugin that ran."""
+        plugins = {}
+        for name, activity in self._plugins.items():
+            ordered = sorted(activity.latencies)
+            plugins[name] = {
+                "in_flight": activity.in_flight,
+                "calls": activity.calls,
+                "blocked": activity.blocked,
+                "errors": activity.errors,
+                "latency": {
+                    "samples": len(ordered),
+                    "p50": _quantile(ordered, 0.5),
+                    "p99": _quantile(ordered, 0.99),
+                    "max": ordered[-1] if ordered else 0.0,
+                },
+            }
+        return plugins
+
+
+def channelz_state() -> Optional[dict[str, Any]]:
+    """The channelz data of the process's servers and top-level channels, or None without ``grpcio-channelz``."""
+    if channelz is None:
+        return None
+    servicer = channelz.ChannelzServicer
+    servers = servicer.GetServers(channelz_pb2.GetServersRequest(), None)
+    channels = servicer.GetTopChannels(channelz_pb2.GetTopChannelsRequest(), None)
+    return {
+        "servers": json_format.MessageToDict(servers).get("server", []),
+        "channels": json_format.MessageToDict(channels).get("channel", []),
+    }
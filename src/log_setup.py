@@ -0,0 +1,192 @@
+"""Logging for the request path: categories, sampled payloads and a queue handler.
+
+Messages of the request path go to child loggers of ``ext-proc-PM``, one per
+category, whose levels can be set apart from ``LOGLEVEL``:
+
+``ext-proc-PM.stream``
+    Per-message progress of the ext_proc streams (chunks buffered, end of stream).
+``ext-proc-PM.payload``
+    Bodies, hook payloads, plugin results and ProcessingResponses. A
+    ``PayloadFilter`` samples these messages and truncates their arguments.
+
+Messages are formatted lazily (``logger.debug("... %s", body)``), so nothing
+is formatted for a disabled level or a message left out of the sample.
+``configure_logging`` moves the output off the event loop: records go
+through a bounded queue to a thread writing to stderr, and records that find
+the queue full are dropped and counted.
+"""
+
+# Standard
+import logging
+import queue
+import random
+import reprlib
+import sys
+from collections.abc import Mapping, Sequence
+from itertools import islice
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Optional
+
+# Third-Party
+from google.protobuf.message import Message
+from pydantic import BaseModel
+
+# Local
+import metrics
+
+LOGGER_NAME = "ext-proc-PM"
+
+# Same layout as logging.basicConfig
+LOG_FORMAT = "%(levelname)s:%(name)s:%(message)s"
+
+
+class PayloadFilter(logging.Filter):
+    """Keep a ``sample_rate`` share of the records, with their arguments cut to ``max_chars``.
+
+    Attributes:
+        sample_rate: Share of the records kept, from 0 to 1.
+        max_chars: Longest formatted argument; 0 does not truncate.
+    """
+
+    def __init__(self, sample_rate: float = 1.0, max_chars: int = 4096):
+        super().__init__()
+        self.sample_rate = sample_rate
+        self.max_chars = max_chars
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return False
+        if self.max_chars and isinstance(record.args, tuple):
+            record.args = tuple(self._truncate(arg) for arg in record.args)
+        return True
+
+    def _truncate(self, arg: Any) -> Any:
+        if isinstance(arg, (int, float)):
+            return arg
+        if isinstance(arg, str):
+            if len(arg) <= self.max_chars:
+                return arg
+            return f"{arg[: self.max_chars]}... ({len(arg)} chars)"
+        if isinstance(arg, (bytes, bytearray)) and len(arg) > self.max_chars:
+            return f"{arg[: self.max_chars]!r}... ({len(arg)} bytes)"
+        text = _PayloadRepr(self.max_chars).repr(arg)
+        if len(text) <= self.max_chars:
+            return text
+        return f"{text[: self.max_chars]}..."
+
+
+class _PayloadRepr(reprlib.Repr):
+    """``reprlib.Repr`` that stops formatting an argument once ``max_chars`` are written.
+
+    Bytes are sliced before their repr, and protobuf messages, pydantic models
+    and protobuf containers are walked field by field, so a large body is never
+    formatted in full. One instance formats one argument.
+
+    Attributes:
+        left: Characters left to write; past 0, values are written as ``...``.
+    """
+
+    def __init__(self, max_chars: int):
+        super().__init__()
+        self.maxlevel = 10
+        self.maxstring = self.maxlong = self.maxother = max_chars
+        self.maxtuple = self.maxlist = self.maxarray = self.maxdict = max_chars
+        self.maxset = self.maxfrozenset = self.maxdeque = max_chars
+        self.left = max_chars
+
+    def repr1(self, x: Any, level: int) -> str:
+        if self.left <= 0:
+            return self.fillvalue
+        left = self.left
+        if isinstance(x, Message):
+            text = self._repr_fields(x, ((field.name, value) for field, value in x.ListFields()), level)
+        elif isinstance(x, BaseModel):
+            text = self._repr_fields(x, iter(x.__dict__.items()), level)
+        elif isinstance(x, Mapping) and not isinstance(x, dict):
+            text = self.repr_dict(dict(islice(x.items(), self.maxdict + 1)), level)
+        elif isinstance(x, Sequence) and not isinstance(x, (str, bytes, bytearray, list, tuple, range)):
+            text = self.repr_list(list(islice(x, self.maxlist + 1)), level)
+        else:
+            text = super().repr1(x, level)
+        self.left = left - len(text)
+        return text
+
+    def repr_bytes(self, x: bytes, level: int) -> str:
+        if len(x) <= self.maxstring:
+            return repr(x)
+        return f"{x[: self.maxstring]!r}{self.fillvalue} ({len(x)} bytes)"
+
+    repr_bytearray = repr_bytes
+
+    def _repr_fields(self, x: Any, fields: Any, level: int) -> str:
+        name = type(x).__name__
+        if level <= 0:
+            return f"{name}({self.fillvalue})"
+        parts = []
+        for key, value in fields:
+            if self.left <= 0:
+                parts.append(self.fillvalue)
+                break
+            parts.append(f"{key}={self.repr1(value, level - 1)}")
+        return f"{name}({', '.join(parts)})"
+
+
+class DroppingQueueHandler(QueueHandler):
+    """``QueueHandler`` that drops records when its queue is full instead of blocking or raising.
+
+    Attributes:
+        dropped: Records dropped so far.
+    """
+
+    def __init__(self, records: queue.Queue):
+        super().__init__(records)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            metrics.LOG_RECORDS_DROPPED.inc()
+
+
+def category_logger(category: str) -> logging.Logger:
+    """The logger of ``category``, e.g. ``payload``."""
+    return logging.getLogger(f"{LOGGER_NAME}.{category}")
+
+
+def configure_logging(
+    categories: Optional[dict[str, str]] = None,
+    payload_sample_rate: float = 1.0,
+    payload_max_chars: int = 4096,
+    queue_size: int = 10000,
+) -> Optional[QueueListener]:
+    """Set the category levels and payload sampling, and write log records from a background thread.
+
+    Args:
+        categories: Level by category, e.g. ``{"payload": "DEBUG"}``; other categories follow ``LOGLEVEL``.
+        payload_sample_rate: Share of the ``payload`` messages logged.
+        payload_max_chars: Longest argument of a ``payload`` message.
+        queue_size: Records waiting to be written; 0 writes them on the logging thread.
+
+    Returns:
+        The started listener writing the queued records, to ``stop`` on shutdown; None if ``queue_size`` is 0.
+    """
+    for category, level in (categories or {}).items():
+        category_logger(category).setLevel(level.upper())
+    payload_logger = category_logger("payload")
+    for old in [f for f in payload_logger.filters if isinstance(f, PayloadFilter)]:
+        payload_logger.removeFilter(old)
+    payload_logger.addFilter(PayloadFilter(payload_sample_rate, payload_max_chars))
+    if not queue_size:
+        return None
+    root = logging.getLogger()
+    stderr = logging.StreamHandler(sys.stderr)
+    stderr.setFormatter(logging.Formatter(LOG_FORMAT))
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    handler = DroppingQueueHandler(queue.Queue(queue_size))
+    root.addHandler(handler)
+    listener = QueueListener(handler.queue, stderr, respect_handler_level=True)
+    listener.start()
+    return listener
@@ -0,0 +1,123 @@
+"""Event-loop lag monitor that names the plugin blocking the loop.
+
+Every stream the adapter serves shares one event loop, so a plugin hook that
+makes a blocking call (``requests.post``) or runs CPU-heavy code stalls all
+of them. ``LoopMonitor.run`` sleeps ``interval`` seconds at a time on the
+loop and measures how late it wakes up: the scheduling delay every other
+coroutine sees too.
+
+A watchdog thread notices when the loop has not woken up ``threshold``
+seconds past its deadline and takes the loop thread's stack, while it is
+still blocked. The stall is attributed to the outermost ``Plugin`` method on
+that stack, normally the hook, and counted per plugin and hook once the loop
+is running again. The stack is logged at most once per ``log_interval`` per
+plugin and hook.
+
+The cost is one timer on the loop per ``interval`` and one thread waking up
+every ``threshold / 2``; stacks are only taken during stalls.
+"""
+
+# Standard
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from types import FrameType
+from typing import Optional
+
+# Third-Party
+from cpex.framework import Plugin
+
+# Local
+import metrics
+
+logger = logging.getLogger("ext-proc-PM")
+
+# Plugin and hook of stalls that happen outside any plugin
+UNATTRIBUTED = ("unknown", "")
+
+
+def blocking_plugin(frame: Optional[FrameType]) -> tuple[str, str]:
+    """Return the plugin and method running in ``frame`` or its callers, outermost first."""
+    found = UNATTRIBUTED
+    while frame is not None:
+        code = frame.f_code
+        # Only methods are candidates; avoid f_locals on every frame
+        if code.co_argcount and code.co_varnames[0] == "self":
+            owner = frame.f_locals.get("self")
+            if isinstance(owner, Plugin):
+                found = (owner.name, code.co_name)
+        frame = frame.f_back
+    return found
+
+
+class LoopMonitor:
+    """Measures the scheduling delay of the running event loop.
+
+    Attributes:
+        interval: Seconds between measurements.
+        threshold: Delay, in seconds, from which the loop counts as blocked.
+        log_interval: Minimum seconds between two logged stacks of the same plugin and hook.
+        blocking: Seconds the loop was blocked, by (plugin, hook).
+    """
+
+    def __init__(self, interval: float = 0.1, threshold: float = 0.1, log_interval: float = 60.0):
+        self.interval = interval
+        self.threshold = threshold
+        self.log_interval = log_interval
+        self.blocking: dict[tuple[str, str], float] = {}
+        self._lock = threading.Lock()
+        self._beat = 0.0
+        # Stall seen by the watchdog: (beat it started after, plugin, hook, stack)
+        self._stall: Optional[tuple[float, str, str, list[str]]] = None
+        self._logged: dict[tuple[str, str], float] = {}
+
+    async def run(self) -> None:
+        """Measure the loop's delay every ``interval`` seconds until cancelled."""
+        stopped = threading.Event()
+        watchdog = threading.Thread(
+            target=self._watch, args=(threading.get_ident(), stopped), name="loop-watchdog", daemon=True
+        )
+        self._beat = time.monotonic()
+        watchdog.start()
+        try:
+            while True:
+                await asyncio.sleep(self.interval)
+                now = time.monotonic()
+                self._record(now - self._beat - self.interval)
+                self._beat = now
+        finally:
+            stopped.set()
+
+    def _watch(self, loop_thread: int, stopped: threading.Event) -> None:
+        while not stopped.wait(self.threshold / 2):
+            beat = self._beat
+            if time.monotonic() - beat < self.interval + self.threshold:
+                continue
+            with self._lock:
+                if self._stall is not None and self._stall[0] == beat:
+                    continue
+                frame = sys._current_frames().get(loop_thread)
+                plugin, hook = blocking_plugin(frame)
+                self._stall = (beat, plugin, hook, traceback.format_stack(frame) if frame else [])
+
+    def _record(self, lag: float) -> None:
+        metrics.EVENT_LOOP_LAG.observe(max(lag, 0.0))
+        with self._lock:
+            stall, self._stall = self._stall, None
+        if lag < self.threshold:
+            return
+        plugin, hook, stack = stall[1:] if stall is not None and stall[0] == self._beat else (*UNATTRIBUTED, [])
+        self.blocking[(plugin, hook)] = self.blocking.get((plugin, hook), 0.0) + lag
+        metrics.LOOP_BLOCKED_SECONDS.labels(plugin=plugin, hook=hook).inc(lag)
+        now = time.monotonic()
+        if stack and now - self._logged.get((plugin, hook), -self.log_interval) >= self.log_interval:
+            self._logged[(plugin, hook)] = now
+            logger.warning(
+                "Event loop blocked for %.0f ms by %s; stack:\n%s",
+                lag * 1000,
+                f"{plugin}.{hook}" if hook else plugin,
+                "".join(stack),
+            )
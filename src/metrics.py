@@ -0,0 +1,105 @@
+"""Prometheus metrics exported by the adapter.
+
+Metrics are defined once at import time on the default registry. The exporter
+is only started when ``adapter_settings.metrics_port`` is set.
+"""
+
+# Third-Party
+from prometheus_client import REGISTRY, Counter, Gauge, Histogram, start_http_server
+
+AUDIT_VERDICTS = Counter(
+    "plugins_adapter_audit_verdicts_total",
+    "Verdicts of hooks run in audit (shadow) mode",
+    ["hook", "verdict"],
+)
+
+AUDIT_DROPPED = Counter(
+    "plugins_adapter_audit_dropped_total",
+    "Audit-mode hook invocations dropped because the background queue was full",
+    ["hook"],
+)
+
+AUDIT_LOG_DROPPED = Counter(
+    "plugins_adapter_audit_log_dropped_total",
+    "Audit log records dropped because the writer's queue was full",
+)
+
+LOG_RECORDS_DROPPED = Counter(
+    "plugins_adapter_log_records_dropped_total",
+    "Log records dropped because the queue to the log writer thread was full",
+)
+
+BUFFERED_BODY_BYTES = Gauge(
+    "plugins_adapter_buffered_body_bytes",
+    "Bytes of request and response bodies currently buffered",
+    ["storage"],
+)
+
+BODIES_OVER_LIMIT = Counter(
+    "plugins_adapter_bodies_over_limit_total",
+    "Bodies that exceeded the buffering limits, by handling policy",
+    ["phase", "policy"],
+)
+
+PLUGINS_ABANDONED = Counter(
+    "plugins_adapter_plugins_abandoned_total",
+    "Concurrent plugins cancelled after another plugin of the band blocked, by how they ended",
+    ["hook", "plugin", "outcome"],
+)
+
+PLUGIN_ORDER_SAVED = Counter(
+    "plugins_adapter_plugin_order_saved_seconds",
+    "Estimated seconds saved by reordering sequential plugins, summed over the invocations of each hook",
+    ["hook"],
+)
+
+THREAD_POOL_HOOKS = Gauge(
+    "plugins_adapter_thread_pool_hooks",
+    "Plugin hooks in the thread pool, waiting for a thread or running",
+    ["state"],
+)
+
+THREAD_POOL_WAIT = Histogram(
+    "plugins_adapter_thread_pool_wait_seconds",
+    "Time plugin hooks waited for a free thread",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0),
+)
+
+THREAD_POOL_REJECTED = Counter(
+    "plugins_adapter_thread_pool_rejected_total",
+    "Plugin hooks failed because the thread pool and its queue were full",
+)
+
+PROCESS_POOL_WORKERS = Gauge(
+    "plugins_adapter_process_pool_workers",
+    "Worker processes of executor: process plugins, idle or busy with a call",
+    ["plugin", "state"],
+)
+
+PROCESS_POOL_RESTARTS = Counter(
+    "plugins_adapter_process_pool_restarts_total",
+    "Worker processes replaced, by reason (died, hung, unhealthy)",
+    ["plugin", "reason"],
+)
+
+EVENT_LOOP_LAG = Histogram(
+    "plugins_adapter_event_loop_lag_seconds",
+    "How late a timer on the event loop fired, sampled periodically",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0),
+)
+
+LOOP_BLOCKED_SECONDS = Counter(
+    "plugins_adapter_loop_blocked_seconds_total",
+    "Seconds the event loop was blocked past the lag threshold, by the plugin and hook running then",
+    ["plugin", "hook"],
+)
+
+
+def register_collector(collector) -> None:
+    """Add a collector computing its metrics at scrape time to the default registry."""
+    REGISTRY.register(collector)
+
+
+def start_metrics_server(port: int) -> None:
+    """Serve the default registry on ``port`` from a background thread."""
+    start_http_server(port)
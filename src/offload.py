@@ -0,0 +1,121 @@
+"""Run plugin hooks off the event loop, in a bounded thread pool.
+
+A plugin hook is a coroutine, but plugins such as NemoCheck make blocking
+HTTP calls or run CPU-heavy code inside it, stalling every stream served by
+the grpc.aio event loop. Plugins configured with ``executor: thread`` have
+their hook coroutines run to completion on a worker thread, each worker
+driving its own event loop, while the main loop awaits the result.
+
+At most ``max_workers`` hooks run at once and at most ``max_queue`` more
+wait for a worker; past that a hook fails at once with ``PoolSaturatedError``
+and the plugin's ``on_error`` setting applies. A hook that times out or is
+cancelled while queued never runs; one that is already running finishes on
+its thread, since threads cannot be interrupted.
+"""
+
+# Standard
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Coroutine
+
+# Local
+import metrics
+
+logger = logging.getLogger("ext-proc-PM")
+
+
+class PoolSaturatedError(RuntimeError):
+    """Raised when a hook is offloaded while the pool and its queue are full."""
+
+
+class ThreadOffload:
+    """A bounded pool of threads running hook coroutines.
+
+    Attributes:
+        max_workers: Threads running hooks.
+        max_queue: Hooks that may wait for a free thread.
+        pending: Hooks submitted and not finished, queued or running.
+    """
+
+    def __init__(self, max_workers: int = 8, max_queue: int = 64):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.pending = 0
+        # ``pending`` drops on the worker thread that finishes the hook
+        self._pending_lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="plugin-hook")
+        self._local = threading.local()
+
+    async def run(self, coro: Coroutine[Any, Any, Any], label: str = "") -> Any:
+        """Run ``coro`` on a worker thread and return its result."""
+        if self.pending >= self.max_workers + self.max_queue:
+            coro.close()
+            metrics.THREAD_POOL_REJECTED.inc()
+            raise PoolSaturatedError(f"Plugin thread pool full ({self.pending} pending); not running {label}")
+        with self._pending_lock:
+            self.pending += 1
+        metrics.THREAD_POOL_HOOKS.labels(state="queued").inc()
+        future = self._pool.submit(self._run, coro, time.perf_counter())
+        # A caller that stops waiting (a hook timeout) leaves the hook running: it stays pending until it ends
+        future.add_done_callback(lambda done: self._finished(done, coro))
+        return await asyncio.wrap_future(future)
+
+    def _finished(self, future: Future, coro: Coroutine[Any, Any, Any]) -> None:
+        with self._pending_lock:
+            self.pending -= 1
+        _close_unstarted(future, coro)
+
+    def _run(self, coro: Coroutine[Any, Any, Any], submitted: float) -> Any:
+        metrics.THREAD_POOL_HOOKS.labels(state="queued").dec()
+        metrics.THREAD_POOL_WAIT.observe(time.perf_counter() - submitted)
+        metrics.THREAD_POOL_HOOKS.labels(state="running").inc()
+        try:
+            loop = getattr(self._local, "loop", None)
+            if loop is None:
+                loop = self._local.loop = asyncio.new_event_loop()
+            return loop.run_until_complete(coro)
+        finally:
+            metrics.THREAD_POOL_HOOKS.labels(state="running").dec()
+
+    def wrap(self, hook_ref: Any) -> Callable[..., Awaitable[Any]]:
+        """Return ``hook_ref``'s hook with its coroutines run on the pool."""
+        hook = hook_ref.hook
+        label = f"{hook_ref.plugin_ref.name}.{hook_ref.name}"
+
+        def offloaded(*args: Any) -> Awaitable[Any]:
+            return self.run(hook(*args), label)
+
+        return offloaded
+
+    async def shutdown(self) -> None:
+        """Drop queued hooks and stop the workers once running hooks finish."""
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _close_unstarted(future: Future, coro: Coroutine[Any, Any, Any]) -> None:
+    if future.cancelled():
+        # Cancelled while queued: the coroutine was never started
+        metrics.THREAD_POOL_HOOKS.labels(state="queued").dec()
+        coro.close()
+
+
+class OffloadedHookRef:
+    """A ``HookRef`` whose hook runs on an offload; everything else is delegated.
+
+    The offload is a ``ThreadOffload``, a ``process_pool.ProcessOffload`` or a
+    ``subinterpreters.InterpreterOffload``.
+    """
+
+    def __init__(self, hook_ref: Any, offload: Any):
+        self._hook_ref = hook_ref
+        self._hook = offload.wrap(hook_ref)
+
+    @property
+    def hook(self) -> Callable[..., Awaitable[Any]]:
+        return self._hook
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._hook_ref, name)
@@ -0,0 +1,129 @@
+"""Keep large binary (base64) JSON strings out of parsed payloads.
+
+Tool results carry images, audio and embedded resources as base64 strings
+(``data`` and ``blob`` members), and ``tools/call`` arguments can carry
+similar blobs. Text guardrails never read them, yet decoding them into Python
+strings and re-serializing them costs more than the rest of the message.
+
+``strip_opaque`` scans the raw body bytes for such strings and replaces each
+one with a short placeholder before the body is parsed. Only strings that
+are valid standard base64 qualify, so text cannot be hidden from the plugins
+by making it merely look like base64. The original bytes
+are never decoded; ``OpaqueBody.restore`` puts them back into any body
+serialized from the parsed message, and plugins that do need the binary
+data can look a placeholder up in ``GlobalContext.metadata[OPAQUE_METADATA_KEY]``.
+"""
+
+# Standard
+import re
+import secrets
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Iterable, Optional
+
+# Local
+from body_rewriter import Body
+
+# GlobalContext.metadata key mapping placeholder -> memoryview of the base64 text
+OPAQUE_METADATA_KEY = "opaque_content"
+
+# MCP members holding base64 binary data (ImageContent/AudioContent.data, BlobResourceContents.blob)
+BINARY_CONTENT_KEYS = ("data", "blob")
+
+# Standard base64: no base64url characters and no JSON escapes, padding only at the end
+_BASE64 = rb"[A-Za-z0-9+/]{%d,}={0,2}"
+
+
+@lru_cache(maxsize=8)
+def _pattern(min_bytes: int, keys: Optional[tuple[str, ...]]) -> re.Pattern:
+    # A JSON string's opening quote is never preceded by a backslash
+    value = rb'(?<!\\)"(?P<value>' + _BASE64 % min_bytes + rb')"'
+    if keys is None:
+        return re.compile(value)
+    names = b"|".join(re.escape(key.encode("utf-8")) for key in keys)
+    return re.compile(rb'(?<!\\)"(?:' + names + rb')"\s*:\s*' + value)
+
+
+def pattern_cache_info():
+    """Hits, misses and size of the cache of compiled placeholder patterns."""
+    return _pattern.cache_info()
+
+
+@dataclass
+class OpaqueBody:
+    """A body with its large binary strings replaced by placeholders.
+
+    Attributes:
+        text: The body with placeholders; small enough to parse cheaply.
+        source: The original body.
+        spans: Byte spans in ``source`` of each replaced string's contents.
+        nonce: Random per-body token that makes the placeholders unambiguous.
+    """
+
+    text: bytes
+    source: Body
+    spans: list[tuple[int, int]]
+    nonce: str
+
+    def placeholder(self, index: int) -> str:
+        start, end = self.spans[index]
+        return placeholder(self.nonce, index, end - start)
+
+    def blobs(self) -> dict[str, memoryview]:
+        """Map each placeholder to a view of the base64 text it replaced."""
+        view = memoryview(self.source)
+        return {self.placeholder(i): view[start:end] for i, (start, end) in enumerate(self.spans)}
+
+    def restore(self, data: bytes) -> bytes:
+        """Replace the placeholders in serialized ``data`` with the original bytes."""
+        marker = re.compile(rb"<opaque:" + self.nonce.encode("ascii") + rb":(\d+) \d+ bytes>")
+        view = memoryview(self.source)
+        parts = []
+        pos = 0
+        for match in marker.finditer(data):
+            start, end = self.spans[int(match.group(1))]
+            parts.append(data[pos : match.start()])
+            parts.append(view[start:end])
+            pos = match.end()
+        if not parts:
+            return data
+        parts.append(data[pos:])
+        return b"".join(parts)
+
+
+def placeholder(nonce: str, index: int, size: int) -> str:
+    return f"<opaque:{nonce}:{index} {size} bytes>"
+
+
+def strip_opaque(body: Body, min_bytes: int, keys: Optional[Iterable[str]] = None) -> Optional[OpaqueBody]:
+    """Replace valid base64 strings of at least ``min_bytes`` characters with placeholders.
+
+    Args:
+        body: The raw JSON (or SSE) body.
+        min_bytes: Minimum string length to treat as opaque; 0 disables stripping.
+        keys: Only strip values of these member names; any string value if None.
+
+    Returns:
+        The stripped body, or None if there was nothing to strip.
+    """
+    if not min_bytes or len(body) < min_bytes:
+        return None
+    pattern = _pattern(min_bytes, tuple(keys) if keys is not None else None)
+    nonce = secrets.token_hex(4)
+    view = memoryview(body)
+    parts = []
+    spans = []
+    pos = 0
+    for match in pattern.finditer(body):
+        start, end = match.span("value")
+        if (end - start) % 4:
+            # Not whole base64 quanta: not binary content, leave it to the plugins
+            continue
+        parts.append(view[pos:start])
+        parts.append(placeholder(nonce, len(spans), end - start).encode("ascii"))
+        spans.append((start, end))
+        pos = end
+    if not spans:
+        return None
+    parts.append(view[pos:])
+    return OpaqueBody(b"".join(parts), body, spans, nonce)
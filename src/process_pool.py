@@ -0,0 +1,453 @@
+"""Run a plugin's hooks in a pool of worker processes.
+
+Threads do not help CPU-bound guardrails (local classifiers, large regex
+suites) because of the GIL. Plugins configured with ``executor: process`` run
+in a ``ProcessOffload``: a few worker processes, each of which loads and
+initializes its own instance of the plugin once, then serves hook calls.
+
+A hook call sends the payload and the plugin context to an idle worker and
+applies what the hook did to the context (``state``, ``metadata`` and the
+global context's ``state`` and changed ``metadata``) back to the caller's
+objects, so a plugin behaves as it does in-process. Messages are pickled
+once; those of at least ``transfer_threshold`` bytes are written to a shared
+memory block and only its name goes through the worker's pipe. ``memoryview``
+values, such as the opaque content in ``GlobalContext.metadata``, arrive in
+the worker as ``bytes``.
+
+Workers are checked with a ping every ``health_interval`` seconds while idle
+and replaced if they do not answer or have died. A worker still busy with a
+call that was cancelled (e.g. by the plugin timeout) gets ``health_timeout``
+more seconds to finish before it is replaced too.
+"""
+
+# Standard
+import asyncio
+import io
+import logging
+import multiprocessing
+import os
+import pickle
+from multiprocessing import resource_tracker
+from multiprocessing.connection import Connection
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, Optional
+
+# First-Party
+from cpex.framework.base import HookRef, PluginRef
+from cpex.framework.loader.plugin import PluginLoader
+from cpex.framework.models import PluginConfig, PluginContext
+
+# Third-Party
+from pydantic import BaseModel
+
+# Local
+import metrics
+
+logger = logging.getLogger("ext-proc-PM")
+
+# Workers are spawned, not forked: forking a process running gRPC threads is unsafe
+_MP = multiprocessing.get_context("spawn")
+
+
+class WorkerError(RuntimeError):
+    """Raised when a worker process dies or stops answering during a call."""
+
+
+# ============================================================================
+# TRANSFER
+# ============================================================================
+
+
+def _rebuild_model(origin: type, args: tuple, state: dict) -> BaseModel:
+    cls = origin[args[0] if len(args) == 1 else args]
+    model = cls.__new__(cls)
+    model.__setstate__(state)
+    return model
+
+
+class _Pickler(pickle.Pickler):
+    """Pickler for hook arguments and results.
+
+    Parametrized pydantic models such as ``PluginResult[ToolPreInvokePayload]``
+    cannot be pickled by reference, so they are rebuilt from their generic
+    origin; memoryviews are sent as bytes.
+    """
+
+    def reducer_override(self, obj: Any) -> Any:
+        if isinstance(obj, memoryview):
+            return bytes, (obj.tobytes(),)
+        if isinstance(obj, BaseModel):
+            generic = type(obj).__pydantic_generic_metadata__
+            if generic["origin"] is not None:
+                return _rebuild_model, (generic["origin"], generic["args"], obj.__getstate__())
+        return NotImplemented
+
+
+def dumps(obj: Any) -> bytes:
+    buffer = io.BytesIO()
+    _Pickler(buffer, protocol=pickle.HIGHEST_PROTOCOL).dump(obj)
+    return buffer.getvalue()
+
+
+def pack(obj: Any, threshold: Optional[int]) -> Any:
+    """Pickle ``obj`` for a pipe: inline bytes, or the name and size of a shared memory block.
+
+    Args:
+        obj: The object to send.
+        threshold: Pickles of at least this many bytes go to shared memory; never if None.
+    """
+    data = dumps(obj)
+    if threshold is None or len(data) < threshold:
+        return data
+    block = SharedMemory(create=True, size=len(data))
+    block.buf[: len(data)] = data
+    # The receiver unlinks the block; keep this process's tracker from unlinking it again
+    resource_tracker.unregister(block._name, "shared_memory")
+    block.close()
+    return (block.name, len(data))
+
+
+def unpack(packed: Any) -> Any:
+    """Inverse of ``pack``; frees the shared memory block, if any."""
+    if isinstance(packed, bytes):
+        return pickle.loads(packed)
+    name, size = packed
+    block = SharedMemory(name=name)
+    try:
+        return pickle.loads(block.buf[:size])
+    finally:
+        block.close()
+        block.unlink()
+
+
+def discard(packed: Any) -> None:
+    """Free the shared memory block of a ``pack`` result that will not be unpacked, if it still exists."""
+    if isinstance(packed, bytes):
+        return
+    try:
+        block = SharedMemory(name=packed[0])
+    except FileNotFoundError:
+        return
+    block.close()
+    block.unlink()
+
+
+# ============================================================================
+# HOOK CALLS
+# ============================================================================
+
+
+def ship_context(context: PluginContext) -> PluginContext:
+    """A picklable copy of ``context`` (its dicts may be copy-on-write views)."""
+    gc = context.global_context
+    return PluginContext(
+        state=dict(context.state),
+        metadata=dict(context.metadata),
+        global_context=gc.model_copy(update={"state": dict(gc.state), "metadata": dict(gc.metadata)}),
+    )
+
+
+def apply_outcome(context: PluginContext, outcome: tuple) -> Any:
+    """Apply what a hook run by ``HookRunner`` did to ``context``; return its result."""
+    result, state, metadata, gc_state, gc_metadata = outcome
+    context.state.clear()
+    context.state.update(state)
+    context.metadata.clear()
+    context.metadata.update(metadata)
+    context.global_context.state.update(gc_state)
+    context.global_context.metadata.update(gc_metadata)
+    return result
+
+
+def pack_reply(kind: str, value: Any, threshold: Optional[int]) -> tuple[str, Any]:
+    """``pack`` a reply; a value that cannot be pickled becomes an error reply."""
+    try:
+        return kind, pack(value, threshold)
+    except Exception as e:
+        error = value if kind == "error" else e
+        return "error", pack(RuntimeError(f"{type(error).__name__}: {error}"), threshold)
+
+
+class HookRunner:
+    """A plugin instance loaded in a worker, and an event loop to run its hooks on."""
+
+    def __init__(self, config: PluginConfig, plugin_dirs: list[str]):
+        self.loop = asyncio.new_event_loop()
+        loader = PluginLoader()
+        loader.append_to_search_path(plugin_dirs)
+        self.plugin = self.loop.run_until_complete(loader.load_and_instantiate_plugin(config))
+        self._plugin_ref = PluginRef(self.plugin, config)
+        self._hooks: dict[str, HookRef] = {}
+
+    def run(self, hook_name: str, args: tuple) -> tuple[str, Any]:
+        """Run a hook on ``args`` (payload, shipped context, ...).
+
+        Returns:
+            ``("ok", outcome)`` for ``apply_outcome``, or ``("error", exception)``.
+        """
+        try:
+            hook = self._hooks.get(hook_name) or self._hooks.setdefault(hook_name, HookRef(hook_name, self._plugin_ref))
+            context: PluginContext = args[1]
+            received = dict(context.global_context.metadata)
+            result = self.loop.run_until_complete(hook.hook(*args))
+        except Exception as e:
+            return "error", e
+        metadata = context.global_context.metadata
+        changed = {k: v for k, v in metadata.items() if k not in received or received[k] is not v}
+        return "ok", (result, context.state, context.metadata, context.global_context.state, changed)
+
+    def shutdown(self) -> None:
+        self.loop.run_until_complete(self.plugin.shutdown())
+
+
+# ============================================================================
+# WORKER PROCESS
+# ============================================================================
+
+
+def _worker_main(conn: Connection, config: PluginConfig, plugin_dirs: list[str], threshold: int) -> None:
+    """Load the plugin, then serve calls from ``conn`` until it is closed."""
+    logging.basicConfig(level=os.environ.get("LOGLEVEL", "INFO").upper())
+    runner = HookRunner(config, plugin_dirs)
+    conn.send(("ready", os.getpid()))
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message[0] == "ping":
+            conn.send(("pong",))
+            continue
+        if message[0] == "stop":
+            break
+        _, hook_name, packed = message
+        try:
+            kind, value = runner.run(hook_name, unpack(packed))
+        except Exception as e:
+            kind, value = "error", e
+        conn.send(pack_reply(kind, value, threshold))
+    runner.shutdown()
+
+
+# ============================================================================
+# POOL
+# ============================================================================
+
+
+class _Worker:
+    __slots__ = ("process", "conn", "pending")
+
+    def __init__(self, process: Any, conn: Connection):
+        self.process = process
+        self.conn = conn
+        # Packed arguments of the call in flight, until the worker replies
+        self.pending: Any = None
+
+    def stop(self) -> None:
+        self.conn.close()
+        self.process.kill()
+        self.process.join(timeout=1)
+        if self.pending is not None:
+            # The worker may have been stopped before unpacking (and unlinking) the arguments
+            discard(self.pending)
+            self.pending = None
+
+
+class ProcessOffload:
+    """Worker processes running the hooks of one plugin.
+
+    Attributes:
+        config: The plugin's configuration, used to load it in each worker.
+        plugin_dirs: Plugin search path of the plugin manager.
+        workers: Number of worker processes.
+        transfer_threshold: Messages of at least this many bytes go through shared memory.
+        health_interval: Seconds between pings of idle workers.
+        health_timeout: Seconds a worker has to answer a ping, or to finish a cancelled call.
+        start_timeout: Seconds a worker has to load the plugin.
+    """
+
+    def __init__(
+        self,
+        config: PluginConfig,
+        plugin_dirs: Optional[list[str]] = None,
+        workers: int = 2,
+        transfer_threshold: int = 32 * 1024,
+        health_interval: float = 10.0,
+        health_timeout: float = 5.0,
+        start_timeout: float = 60.0,
+    ):
+        self.config = config
+        self.plugin_dirs = plugin_dirs or []
+        self.workers = workers
+        self.transfer_threshold = transfer_threshold
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self.start_timeout = start_timeout
+        self._idle: asyncio.Queue[_Worker] = asyncio.Queue()
+        self._all: set[_Worker] = set()
+        self._tasks: set[asyncio.Task] = set()
+        self._closed = False
+
+    @property
+    def idle(self) -> int:
+        """Number of workers waiting for a call."""
+        return self._idle.qsize()
+
+    @property
+    def name(self) -> str:
+        return self.config.name
+
+    async def start(self) -> None:
+        """Start the workers and wait until each has loaded the plugin."""
+        for worker in await asyncio.gather(*(self._spawn() for _ in range(self.workers))):
+            self._release(worker)
+        self._background(self._check_health())
+
+    async def _spawn(self) -> _Worker:
+        conn, child_conn = _MP.Pipe()
+        process = _MP.Process(
+            target=_worker_main,
+            args=(child_conn, self.config, self.plugin_dirs, self.transfer_threshold),
+            name=f"plugin-{self.name}",
+            daemon=True,
+        )
+        await asyncio.to_thread(process.start)
+        child_conn.close()
+        worker = _Worker(process, conn)
+        self._all.add(worker)
+        try:
+            reply = await self._receive(worker, self.start_timeout)
+        except (asyncio.TimeoutError, EOFError, OSError) as e:
+            self._discard(worker)
+            raise WorkerError(f"Worker for plugin {self.name} failed to start: {e!r}") from e
+        logger.info("Started worker %d for plugin %s", reply[1], self.name)
+        return worker
+
+    async def _receive(self, worker: _Worker, timeout: Optional[float]) -> Any:
+        """Wait for the next message from ``worker`` without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        readable = loop.create_future()
+        fd = worker.conn.fileno()
+        loop.add_reader(fd, lambda: readable.done() or readable.set_result(None))
+        try:
+            await asyncio.wait_for(readable, timeout)
+        finally:
+            loop.remove_reader(fd)
+        return worker.conn.recv()
+
+    def wrap(self, hook_ref: HookRef) -> Callable[..., Any]:
+        """Return a callable running ``hook_ref``'s hook in a worker."""
+
+        def offloaded(*args: Any) -> Any:
+            return self.call(hook_ref.name, *args)
+
+        return offloaded
+
+    async def call(self, hook_name: str, payload: Any, context: PluginContext, *extensions: Any) -> Any:
+        """Run hook ``hook_name`` in a worker and apply its effects on ``context``."""
+        worker = await self._idle.get()
+        metrics.PROCESS_POOL_WORKERS.labels(plugin=self.name, state="idle").dec()
+        metrics.PROCESS_POOL_WORKERS.labels(plugin=self.name, state="busy").inc()
+        # Packed only once a worker is ours: a call cancelled while waiting leaves no shared memory behind
+        try:
+            packed = pack((payload, ship_context(context), *extensions), self.transfer_threshold)
+        except BaseException:
+            self._release(worker, busy=True)
+            raise
+        worker.pending = packed
+        try:
+            worker.conn.send(("call", hook_name, packed))
+            kind, reply = await self._receive(worker, None)
+        except asyncio.CancelledError:
+            # Let the worker finish the call before it is reused, or replace it
+            self._background(self._settle(worker))
+            raise
+        except (EOFError, OSError) as e:
+            self._background(self._replace(worker, "died"))
+            raise WorkerError(f"Worker for plugin {self.name} died during {hook_name}") from e
+        worker.pending = None
+        self._release(worker, busy=True)
+        outcome = unpack(reply)
+        if kind == "error":
+            raise outcome
+        return apply_outcome(context, outcome)
+
+    def _release(self, worker: _Worker, busy: bool = False) -> None:
+        if busy:
+            metrics.PROCESS_POOL_WORKERS.labels(plugin=self.name, state="busy").dec()
+        if self._closed:
+            self._discard(worker)
+            return
+        metrics.PROCESS_POOL_WORKERS.labels(plugin=self.name, state="idle").inc()
+        self._idle.put_nowait(worker)
+
+    def _discard(self, worker: _Worker) -> None:
+        self._all.discard(worker)
+        worker.stop()
+
+    async def _settle(self, worker: _Worker) -> None:
+        try:
+            kind, reply = await self._receive(worker, self.health_timeout)
+        except (asyncio.TimeoutError, EOFError, OSError):
+            await self._replace(worker, "hung", busy=True)
+            return
+        worker.pending = None
+        try:
+            # Frees the shared memory block the abandoned reply may hold
+            unpack(reply)
+        except Exception:  # nosec B110 - the caller is gone; only the cleanup matters
+            pass
+        self._release(worker, busy=True)
+
+    async def _replace(self, worker: _Worker, reason: str, busy: bool = True) -> None:
+        logger.warning("Replacing %s worker %s of plugin %s", reason, worker.process.pid, self.name)
+        metrics.PROCESS_POOL_RESTARTS.labels(plugin=self.name, reason=reason).inc()
+        if busy:
+            metrics.PROCESS_POOL_WORKERS.labels(plugin=self.name, state="busy").dec()
+        self._discard(worker)
+        if self._closed:
+            return
+        while True:
+            try:
+                worker = await self._spawn()
+                break
+            except WorkerError as e:
+                logger.error("%s; retrying in %.0fs", e, self.health_interval)
+                await asyncio.sleep(self.health_interval)
+        self._release(worker)
+
+    async def _check_health(self) -> None:
+        while not self._closed:
+            await asyncio.sleep(self.health_interval)
+            for _ in range(self._idle.qsize()):
+                worker = self._idle.get_nowait()
+                metrics.PROCESS_POOL_WORKERS.labels(plugin=self.name, state="idle").dec()
+                metrics.PROCESS_POOL_WORKERS.labels(plugin=self.name, state="busy").inc()
+                try:
+                    worker.conn.send(("ping",))
+                    await self._receive(worker, self.health_timeout)
+                except (asyncio.TimeoutError, EOFError, OSError):
+                    await self._replace(worker, "unhealthy")
+                    continue
+                self._release(worker, busy=True)
+
+    def _background(self, coro: Any) -> None:
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def shutdown(self) -> None:
+        """Stop all workers; calls still running fail."""
+        self._closed = True
+        for task in list(self._tasks):
+            task.cancel()
+        while not self._idle.empty():
+            worker = self._idle.get_nowait()
+            metrics.PROCESS_POOL_WORKERS.labels(plugin=self.name, state="idle").dec()
+            try:
+                worker.conn.send(("stop",))
+            except OSError:
+                pass
+            await asyncio.to_thread(worker.process.join, self.health_timeout)
+        for worker in list(self._all):
+            self._discard(worker)
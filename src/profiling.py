@@ -0,0 +1,119 @@
+"""CPU and memory profiling of the running adapter.
+
+``sample_stacks`` is a sampling CPU profiler: it reads the stack of every
+thread at a fixed interval, without tracing calls, so the overhead on the
+profiled code is one stack walk per thread per sample. ``collapsed`` turns
+the samples into the collapsed-stack format read by flamegraph.pl,
+speedscope and similar tools.
+
+``HeapProfiler`` takes ``tracemalloc`` snapshots and reports the allocation
+sites holding the most memory, or those that grew the most since the
+previous snapshot.
+"""
+
+# Standard
+import linecache
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from types import FrameType
+from typing import Optional
+
+SNAPSHOT_GROUPS = ("lineno", "filename", "traceback")
+
+
+def _frame_name(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_qualname} ({os.path.basename(code.co_filename)})"
+
+
+def sample_stacks(seconds: float, interval: float = 0.005) -> Counter[str]:
+    """Sample the stacks of all other threads for ``seconds``.
+
+    Returns:
+        Number of samples per stack, each stack being the thread name and the
+        frames from outermost to innermost, separated by ``;``.
+    """
+    me = threading.get_ident()
+    deadline = time.monotonic() + seconds
+    counts: Counter[str] = Counter()
+    while time.monotonic() < deadline:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            stack.append(names.get(ident, str(ident)))
+            counts[";".join(reversed(stack))] += 1
+        time.sleep(interval)
+    return counts
+
+
+def collapsed(counts: Counter[str]) -> str:
+    """Return ``counts`` in the collapsed-stack format, one ``stack count`` line each."""
+    return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+
+class HeapProfiler:
+    """``tracemalloc`` snapshots, each compared to the one before."""
+
+    def __init__(self):
+        self._previous: Optional[tracemalloc.Snapshot] = None
+        self._lock = threading.Lock()
+
+    def start(self, frames: int = 1) -> None:
+        """Start tracing allocations, keeping ``frames`` frames per allocation."""
+        if tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is already tracing")
+        tracemalloc.start(frames)
+
+    def stop(self) -> None:
+        """Stop tracing allocations and forget the previous snapshot."""
+        with self._lock:
+            tracemalloc.stop()
+            self._previous = None
+
+    def snapshot(self, top: int = 20, group: str = "lineno", diff: bool = False) -> str:
+        """Take a snapshot and report its ``top`` allocation sites.
+
+        Args:
+            top: Number of allocation sites reported.
+            group: How allocations are grouped, one of ``SNAPSHOT_GROUPS``.
+            diff: Report the sites that changed the most since the previous snapshot.
+
+        Raises:
+            ValueError: If ``group`` is unknown.
+            RuntimeError: If allocations are not being traced.
+        """
+        if group not in SNAPSHOT_GROUPS:
+            raise ValueError(f"group must be one of {SNAPSHOT_GROUPS}, not {group!r}")
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not tracing; start it first")
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            (
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, linecache.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            )
+        )
+        with self._lock:
+            previous, self._previous = self._previous, snapshot
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"Traced memory: {current} B, peak {peak} B"]
+        if diff and previous is not None:
+            lines.append(f"Top {top} changes since the previous snapshot:")
+            stats = snapshot.compare_to(previous, group)
+        else:
+            lines.append(f"Top {top} allocation sites:")
+            stats = snapshot.statistics(group)
+        for stat in stats[:top]:
+            lines.append(str(stat))
+            if group == "traceback":
+                lines.extend(stat.traceback.format())
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,143 @@
+"""What the plugins did for one request: durations and verdicts.
+
+``Process`` sets ``request_record`` to a fresh ``RequestRecord`` for each
+stream (one HTTP request). ``AdapterExecutor`` records into it how long each
+hook invocation and each plugin took, and the verdict of each hook, and the
+stream reports what was recorded on its responses to Envoy:
+
+- as a ``Server-Timing`` response header:
+
+      Server-Timing: tool_pre_invoke.NemoCheck;dur=11.9, tool_pre_invoke;dur=12.4
+
+- as dynamic metadata, for Envoy's access logs and stats:
+
+      {"tool_pre_invoke": {"verdict": "deny", "violation_code": "PII", "plugin": "NemoCheck",
+                           "violation_codes": ["PII"], "duration_ms": 12.4, "invocations": 1,
+                           "plugins": {"NemoCheck": 11.9}, "metadata": {...}}}
+
+Hook invocations run inside the stream's task, or in tasks created from it,
+so they all see the stream's ``RequestRecord``; audit-mode invocations
+reset it, since they are not part of the request's handling.
+"""
+
+# Standard
+import json
+import re
+import time
+from contextvars import ContextVar
+from typing import Any, Awaitable, Iterable, Optional
+
+# First-Party
+from cpex.framework.models import PluginViolation
+
+# Characters not allowed in a Server-Timing metric name (an HTTP token)
+_NON_TOKEN = re.compile(r"[^!#$%&'*+\-.^_`|~0-9A-Za-z]")
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
+
+
+class RequestRecord:
+    """Durations and verdicts recorded for one request.
+
+    Durations are kept in the order they ended, until reported. Verdicts are
+    merged by hook for the whole request, since Envoy keeps only the last
+    entry of each hook; a hook's entry is reported again when it changes.
+
+    Attributes:
+        timings: (name, seconds) of each hook invocation (``hook``) and plugin (``hook.plugin``) not reported yet.
+        verdicts: Merged verdict of the invocations of each hook, as reported in dynamic metadata.
+        keeps_timings: False once no response left can carry a ``Server-Timing`` header.
+    """
+
+    __slots__ = ("timings", "verdicts", "keeps_timings", "_plugins", "_changed")
+
+    def __init__(self):
+        self.timings: list[tuple[str, float]] = []
+        self.verdicts: dict[str, dict[str, Any]] = {}
+        self.keeps_timings = True
+        # Plugin durations in milliseconds, by hook, until the hook's verdict takes them
+        self._plugins: dict[str, dict[str, float]] = {}
+        # Hooks whose verdict changed since the last report
+        self._changed: set[str] = set()
+
+    def add_timing(self, name: str, seconds: float) -> None:
+        hook, dot, plugin = name.partition(".")
+        if dot:
+            self._plugins.setdefault(hook, {})[plugin] = _ms(seconds)
+        if self.keeps_timings:
+            self.timings.append((name, seconds))
+
+    def stop_timings(self) -> None:
+        """Drop the durations not reported yet and stop keeping new ones."""
+        self.keeps_timings = False
+        self.timings.clear()
+
+    def add_verdict(
+        self,
+        hook: str,
+        seconds: float,
+        blocked: bool,
+        violation: Optional[PluginViolation],
+        metadata: Optional[dict[str, Any]],
+    ) -> None:
+        """Merge the verdict of a hook invocation, with the durations of its plugins, into the hook's verdict.
+
+        A deny wins over an allow, and the first violation stays the reported one; the codes of all
+        violations are kept in ``violation_codes``. Durations add up and later metadata overrides earlier.
+        """
+        plugins = self._plugins.pop(hook, {})
+        self._changed.add(hook)
+        merged = self.verdicts.get(hook)
+        if merged is None:
+            merged = self.verdicts[hook] = {"verdict": "allow", "duration_ms": 0.0, "invocations": 0}
+        merged["invocations"] += 1
+        merged["duration_ms"] = round(merged["duration_ms"] + _ms(seconds), 1)
+        if blocked:
+            merged["verdict"] = "deny"
+            if violation is not None:
+                if "violation_code" not in merged:
+                    merged["violation_code"] = violation.code
+                    merged["plugin"] = violation.plugin_name
+                codes = merged.setdefault("violation_codes", [])
+                if violation.code not in codes:
+                    codes.append(violation.code)
+        totals = merged.setdefault("plugins", {})
+        for plugin, duration in plugins.items():
+            totals[plugin] = round(totals.get(plugin, 0.0) + duration, 1)
+        merged.setdefault("metadata", {}).update(metadata or {})
+
+    def server_timing(self) -> str:
+        """Return the durations recorded since the last call as a ``Server-Timing`` value, and forget them."""
+        timings, self.timings = self.timings, []
+        return ", ".join(f"{_NON_TOKEN.sub('_', name)};dur={_ms(seconds)}" for name, seconds in timings)
+
+    def dynamic_metadata(self, metadata_keys: Iterable[str] = ()) -> dict[str, Any]:
+        """Return the verdicts that changed since the last call, by hook, with only ``metadata_keys`` of their metadata.
+
+        Metadata values are made JSON-compatible.
+        """
+        changed, self._changed = self._changed, set()
+        keys = set(metadata_keys)
+        reported = {}
+        for hook in changed:
+            verdict = self.verdicts[hook]
+            selected = {key: value for key, value in verdict["metadata"].items() if key in keys}
+            reported[hook] = {**verdict, "metadata": json.loads(json.dumps(selected, default=str))}
+        return reported
+
+
+request_record: ContextVar[Optional[RequestRecord]] = ContextVar("request_record", default=None)
+
+
+async def timed(name: str, run: Awaitable[Any]) -> Any:
+    """Await ``run`` and record its duration as ``name`` for the current request, if any."""
+    record = request_record.get()
+    if record is None:
+        return await run
+    start = time.perf_counter()
+    try:
+        return await run
+    finally:
+        record.add_timing(name, time.perf_counter() - start)
@@ -1,9 +1,13 @@
 # Standard
 import asyncio
+import atexit
 import json
 import logging
 import os
 import signal
+import time
+import uuid
+from contextvars import ContextVar
 from typing import AsyncIterator, Optional
 
 import grpc
@@ -17,7 +21,7 @@ from cpex.framework import (
     ToolPostInvokePayload,
     ToolPreInvokePayload,
 )
-from cpex.framework.models import GlobalContext
+from cpex.framework.models import GlobalContext, PluginConfig, PluginMode
 
 # Third-Party
 from envoy.config.core.v3 import base_pb2 as core
@@ -27,6 +31,29 @@ from envoy.type.v3 import http_status_pb2 as http_status_pb2
 from grpc_health.v1 import health as grpc_health
 from grpc_health.v1 import health_pb2, health_pb2_grpc
 
+# Local
+import metrics
+from adapter_settings import AdapterSettings, load_adapter_settings, load_plugin_executors
+from admin import AdminServer, json_endpoint
+from audit_log import AuditLog
+from body_budget import BodyBudget, BodyBuffer
+from body_rewriter import LocatedMessage, complete_prefix, locate_message, splice_message, splice_result
+from content_encoding import Decoder, Encoder, decode_body, encode_body, is_supported, normalize
+from correlation import Call, CorrelationTable
+from executor import AdapterExecutor
+from introspection import PluginActivity, channelz_state
+from log_setup import category_logger, configure_logging
+from loop_monitor import LoopMonitor
+from offload import ThreadOffload
+from opaque import BINARY_CONTENT_KEYS, OPAQUE_METADATA_KEY, OpaqueBody, pattern_cache_info, strip_opaque
+from ordering import PluginCostModel
+from process_pool import ProcessOffload
+from request_record import RequestRecord, request_record
+from shadow import ShadowRunner
+from sse import SSEEventBuffer, looks_like_sse, replace_event_data
+from subinterpreters import InterpreterOffload, interpreters_supported
+from traffic import TrafficCollector, TrafficProfile
+
 # ============================================================================
 # LOGGING CONFIGURATION
 # ============================================================================
@@ -36,6 +63,19 @@ log_level = os.environ.get("LOGLEVEL", "INFO").upper()
 logging.basicConfig(level=log_level)
 logger = logging.getLogger("ext-proc-PM")
 logger.setLevel(log_level)
+# Per-message progress of the streams, and bodies and responses (sampled, truncated); see log_setup
+stream_logger = category_logger("stream")
+payload_logger = category_logger("payload")
+
+# Defaults until __main__ loads the ``adapter_settings`` section of the plugin config
+adapter_settings = AdapterSettings()
+shadow_runner = ShadowRunner()
+body_budget = BodyBudget(adapter_settings.body_limits.max_total_bytes)
+correlation_table = CorrelationTable(adapter_settings.correlation.max_entries, adapter_settings.correlation.ttl)
+# Plugins whose hooks do not run on the event loop, from their ``executor`` config key
+plugin_executors: dict[str, str] = {}
+# Heavy hitters and latency quantiles of the tools called, if enabled
+traffic_profile: Optional[TrafficProfile] = None
 
 # ============================================================================
 # HELPER FUNCTIONS
@@ -62,6 +102,11 @@ def create_mcp_immediate_error_response(body, error_message, violation=None):
     Returns:
         ProcessingResponse with immediate_response containing the error
     """
+    return immediate_json_response(mcp_error_body(body, error_message, violation))
+
+
+def mcp_error_body(body, error_message, violation=None) -> dict:
+    """Build the JSON-RPC error object answering ``body``; see ``create_mcp_immediate_error_response``."""
     # Build error message with violation details if present
     if violation is not None:
         error_message = f"{violation.reason} -- {violation.description}"
@@ -71,12 +116,15 @@ def create_mcp_immediate_error_response(body, error_message, violation=None):
     if violation is not None and violation.mcp_error_code is not None:
         error_code = violation.mcp_error_code
 
-    error_body = {
-        "jsonrpc": body["jsonrpc"],
-        "id": body["id"],
+    return {
+        "jsonrpc": body.get("jsonrpc", "2.0"),
+        "id": body.get("id"),
         "error": {"code": error_code, "message": error_message},
     }
 
+
+def immediate_json_response(error_body) -> ep.ProcessingResponse:
+    """Answer the request with ``error_body`` (an error object or a batch of them) instead of forwarding it."""
     return ep.ProcessingResponse(
         immediate_response=ep.ImmediateResponse(
             # Use 200 status with error in body for MCP protocol compatibility
@@ -105,36 +153,250 @@ def create_mcp_immediate_error_response(body, error_message, violation=None):
 # ============================================================================
 # Helper function that constructs an Envoy external processor BodyResponse from body obj.
 # ============================================================================
-def get_modified_response(body) -> ep.BodyResponse:
-    return ep.BodyResponse(
-        response=ep.CommonResponse(body_mutation=ep.BodyMutation(body=json.dumps(body).encode("utf-8")))
+def get_modified_response(body, opaque: Optional[OpaqueBody] = None) -> ep.BodyResponse:
+    data = json.dumps(body).encode("utf-8")
+    if opaque is not None:
+        data = opaque.restore(data)
+    return ep.BodyResponse(response=ep.CommonResponse(body_mutation=ep.BodyMutation(body=data)))
+
+
+def response_body_mutation(body: bytes) -> ep.ProcessingResponse:
+    """Build a buffered response body mutation replacing the body with ``body``."""
+    body_mutation = ep.BodyResponse(response=ep.CommonResponse(body_mutation=ep.BodyMutation(body=body)))
+    return ep.ProcessingResponse(response_body=body_mutation)
+
+
+def hook_global_context(opaque: Optional[OpaqueBody] = None, call: Optional[Call] = None) -> GlobalContext:
+    """Build the GlobalContext for a hook invocation.
+
+    Plugins find the binary strings replaced by placeholders in the payload
+    under ``metadata[OPAQUE_METADATA_KEY]``, keyed by placeholder. Both hooks
+    of a tracked tool call share the call's request id; other hooks get the
+    request id of the current stream.
+    """
+    metadata = {OPAQUE_METADATA_KEY: opaque.blobs()} if opaque is not None else {}
+    request_id = call.request_id if call is not None else current_request_id()
+    # TODO: hard-coded server id
+    return GlobalContext(request_id=request_id, server_id="2", metadata=metadata)
+
+
+def header_mutation_response(phase: str, key: str, value: str, remove_headers=()) -> ep.ProcessingResponse:
+    """Build a headers response for ``phase`` that sets ``key`` and removes ``remove_headers``."""
+    return ep.ProcessingResponse(
+        **{
+            phase: ep.HeadersResponse(
+                response=ep.CommonResponse(
+                    header_mutation=ep.HeaderMutation(
+                        set_headers=[
+                            core.HeaderValueOption(
+                                header=core.HeaderValue(key=key, raw_value=value.encode("utf-8")),
+                                append_action=core.HeaderValueOption.APPEND_IF_EXISTS_OR_ADD,
+                            )
+                        ],
+                        remove_headers=list(remove_headers),
+                    )
+                )
+            )
+        }
     )
 
 
+def records_requests() -> bool:
+    """Return True if the durations and verdicts of each request are reported to Envoy."""
+    return adapter_settings.server_timing.enabled or adapter_settings.dynamic_metadata.enabled
+
+
+def annotate_response(
+    response: ep.ProcessingResponse, record: Optional[RequestRecord], headers: bool = True
+) -> ep.ProcessingResponse:
+    """Report what ``record`` gathered since the last call on ``response``.
+
+    With ``server_timing`` enabled, the durations go into the client's response
+    headers. Only response headers, immediate responses and BUFFERED response
+    bodies (``headers``; Envoy holds the headers until the body is processed)
+    can carry them; otherwise the durations wait for the next response that can.
+    Once a response body has been answered, no later response can, so the
+    record stops keeping durations.
+    With ``dynamic_metadata`` enabled, the verdicts go into the response's
+    dynamic metadata, under the configured namespace.
+    """
+    if record is None:
+        return response
+    kind = response.WhichOneof("response")
+    timing = ""
+    if adapter_settings.server_timing.enabled and (
+        kind in ("response_headers", "immediate_response") or (kind == "response_body" and headers)
+    ):
+        timing = record.server_timing()
+    if kind in ("response_body", "immediate_response") and record.keeps_timings:
+        record.stop_timings()
+    verdicts = {}
+    if adapter_settings.dynamic_metadata.enabled:
+        verdicts = record.dynamic_metadata(adapter_settings.dynamic_metadata.metadata_keys)
+    if not timing and not verdicts:
+        return response
+    # Never modify the shared prebuilt responses
+    annotated = ep.ProcessingResponse()
+    annotated.CopyFrom(response)
+    if timing:
+        if kind == "immediate_response":
+            mutation = annotated.immediate_response.headers
+        else:
+            mutation = getattr(annotated, kind).response.header_mutation
+        mutation.set_headers.append(
+            core.HeaderValueOption(
+                header=core.HeaderValue(key=adapter_settings.server_timing.header, raw_value=timing.encode("utf-8")),
+                append_action=core.HeaderValueOption.APPEND_IF_EXISTS_OR_ADD,
+            )
+        )
+    if verdicts:
+        annotated.dynamic_metadata.update({adapter_settings.dynamic_metadata.namespace: verdicts})
+    return annotated
+
+
+# Responses without per-request data are built once and shared by all streams.
+# gRPC only serializes them, so they must never be modified.
+REQUEST_HEADERS_RESPONSE = header_mutation_response("request_headers", "x-ext-proc-header", "hello-from-ext-proc")
+RESPONSE_HEADERS_RESPONSE = header_mutation_response(
+    "response_headers", "x-ext-proc-response-header", "processed-by-ext-proc"
+)
+EMPTY_REQUEST_BODY_RESPONSE = ep.ProcessingResponse(request_body=ep.BodyResponse(response=ep.CommonResponse()))
+EMPTY_RESPONSE_BODY_RESPONSE = ep.ProcessingResponse(response_body=ep.BodyResponse(response=ep.CommonResponse()))
+REQUEST_TRAILERS_RESPONSE = ep.ProcessingResponse(request_trailers=ep.TrailersResponse())
+RESPONSE_TRAILERS_RESPONSE = ep.ProcessingResponse(response_trailers=ep.TrailersResponse())
+
+
 # ============================================================================
-# MCP HOOK HANDLERS
+# AUDIT (SHADOW) MODE
 # ============================================================================
 
 
-async def getToolPreInvokeResponse(body):
+async def _run_audit_hook(hook_type: str, payload, tool_name: str):
+    """Invoke a hook in audit mode and record the verdict without enforcing it."""
+    # Runs in its own task; its durations are not part of the request's latency
+    request_record.set(None)
+    result, _ = await manager.invoke_hook(hook_type, payload, global_context=hook_global_context())
+    verdict = "allow" if result.continue_processing else "deny"
+    metrics.AUDIT_VERDICTS.labels(hook=hook_type, verdict=verdict).inc()
+    if result.continue_processing:
+        logger.debug("Audit-mode %s allowed tool %s", hook_type, tool_name)
+    else:
+        violation = result.violation
+        logger.warning(
+            "Audit-mode %s would have blocked tool %s: [%s] %s",
+            hook_type,
+            tool_name,
+            violation.code if violation else None,
+            violation.reason if violation else None,
+        )
+
+
+def submit_audit_hook(hook_type: str, payload, tool_name: str) -> bool:
+    """Schedule an audit-mode hook invocation on the background runner.
+
+    Returns:
+        True if scheduled, False if dropped because the runner was full.
     """
-    Handle tool pre-invoke hook processing.
+    scheduled = shadow_runner.submit(_run_audit_hook(hook_type, payload, tool_name), label=f"{hook_type}:{tool_name}")
+    if not scheduled:
+        metrics.AUDIT_DROPPED.labels(hook=hook_type).inc()
+    return scheduled
 
-    Invokes plugins before a tool is called, allowing for argument validation,
-    modification, or blocking of the tool invocation.
+
+# ============================================================================
+# MCP HOOK HANDLERS
+# ============================================================================
+
+
+async def run_tool_pre_invoke(body, opaque: Optional[OpaqueBody] = None, call: Optional[Call] = None):
+    """Invoke the tool pre-invoke hook for a tools/call request.
+
+    The plugin contexts it returns are kept in ``call`` for the post-invoke hook.
+
+    Returns:
+        The plugin result, or None in audit mode, where the hook runs in the background
     """
-    logger.debug(body)
+    payload_logger.debug("tools/call request: %s", body)
     payload_args = {
         "tool_name": body["params"]["name"],
         "tool_args": body["params"]["arguments"],
         "client_session_id": "replaceme",
     }
     payload = ToolPreInvokePayload(name=body["params"]["name"], args=payload_args)
-    # TODO: hard-coded ids
-    global_context = GlobalContext(request_id="1", server_id="2")
-    logger.debug(f"**** Invoking Tool Pre Invoke with payload: {payload} ****")
-    result, _ = await manager.invoke_hook(ToolHookType.TOOL_PRE_INVOKE, payload, global_context=global_context)
-    logger.debug(f"**** Tool Pre Invoke Result: {result} ****")
+    hook_type = ToolHookType.TOOL_PRE_INVOKE.value
+    if adapter_settings.audit_mode.applies_to(hook_type, payload.name):
+        submit_audit_hook(hook_type, payload, payload.name)
+        return None
+    global_context = hook_global_context(opaque, call)
+    payload_logger.debug("Tool pre-invoke payload: %s", payload)
+    result, contexts = await manager.invoke_hook(ToolHookType.TOOL_PRE_INVOKE, payload, global_context=global_context)
+    payload_logger.debug("Tool pre-invoke result: %s", result)
+    if call is not None and contexts:
+        # The post-invoke hook gets a fresh global context; dropping this one
+        # keeps its metadata (and any request body it references) from living on
+        bare_context = GlobalContext(request_id=call.request_id, server_id=global_context.server_id)
+        for context in contexts.values():
+            context.global_context = bare_context
+        call.contexts = contexts
+    return result
+
+
+async def run_tool_post_invoke(
+    body, toolname: Optional[str] = None, opaque: Optional[OpaqueBody] = None, call: Optional[Call] = None
+):
+    """Invoke the tool post-invoke hook for a tool result message.
+
+    If the result answers a tracked ``call``, the hook runs under the call's
+    tool name and request id, with the plugin contexts of its pre-invoke hook.
+
+    Returns:
+        The plugin result, or None in audit mode, where the hook runs in the background
+    """
+    if call is not None:
+        toolname = call.tool_name
+    _toolname = toolname if toolname else "replaceme"
+    payload = ToolPostInvokePayload(name=_toolname, result=body["result"])
+    hook_type = ToolHookType.TOOL_POST_INVOKE.value
+    if adapter_settings.audit_mode.applies_to(hook_type, _toolname):
+        submit_audit_hook(hook_type, payload, _toolname)
+        return None
+    payload_logger.debug("Tool post-invoke payload: %s", payload)
+    global_context = hook_global_context(opaque, call)
+    result, _ = await manager.invoke_hook(
+        ToolHookType.TOOL_POST_INVOKE,
+        payload,
+        global_context=global_context,
+        local_contexts=call.contexts if call is not None else None,
+    )
+    payload_logger.debug("Tool post-invoke result: %s", result)
+    return result
+
+
+async def run_prompt_pre_fetch(body):
+    """Invoke the prompt pre-fetch hook for a prompts/get request."""
+    prompt = PromptPrehookPayload(prompt_id=body["params"]["name"], args=body["params"]["arguments"])
+    result, _ = await manager.invoke_hook(PromptHookType.PROMPT_PRE_FETCH, prompt, global_context=hook_global_context())
+    payload_logger.debug("Prompt pre-fetch result: %s", result)
+    return result
+
+
+async def getToolPreInvokeResponse(body, opaque: Optional[OpaqueBody] = None, call: Optional[Call] = None):
+    """
+    Handle tool pre-invoke hook processing.
+
+    Invokes plugins before a tool is called, allowing for argument validation,
+    modification, or blocking of the tool invocation.
+
+    In audit mode the body is forwarded unchanged and the hook runs in the background.
+
+    Args:
+        body: The tools/call request
+        opaque: Binary strings replaced by placeholders in ``body``, restored in a modified body
+        call: The tracked call this request makes, which keeps the plugin contexts for post-invoke
+    """
+    result = await run_tool_pre_invoke(body, opaque, call)
+    if result is None:
+        return EMPTY_REQUEST_BODY_RESPONSE
     if not result.continue_processing:
         body_resp = create_mcp_immediate_error_response(
             body,
@@ -147,15 +409,21 @@ async def getToolPreInvokeResponse(body):
         body_mutation = ep.BodyResponse(response=ep.CommonResponse())
         if result_payload is not None and result_payload.args is not None:
             body["params"]["arguments"] = result_payload.args["tool_args"]
-            body_mutation = get_modified_response(body)
+            body_mutation = get_modified_response(body, opaque)
         else:
             logger.debug("No change in tool args")
         body_resp = ep.ProcessingResponse(request_body=body_mutation)
-    logger.info(f"****Tool Pre Invoke Return body: {body_resp}****")
+    payload_logger.debug("Tool pre-invoke response: %s", body_resp)
     return body_resp
 
 
-async def getToolPostInvokeResponse(body, toolname: Optional[str] = None):
+async def getToolPostInvokeResponse(
+    body,
+    toolname: Optional[str] = None,
+    source: Optional[LocatedMessage] = None,
+    opaque: Optional[OpaqueBody] = None,
+    call: Optional[Call] = None,
+):
     """
     Handle tool post-invoke hook processing.
 
@@ -166,22 +434,23 @@ async def getToolPostInvokeResponse(body, toolname: Optional[str] = None):
     This implementation uses immediate_response to attempt early termination, but
     it may not always succeed due to streaming constraints.
 
+    In audit mode the body is forwarded unchanged and the hook runs in the background.
+
     Args:
         body: The response body containing the tool result
         toolname: The mcp toolname in this session
+        source: Where ``body`` was read from; when given, a modified result is
+            spliced into the original bytes (keeping SSE framing) and a
+            modification equal to the original is treated as no change
+        opaque: Binary strings replaced by placeholders in ``body``, restored in a modified body
+        call: The tracked call this result answers; its tool name overrides ``toolname``
     """
     # FIXME: size of content array is expected to be 1
     # for content in body["result"]["content"]:
 
-    logger.debug("**** Tool Post Invoke ****")
-
-    _toolname = toolname if toolname else "replaceme"
-    payload = ToolPostInvokePayload(name=_toolname, result=body["result"])
-    # TODO: hard-coded ids
-    logger.debug(f"**** Tool Post Invoke payload: {payload} ****")
-    global_context = GlobalContext(request_id="1", server_id="2")
-    result, _ = await manager.invoke_hook(ToolHookType.TOOL_POST_INVOKE, payload, global_context=global_context)
-    logger.debug(f"**** Tool Post Invoke result {result}")
+    result = await run_tool_post_invoke(body, toolname, opaque, call)
+    if result is None:
+        return EMPTY_RESPONSE_BODY_RESPONSE
     if not result.continue_processing:
         # In STREAMED mode, we attempt to use immediate_response to terminate early
         # This may fail if response headers have already been sent
@@ -190,20 +459,24 @@ async def getToolPostInvokeResponse(body, toolname: Optional[str] = None):
             error_message="Tool response forbidden",
             violation=result.violation,
         )
-        logger.info(f"****Tool Post Invoke Return body: {body_resp}****")
+        payload_logger.debug("Tool post-invoke response: %s", body_resp)
         return body_resp
 
     # Continue processing - allow or modify the response
     result_payload = result.modified_payload
-    if result_payload is not None:
+    new_body = None
+    if result_payload is not None and source is not None:
+        new_body = splice_result(source, result_payload.result)
+    elif result_payload is not None:
         body["result"] = result_payload.result
-        body_mutation = ep.BodyResponse(
-            response=ep.CommonResponse(body_mutation=ep.BodyMutation(body=json.dumps(body).encode("utf-8")))
-        )
+        new_body = json.dumps(body).encode("utf-8")
+    if new_body is not None and opaque is not None:
+        new_body = opaque.restore(new_body)
+    if new_body is not None:
+        body_resp = response_body_mutation(new_body)
     else:
-        body_mutation = ep.BodyResponse(response=ep.CommonResponse())
-    body_resp = ep.ProcessingResponse(response_body=body_mutation)
-    logger.info(f"****Tool Post Invoke Return body: {body_resp}****")
+        body_resp = EMPTY_RESPONSE_BODY_RESPONSE
+    payload_logger.debug("Tool post-invoke response: %s", body_resp)
     return body_resp
 
 
@@ -214,11 +487,7 @@ async def getPromptPreFetchResponse(body):
     Invokes plugins before a prompt is fetched, allowing for argument validation,
     modification, or blocking of the prompt request.
     """
-    prompt = PromptPrehookPayload(prompt_id=body["params"]["name"], args=body["params"]["arguments"])
-    # TODO: hard-coded ids
-    global_context = GlobalContext(request_id="1", server_id="2")
-    result, _ = await manager.invoke_hook(PromptHookType.PROMPT_PRE_FETCH, prompt, global_context=global_context)
-    logger.info(result)
+    result = await run_prompt_pre_fetch(body)
     if not result.continue_processing:
         body_resp = create_mcp_immediate_error_response(
             body,
@@ -236,80 +505,851 @@ async def getPromptPreFetchResponse(body):
 
         body_resp = ep.ProcessingResponse(request_body=body_mutation)
 
-    logger.info(f"****Prompt Pre-fetch Return body: {body_resp}")
+    payload_logger.debug("Prompt pre-fetch response: %s", body_resp)
     return body_resp
 
 
+# ============================================================================
+# REQUEST BODY PROCESSING HELPER
+# ============================================================================
+
+
+async def process_request_body_buffer(
+    buffer: bytes, calls: Optional["RequestCalls"] = None
+) -> tuple[Optional[ep.ProcessingResponse], Optional[str]]:
+    """Process a complete request body.
+
+    Invokes the tool pre-invoke or prompt pre-fetch hook for MCP tool calls and
+    prompt fetches. JSON-RPC batches are handled by ``process_request_batch``.
+
+    Args:
+        buffer: The complete request body bytes
+        calls: Where to record the tool calls (and blocked batch entries) for the response
+
+    Returns:
+        The ProcessingResponse to send back to Envoy (None if the body is not
+        UTF-8), and the tool or prompt name from the request, if any
+    """
+    opaque = None
+    if adapter_settings.opaque_requests:
+        opaque = strip_opaque(buffer, adapter_settings.opaque_min_bytes, BINARY_CONTENT_KEYS)
+    try:
+        text = str(opaque.text if opaque is not None else buffer, "utf-8")
+    except UnicodeDecodeError:
+        logger.debug("Request body not UTF-8; skipping")
+        return None, None
+    body = json.loads(text)
+    payload_logger.debug("Request body: %s", body)
+    if isinstance(body, list):
+        return await process_request_batch(body, opaque, calls if calls is not None else RequestCalls()), None
+    name = None
+    if "params" in body and "name" in body["params"]:
+        name = body["params"]["name"]
+    if "method" in body and body["method"] == "tools/call":
+        call = calls.record(body.get("id"), name) if calls is not None and name else None
+        body_resp = await getToolPreInvokeResponse(body, opaque, call)
+    elif "method" in body and body["method"] == "prompts/get":
+        body_resp = await getPromptPreFetchResponse(body)
+    else:
+        body_resp = EMPTY_REQUEST_BODY_RESPONSE
+    return body_resp, name
+
+
 # ============================================================================
 # RESPONSE BODY PROCESSING HELPER
 # ============================================================================
 
 
-async def process_response_body_buffer(buffer: bytearray, toolname: Optional[str] = None):
+def parse_response_body(buffer: bytes) -> Optional[dict]:
+    """Parse buffered response body content.
+
+    Supports both SSE and plain JSON-RPC formats.
+
+    Args:
+        buffer: The accumulated response body bytes
+
+    Returns:
+        The first JSON-RPC message in the body, or None if nothing could be parsed
+    """
+    message = locate_message(buffer)
+    if message is None or not message.data:
+        logger.warning("No data parsed from response body")
+        return None
+    payload_logger.debug("Parsed response data: %s", message.data)
+    return message.data
+
+
+def is_tool_result(data: dict) -> bool:
+    """Check whether a parsed JSON-RPC message is a tool result."""
+    return isinstance(data, dict) and isinstance(data.get("result"), dict) and "content" in data["result"]
+
+
+async def process_response_body_buffer(
+    buffer: bytes, toolname: Optional[str] = None, calls: Optional["RequestCalls"] = None
+):
     """Process buffered response body content.
 
     Parses the buffered content (supporting both SSE and plain JSON-RPC formats),
-    and invokes the tool post-invoke hook if it's a tool result.
+    and invokes the tool post-invoke hook if it's a tool result. Each tool
+    result of a batch response is checked under the tool its request called.
 
     Args:
         buffer: The accumulated response body bytes
         toolname: The mcp toolname in this session
+        calls: The calls of the batch request this body answers, if any
 
     Returns:
         ProcessingResponse to send back to Envoy
     """
+    pending = calls.take_errors() if calls is not None else []
+    body_resp = await _process_response_message(buffer, toolname, calls)
+    if pending and not body_resp.HasField("immediate_response"):
+        return response_body_mutation(append_batch_errors(resulting_body(body_resp, "response_body", buffer), pending))
+    return body_resp
+
+
+async def _process_response_message(buffer: bytes, toolname: Optional[str], calls: Optional["RequestCalls"]):
     if not buffer:
         # Empty buffer at end of stream
-        logger.debug("End of stream with empty buffer")
-        return ep.ProcessingResponse(response_body=ep.BodyResponse(response=ep.CommonResponse()))
+        stream_logger.debug("End of stream with empty buffer")
+        return EMPTY_RESPONSE_BODY_RESPONSE
+
+    opaque = strip_opaque(buffer, adapter_settings.opaque_min_bytes, BINARY_CONTENT_KEYS)
+    message = locate_message(opaque.text if opaque is not None else buffer)
+
+    if message is not None and isinstance(message.data, list):
+        new_body = await process_response_batch(message, toolname, calls, opaque)
+        return response_body_mutation(new_body) if new_body is not None else EMPTY_RESPONSE_BODY_RESPONSE
+    # Check if this is a tool result response
+    if message is not None and is_tool_result(message.data):
+        logger.debug("Invoking tool post-invoke hook")
+        call = calls.lookup(message.data.get("id")) if calls is not None else None
+        return await getToolPostInvokeResponse(message.data, toolname, source=message, opaque=opaque, call=call)
+    return EMPTY_RESPONSE_BODY_RESPONSE
+
+
+# ============================================================================
+# CALL CORRELATION
+# ============================================================================
+
+
+class RequestCalls:
+    """The tool calls of a stream's request, kept for the response.
+
+    ``calls`` maps JSON-RPC ids to the ``Call`` each request made, so every
+    tool result is checked under its own tool name and with the plugin
+    contexts of its pre-invoke hook. Calls of a session (known from its
+    ``mcp-session-id`` header) also go to ``correlation_table``, where streams
+    that did not carry the request, such as the session's GET SSE channel,
+    find them. ``errors`` holds the error objects of blocked batch entries:
+    they are dropped from the forwarded batch and added to the response
+    instead.
+
+    ``request_id`` (Envoy's ``x-request-id``, if sent) becomes the
+    ``GlobalContext.request_id`` of the hooks of every call.
+    """
+
+    __slots__ = ("calls", "errors", "session_id", "request_id")
+
+    def __init__(self, session_id: Optional[str] = None, request_id: Optional[str] = None):
+        self.calls: dict = {}
+        self.errors: list[dict] = []
+        self.session_id = session_id
+        self.request_id = request_id
+
+    def record(self, jsonrpc_id, tool_name: str) -> Optional[Call]:
+        """Track the call of ``tool_name`` made by request ``jsonrpc_id``.
+
+        Returns:
+            The tracked call, or None if the request has no usable id
+        """
+        if not isinstance(jsonrpc_id, (str, int)):
+            return None
+        call = Call(tool_name, self.ensure_request_id())
+        self.calls[jsonrpc_id] = call
+        if self.session_id:
+            correlation_table.put(self.session_id, jsonrpc_id, call)
+        return call
+
+    def ensure_request_id(self) -> str:
+        """Return ``request_id``, made up for requests Envoy sent without an ``x-request-id``."""
+        if self.request_id is None:
+            self.request_id = uuid.uuid4().hex
+        return self.request_id
+
+    def lookup(self, jsonrpc_id) -> Optional[Call]:
+        """Return the call answered by a result with ``jsonrpc_id``, if it is known."""
+        if not isinstance(jsonrpc_id, (str, int)):
+            return None
+        shared = correlation_table.pop(self.session_id, jsonrpc_id) if self.session_id else None
+        return self.calls.get(jsonrpc_id) or shared
+
+    def take_errors(self) -> list[dict]:
+        errors, self.errors = self.errors, []
+        return errors
+
+
+# Calls of the stream being processed; tasks created by the stream, such as
+# audit-mode hooks, inherit it
+stream_calls: ContextVar[Optional[RequestCalls]] = ContextVar("stream_calls", default=None)
+
+
+def current_request_id() -> str:
+    """Request id of the stream being processed, for hooks not tied to a tracked call."""
+    calls = stream_calls.get()
+    return calls.ensure_request_id() if calls is not None else uuid.uuid4().hex
+
+
+# ============================================================================
+# JSON-RPC BATCHES
+# ============================================================================
+
+
+async def check_request_entry(entry, opaque: Optional[OpaqueBody], calls: RequestCalls):
+    """Run the pre-invoke hook for one batch entry; None if it has none (or runs in audit mode)."""
+    if not isinstance(entry, dict) or not isinstance(entry.get("params"), dict) or "name" not in entry["params"]:
+        return None
+    if entry.get("method") == "tools/call":
+        return await run_tool_pre_invoke(entry, opaque, calls.record(entry.get("id"), entry["params"]["name"]))
+    if entry.get("method") == "prompts/get":
+        return await run_prompt_pre_fetch(entry)
+    return None
+
+
+async def process_request_batch(
+    batch: list, opaque: Optional[OpaqueBody], calls: RequestCalls
+) -> ep.ProcessingResponse:
+    """Process a JSON-RPC batch request.
+
+    The hooks of all ``tools/call`` and ``prompts/get`` entries run
+    concurrently. Blocked entries are removed from the batch and their error
+    objects kept in ``calls`` for the response; if every entry is blocked the
+    errors are returned right away. A changed batch is serialized once.
+
+    Args:
+        batch: The parsed batch
+        opaque: Binary strings replaced by placeholders in the batch
+        calls: Where to record the entries' tool names and errors
+    """
+    results = await asyncio.gather(*(check_request_entry(entry, opaque, calls) for entry in batch))
+    forwarded = []
+    changed = False
+    for entry, result in zip(batch, results):
+        if result is None:
+            forwarded.append(entry)
+        elif not result.continue_processing:
+            changed = True
+            # Notifications (no id) get no response, not even an error
+            if "id" in entry:
+                error_message = "No go - Tool args forbidden" if entry["method"] == "tools/call" else "Prompt forbidden"
+                calls.errors.append(mcp_error_body(entry, error_message, result.violation))
+        else:
+            result_payload = result.modified_payload
+            if result_payload is not None and result_payload.args is not None:
+                entry["params"]["arguments"] = result_payload.args["tool_args"]
+                changed = True
+            forwarded.append(entry)
+    logger.debug("Batch of %d requests: %d blocked", len(batch), len(calls.errors))
+    if not forwarded:
+        return immediate_json_response(calls.take_errors())
+    if not changed:
+        return EMPTY_REQUEST_BODY_RESPONSE
+    return ep.ProcessingResponse(request_body=get_modified_response(forwarded, opaque))
+
+
+async def process_response_batch(
+    message: LocatedMessage, toolname: Optional[str], calls: Optional[RequestCalls], opaque: Optional[OpaqueBody]
+) -> Optional[bytes]:
+    """Run the post-invoke hook on every tool result of a batch response, concurrently.
+
+    Blocked results are replaced by their error objects; the rest of the batch
+    is forwarded. A changed batch is serialized once and spliced into the body.
+
+    Returns:
+        The new body, or None if no entry changed
+    """
+    batch = message.data
+    calls = calls if calls is not None else RequestCalls()
+    checked = [i for i, entry in enumerate(batch) if is_tool_result(entry)]
+    results = await asyncio.gather(
+        *(run_tool_post_invoke(batch[i], toolname, opaque, calls.lookup(batch[i].get("id"))) for i in checked)
+    )
+    changed = False
+    for i, result in zip(checked, results):
+        if result is None:
+            continue
+        if not result.continue_processing:
+            batch[i] = mcp_error_body(batch[i], "Tool response forbidden", result.violation)
+            changed = True
+        elif result.modified_payload is not None and result.modified_payload.result != batch[i]["result"]:
+            batch[i]["result"] = result.modified_payload.result
+            changed = True
+    if not changed:
+        return None
+    new_body = splice_message(message, batch)
+    return opaque.restore(new_body) if opaque is not None else new_body
+
+
+def batch_errors_event(errors: list[dict]) -> bytes:
+    """An SSE event carrying the errors of blocked batch entries."""
+    return b"event: message\ndata: " + json.dumps(errors).encode("utf-8") + b"\n\n"
+
+
+def append_batch_errors(body, errors: list[dict]) -> bytes:
+    """Add the errors of blocked batch entries to a response body.
+
+    SSE bodies get one more event holding the errors; JSON bodies become (or
+    stay) a batch with the errors appended.
+    """
+    if not body:
+        return json.dumps(errors).encode("utf-8")
+    if looks_like_sse(body[:64]):
+        separator = b"" if body.endswith((b"\n\n", b"\r\n\r\n")) else b"\n\n"
+        return b"".join((body, separator, batch_errors_event(errors)))
+    message = locate_message(body)
+    if message is None:
+        logger.warning("Response is not JSON; %d batch errors dropped", len(errors))
+        return bytes(body)
+    batch = message.data if isinstance(message.data, list) else [message.data]
+    return splice_message(message, batch + errors)
+
+
+# ============================================================================
+# CONTENT-ENCODED RESPONSE BODIES
+# ============================================================================
+
+
+async def process_encoded_response_body(
+    buffer: bytes, toolname: Optional[str], coding: Optional[str], calls: Optional[RequestCalls] = None
+) -> ep.ProcessingResponse:
+    """Process a complete response body sent with a ``content-encoding``.
+
+    The body is decoded (up to ``adapter_settings.max_decoded_body_bytes``)
+    before the post-invoke hooks see it. A mutated body is re-encoded with the
+    original coding and ``content-length`` is dropped. Bodies that cannot be
+    decoded are passed through unchecked, as undecodable bodies always were.
+
+    Args:
+        buffer: The complete, still encoded, response body
+        toolname: The mcp toolname in this session
+        coding: Normalized content coding, or None for identity
+        calls: The calls of the batch request this body answers, if any
 
+    Returns:
+        ProcessingResponse to send back to Envoy
+    """
+    if coding is None:
+        return await process_response_body_buffer(buffer, toolname, calls)
+    if not is_supported(coding):
+        logger.warning("Unsupported content-encoding %r; response body not checked", coding)
+        return EMPTY_RESPONSE_BODY_RESPONSE
     try:
-        text = buffer.decode("utf-8")
-    except UnicodeDecodeError:
-        logger.debug("Response body not UTF-8; skipping")
-        return ep.ProcessingResponse(response_body=ep.BodyResponse(response=ep.CommonResponse()))
-
-    lines = text.split("\n")
-    logger.debug(f"Response body text: {lines}")
-
-    # Handle both SSE format and plain JSON-RPC format
-    data = None
-
-    # Check if this is SSE format (starts with "id:", "event:", or "data:")
-    if text.strip().startswith(("event:", "data:", "id:")):
-        # Parse SSE format
-        lines = text.split("\n")
-        for line in lines:
-            line = line.strip()
-            if line.startswith("data:"):
-                json_str = line[5:].strip()  # Remove "data:" prefix
-                logger.debug(f"Extracted JSON from SSE: {json_str}")
-                try:
-                    data = json.loads(json_str)
-                    break
-                except json.JSONDecodeError:
-                    continue
-    else:
-        # Parse plain JSON-RPC format
-        lines = [line.strip() for line in text.split("\n") if line.strip()]
-        if lines:
-            try:
-                data = json.loads(lines[0])
-            except json.JSONDecodeError as e:
-                logger.error(f"Failed to parse JSON: {e}")
-
-    if data:
-        logger.debug(f"Parsed response data: {data}")
-
-        # Check if this is a tool result response
-        if "result" in data and "content" in data["result"]:
-            logger.info("Invoking tool post-invoke hook")
-            return await getToolPostInvokeResponse(data, toolname)
+        decoded = decode_body(coding, buffer, adapter_settings.max_decoded_body_bytes)
+    except ValueError as e:
+        logger.warning("Could not decode %s response body; not checked: %s", coding, e)
+        return EMPTY_RESPONSE_BODY_RESPONSE
+    body_resp = await process_response_body_buffer(decoded, toolname, calls)
+    if body_resp.HasField("response_body"):
+        common = body_resp.response_body.response
+        # Only freshly built mutation responses get here; shared empty ones have no body mutation
+        if common.body_mutation.WhichOneof("mutation") == "body":
+            common.body_mutation.body = encode_body(coding, common.body_mutation.body)
+            common.header_mutation.remove_headers.append("content-length")
+    return body_resp
+
+
+# ============================================================================
+# BODY BUFFER LIMITS
+# ============================================================================
+
+
+def new_body_buffer() -> BodyBuffer:
+    """Create a body buffer bounded by ``adapter_settings.body_limits``."""
+    limits = adapter_settings.body_limits
+    return BodyBuffer(body_budget, limits.max_stream_bytes, limits.spill_threshold, limits.spill_dir)
+
+
+def body_too_large_response() -> ep.ProcessingResponse:
+    """MCP error for a body denied by the ``deny`` over-limit policy."""
+    return create_mcp_immediate_error_response(
+        {"jsonrpc": "2.0", "id": None}, error_message="Body too large to be checked"
+    )
+
+
+def buffered_prefix(body, coding: Optional[str] = None) -> Optional[bytes]:
+    """The message at the start of an over-limit body, closed where it was cut off; None if there is none.
+
+    A compressed prefix is decoded first: the part that arrived decodes, it
+    just ends early. An SSE body whose first event is complete is returned
+    as it is.
+    """
+    if coding is not None:
+        if not is_supported(coding):
+            return None
+        try:
+            body = decode_body(coding, body, adapter_settings.max_decoded_body_bytes)
+        except ValueError:
+            return None
+    if looks_like_sse(body[:64]) and locate_message(body) is not None:
+        return body
+    return complete_prefix(body)
+
+
+async def process_over_limit_body(
+    buffer: BodyBuffer, phase: str, toolname: Optional[str] = None, coding: Optional[str] = None
+) -> ep.ProcessingResponse:
+    """Handle a complete BUFFERED body that went over the buffering limits.
+
+    Applies ``adapter_settings.body_limits.over_limit``: ``deny`` returns an
+    MCP error, ``prefix`` runs the hooks on the message cut off at the end of
+    the part that was buffered (see ``buffered_prefix``) and only enforces a
+    block (the rest of the body is gone, so it cannot be rewritten), and
+    ``passthrough`` forwards the body unchecked.
+
+    Args:
+        buffer: The over-limit body buffer
+        phase: ``request_body`` or ``response_body``
+        toolname: The mcp toolname in this session
+        coding: Normalized response content coding
+    """
+    policy = adapter_settings.body_limits.over_limit
+    metrics.BODIES_OVER_LIMIT.labels(phase=phase, policy=policy).inc()
+    if policy == "deny":
+        logger.warning("Denying %s over the body buffering limits", phase)
+        return body_too_large_response()
+    if policy == "prefix" and buffer:
+        prefix = buffered_prefix(await buffer.join(), coding)
+        try:
+            if prefix is None:
+                body_resp = None
+            elif phase == "request_body":
+                body_resp, _ = await process_request_body_buffer(prefix)
+            else:
+                body_resp = await process_response_body_buffer(prefix, toolname)
+        except json.JSONDecodeError:
+            body_resp = None
+        if body_resp is not None and body_resp.HasField("immediate_response"):
+            return body_resp
+    logger.warning("%s over the body buffering limits forwarded unchecked", phase)
+    return EMPTY_REQUEST_BODY_RESPONSE if phase == "request_body" else EMPTY_RESPONSE_BODY_RESPONSE
+
+
+async def streamed_over_limit(state: "StreamedBody", phase: str, chunk: bytes, end_of_stream: bool):
+    """Handle a FULL_DUPLEX_STREAMED body that went over the buffering limits.
+
+    The held chunks are ours to forward, so ``deny`` sends the MCP error (and
+    drops the rest of the body) while the other policies forward what is held
+    and stop inspecting the body.
+    """
+    policy = adapter_settings.body_limits.over_limit
+    metrics.BODIES_OVER_LIMIT.labels(phase=phase, policy=policy).inc()
+    held = bytes(await (state.raw if state.decoder is not None else state.buffer).join())
+    state.buffer.clear()
+    state.raw.clear()
+    if policy == "deny":
+        logger.warning("Denying streamed %s over the body buffering limits", phase)
+        state.kind = "denied"
+        error = body_too_large_response()
+        if phase == "request_body":
+            return [error]
+        body = error.immediate_response.body
+        if state.encoder is not None:
+            body = state.encoder.encode(body) + state.encoder.finish()
+        return [streamed_body_response(phase, body, True)]
+    logger.warning("Streamed %s over the body buffering limits forwarded unchecked", phase)
+    state.kind = "raw"
+    state.decoder = None
+    return [streamed_body_response(phase, held + chunk, end_of_stream)]
+
+
+def sse_over_limit(state: "StreamedBody", out: bytes, end_of_stream: bool) -> list[ep.ProcessingResponse]:
+    """Handle a FULL_DUPLEX_STREAMED SSE response whose pending event went over the buffering limits.
+
+    ``out`` holds the events completed so far, already inspected, which are
+    forwarded whatever the policy. ``deny`` then ends the stream with the MCP
+    error as one more event; the other policies forward the pending event and
+    the rest of the stream unchecked (still re-encoded if it was decoded).
+    """
+    policy = adapter_settings.body_limits.over_limit
+    metrics.BODIES_OVER_LIMIT.labels(phase="response_body", policy=policy).inc()
+    pending = state.events.flush()
+    if policy == "deny":
+        logger.warning("Denying streamed SSE response over the body buffering limits")
+        return end_sse_stream(state, out, "Body too large to be checked")
+    logger.warning("Streamed SSE response over the body buffering limits forwarded unchecked")
+    state.kind = "unchecked"
+    out += pending
+    if state.encoder is not None:
+        out = state.encoder.encode(out) + (state.encoder.finish() if end_of_stream else b"")
+    return [streamed_body_response("response_body", out, end_of_stream)]
+
+
+def end_sse_stream(state: "StreamedBody", out: bytes, error_message: str) -> list[ep.ProcessingResponse]:
+    """End a FULL_DUPLEX_STREAMED SSE response after ``out`` with an MCP error event, dropping the rest."""
+    state.kind = "denied"
+    error = create_mcp_immediate_error_response({"jsonrpc": "2.0", "id": None}, error_message=error_message)
+    out += replace_event_data(b"event: message\n\n", error.immediate_response.body)
+    if state.encoder is not None:
+        out = state.encoder.encode(out) + state.encoder.finish()
+    return [streamed_body_response("response_body", out, True)]
+
+
+# ============================================================================
+# FULL_DUPLEX_STREAMED BODY MODE
+# ============================================================================
+
+# ProcessingMode.BodySendMode.FULL_DUPLEX_STREAMED, as sent in ProcessingRequest.protocol_config
+FULL_DUPLEX_STREAMED = 4
+
+
+def get_header(headers, name: str) -> Optional[str]:
+    """Return the value of header ``name`` (lower case) from an Envoy HeaderMap."""
+    for header in headers.headers:
+        if header.key.lower() == name:
+            return header.raw_value.decode("utf-8", "replace") if header.raw_value else header.value
+    return None
+
+
+class StreamedBody:
+    """State for one direction of a FULL_DUPLEX_STREAMED body.
+
+    The body is classified from its content type (or first bytes) as SSE,
+    JSON or anything else. SSE is forwarded one complete event at a time, JSON
+    is held until end of stream because hooks need the whole message, and
+    anything else is forwarded chunk by chunk untouched.
+    """
+
+    __slots__ = ("content_type", "kind", "events", "buffer", "coding", "decoder", "encoder", "raw")
+
+    def __init__(self):
+        self.content_type = ""
+        self.kind: Optional[str] = None
+        self.events = SSEEventBuffer(adapter_settings.body_limits.max_stream_bytes, body_budget)
+        self.buffer = new_body_buffer()
+        # Content coding: chunks are decoded before inspection, and the
+        # still-encoded JSON body is kept so it can be forwarded as-is
+        self.coding: Optional[str] = None
+        self.decoder: Optional[Decoder] = None
+        self.encoder: Optional[Encoder] = None
+        self.raw = new_body_buffer()
+
+    def set_content_encoding(self, coding: Optional[str], max_size: int) -> None:
+        self.coding = coding
+        if coding is None:
+            return
+        if is_supported(coding):
+            self.decoder = Decoder(coding, max_size)
+            self.encoder = Encoder(coding)
         else:
-            return ep.ProcessingResponse(response_body=ep.BodyResponse(response=ep.CommonResponse()))
+            logger.warning("Unsupported content-encoding %r; streamed body not checked", coding)
+            self.kind = "raw"
+
+    async def decode(self, chunk: bytes) -> Optional[bytes]:
+        """Decode ``chunk``; on failure stop checking the body.
+
+        While everything received is still held (a JSON body, or the first
+        chunk), that is returned still encoded, to be forwarded as received.
+        Otherwise part of the body was already forwarded re-encoded, which raw
+        bytes cannot follow: the body is denied and None is returned.
+        """
+        if self.decoder is None:
+            return chunk
+        try:
+            return self.decoder.decode(chunk)
+        except ValueError as e:
+            self.decoder = None
+            self.buffer.clear()
+            if self.kind not in (None, "json"):
+                logger.warning("Could not decode %s streamed body after forwarding part of it: %s", self.coding, e)
+                self.kind = "denied"
+                return None
+            logger.warning("Could not decode %s streamed body; rest not checked: %s", self.coding, e)
+            self.raw.append(chunk)
+            held = await self.raw.join()
+            self.raw.clear()
+            self.kind = "raw"
+            return held
+
+    def classify(self, chunk: bytes) -> str:
+        if self.kind is None:
+            if "text/event-stream" in self.content_type:
+                self.kind = "sse"
+            elif "json" in self.content_type:
+                self.kind = "json"
+            elif self.content_type:
+                self.kind = "raw"
+            elif looks_like_sse(chunk):
+                self.kind = "sse"
+            elif chunk.lstrip().startswith((b"{", b"[")):
+                self.kind = "json"
+            else:
+                self.kind = "raw"
+        return self.kind
+
+
+def streamed_body_response(phase: str, body: bytes, end_of_stream: bool) -> ep.ProcessingResponse:
+    """Build a streamed body mutation for ``phase`` (``request_body`` or ``response_body``)."""
+    streamed = ep.StreamedBodyResponse(body=body, end_of_stream=end_of_stream)
+    body_resp = ep.BodyResponse(response=ep.CommonResponse(body_mutation=ep.BodyMutation(streamed_response=streamed)))
+    return ep.ProcessingResponse(**{phase: body_resp})
+
+
+def resulting_body(resp: ep.ProcessingResponse, phase: str, original):
+    """Return the body a buffered-mode response leaves in place: error, mutation or ``original``."""
+    if resp.HasField("immediate_response"):
+        return resp.immediate_response.body
+    mutation = getattr(resp, phase).response.body_mutation
+    if mutation.WhichOneof("mutation") == "body":
+        return mutation.body
+    return original
+
+
+async def inspect_sse_event(event: bytes, toolname: Optional[str], calls: Optional[RequestCalls] = None) -> bytes:
+    """Run the post-invoke hook on one SSE event and return the event to forward.
+
+    Blocked results replace the event data with the MCP error, since response
+    headers may already be on their way to the client.
+    """
+    opaque = strip_opaque(event, adapter_settings.opaque_min_bytes, BINARY_CONTENT_KEYS)
+    message = locate_message(opaque.text if opaque is not None else event)
+    if message is not None and isinstance(message.data, list):
+        new_event = await process_response_batch(message, toolname, calls, opaque)
+        return new_event if new_event is not None else event
+    if message is None or not is_tool_result(message.data):
+        return event
+    call = calls.lookup(message.data.get("id")) if calls is not None else None
+    resp = await getToolPostInvokeResponse(message.data, toolname, source=message, opaque=opaque, call=call)
+    if resp.HasField("immediate_response"):
+        return replace_event_data(event, resp.immediate_response.body)
+    return resulting_body(resp, "response_body", event)
+
+
+async def process_streamed_response_chunk(
+    state: StreamedBody,
+    chunk: bytes,
+    end_of_stream: bool,
+    toolname: Optional[str],
+    trailers: bool = False,
+    calls: Optional[RequestCalls] = None,
+) -> list[ep.ProcessingResponse]:
+    """Process one FULL_DUPLEX_STREAMED response body chunk.
+
+    Args:
+        state: Streamed body state for the response
+        chunk: Body bytes in this message
+        end_of_stream: Whether Envoy flagged this as the last body chunk
+        toolname: The mcp toolname in this session
+        trailers: Whether trailers arrived, which also ends the body
+        calls: The calls of the batch request this body answers, if any
+
+    Returns:
+        Streamed body responses to send back to Envoy (possibly none)
+    """
+    done = end_of_stream or trailers
+    if not chunk and not done:
+        return []
+    raw = chunk
+    if state.kind not in ("raw", "denied"):
+        chunk = await state.decode(raw)
+        if chunk is None:
+            return end_sse_stream(state, b"", "Body could not be checked")
+    kind = state.classify(chunk)
+    if kind == "sse":
+        out = bytearray()
+        pending = len(state.events)
+        events = state.events.feed(chunk)
+        if state.decoder is not None:
+            # The decoded size is capped per event, not over the whole stream
+            state.decoder.consumed(pending + len(chunk) - len(state.events))
+        for event in events:
+            out += await inspect_sse_event(event, toolname, calls)
+        if state.events.over_limit:
+            return sse_over_limit(state, bytes(out), end_of_stream)
+        if done and len(state.events):
+            out += await inspect_sse_event(state.events.flush(), toolname, calls)
+        if done and calls is not None and calls.errors:
+            out += batch_errors_event(calls.take_errors())
+        if state.encoder is not None:
+            out = state.encoder.encode(bytes(out)) + (state.encoder.finish() if done else b"")
+        if not out and not done:
+            return []
+        return [streamed_body_response("response_body", bytes(out), end_of_stream)]
+    if kind == "denied":
+        return []
+    if kind == "unchecked":
+        if state.decoder is not None:
+            state.decoder.consumed(len(chunk))
+        if state.encoder is not None:
+            chunk = state.encoder.encode(chunk) + (state.encoder.finish() if done else b"")
+        return [streamed_body_response("response_body", chunk, end_of_stream)]
+    if kind == "json":
+        if not state.buffer.append(chunk) or (state.decoder is not None and not state.raw.append(raw)):
+            return await streamed_over_limit(state, "response_body", raw, end_of_stream)
+        if not done:
+            return []
+        original = await state.buffer.join()
+        encoded = await state.raw.join() if state.decoder is not None else original
+        state.buffer.clear()
+        state.raw.clear()
+        resp = await process_response_body_buffer(original, toolname, calls)
+        body = resulting_body(resp, "response_body", None)
+        if body is None:
+            body = encoded
+        elif state.decoder is not None:
+            body = encode_body(state.coding, body)
+        return [streamed_body_response("response_body", body, end_of_stream)]
+    # Forward other bodies as received (``chunk`` is already the encoded remainder if decoding failed)
+    return [streamed_body_response("response_body", raw if state.decoder is not None else chunk, end_of_stream)]
+
+
+async def process_streamed_request_chunk(
+    state: StreamedBody, chunk: bytes, end_of_stream: bool, trailers: bool = False, calls: Optional[RequestCalls] = None
+) -> tuple[list[ep.ProcessingResponse], Optional[str]]:
+    """Process one FULL_DUPLEX_STREAMED request body chunk.
+
+    JSON bodies are held until the end so the pre-invoke hooks see the whole
+    message; blocked calls still get an immediate response since nothing has
+    reached the upstream yet.
+
+    Returns:
+        Responses to send back to Envoy (possibly none), and the tool or prompt
+        name once the request has been parsed
+    """
+    done = end_of_stream or trailers
+    if not chunk and not done:
+        return [], None
+    kind = state.classify(chunk)
+    if kind == "denied":
+        return [], None
+    if kind != "json":
+        return [streamed_body_response("request_body", chunk, end_of_stream)], None
+    if not state.buffer.append(chunk):
+        return await streamed_over_limit(state, "request_body", chunk, end_of_stream), None
+    if not done:
+        return [], None
+    original = await state.buffer.join()
+    state.buffer.clear()
+    resp, name = await process_request_body_buffer(original, calls)
+    if resp is None:
+        return [streamed_body_response("request_body", original, end_of_stream)], name
+    if resp.HasField("immediate_response"):
+        return [resp], name
+    return [streamed_body_response("request_body", resulting_body(resp, "request_body", original), end_of_stream)], name
+
+
+# Tool name of streams that called no tool (or fetched no prompt) yet
+UNKNOWN_TOOL = "changeme"
+
+
+class StreamState:
+    """Everything ``Process`` tracks for one ext_proc stream."""
+
+    __slots__ = (
+        "req_body",
+        "resp_body",
+        "tool_name",
+        "calls",
+        "resp_coding",
+        "req_stream",
+        "resp_stream",
+        "opened",
+        "phase",
+        "record",
+        "tenant",
+        "body_bytes",
+        "busy",
+    )
+
+    def __init__(self, streamed: bool = False):
+        self.opened = time.monotonic()
+        self.phase = "open"  # Kind of the last message received from Envoy
+        # Durations and verdicts for the Server-Timing header and dynamic metadata, if enabled
+        self.record: Optional[RequestRecord] = RequestRecord() if records_requests() else None
+        # Bodies of BUFFERED directions
+        self.req_body = new_body_buffer()
+        self.resp_body = new_body_buffer()
+        self.tool_name = UNKNOWN_TOOL  # Track tool name for response processing
+        # For the traffic profile, if enabled: who sent the stream, its body bytes and
+        # how long the adapter spent on its messages
+        self.tenant = ""
+        self.body_bytes = 0
+        self.busy = 0.0
+        self.calls = RequestCalls()  # Tool calls of the request and errors of blocked batch entries
+        self.resp_coding: Optional[str] = None  # Normalized response content-encoding
+        # FULL_DUPLEX_STREAMED state per direction; None while the direction is BUFFERED
+        self.req_stream: Optional[StreamedBody] = StreamedBody() if streamed else None
+        self.resp_stream: Optional[StreamedBody] = StreamedBody() if streamed else None
+
+    def describe(self, now: float) -> dict:
+        """The stream's phase, age and buffered bytes, for the admin endpoints."""
+        return {
+            "phase": self.phase,
+            "age": round(now - self.opened, 3),
+            "tool": self.tool_name,
+            "session_id": self.calls.session_id,
+            "streamed": {"request": self.req_stream is not None, "response": self.resp_stream is not None},
+            "buffered_bytes": len(self.req_body) + len(self.resp_body),
+        }
+
+
+# ``Process`` streams in flight
+active_streams: set[StreamState] = set()
+
+
+def profile_stream(state: StreamState) -> None:
+    """Count the tools called by a finished stream in ``traffic_profile``.
+
+    The body bytes and processing time of a JSON-RPC batch are split evenly between its calls.
+    """
+    if state.tool_name != UNKNOWN_TOOL:
+        tools = [state.tool_name]
     else:
-        logger.warning("No data parsed from response body")
-        return ep.ProcessingResponse(response_body=ep.BodyResponse(response=ep.CommonResponse()))
+        tools = [call.tool_name for call in state.calls.calls.values()]
+    for tool in tools:
+        traffic_profile.observe(state.tenant, tool, state.body_bytes // len(tools), state.busy / len(tools))
+
+
+# ============================================================================
+# OBSERVABILITY MODE
+# ============================================================================
+
+
+def observe_request_body(buffer: bytes) -> Optional[str]:
+    """Submit the pre-invoke hook for an observed request body in audit mode.
+
+    Returns:
+        The tool or prompt name from the request, if any
+    """
+    try:
+        body = json.loads(str(buffer, "utf-8"))
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        logger.debug("Observed request body is not JSON; skipping")
+        return None
+    if not isinstance(body, dict) or not isinstance(body.get("params"), dict) or "name" not in body["params"]:
+        return None
+    name = body["params"]["name"]
+    if body.get("method") == "tools/call":
+        payload_args = {
+            "tool_name": name,
+            "tool_args": body["params"].get("arguments"),
+            "client_session_id": "replaceme",
+        }
+        payload = ToolPreInvokePayload(name=name, args=payload_args)
+        submit_audit_hook(ToolHookType.TOOL_PRE_INVOKE.value, payload, name)
+    elif body.get("method") == "prompts/get":
+        payload = PromptPrehookPayload(prompt_id=name, args=body["params"].get("arguments"))
+        submit_audit_hook(PromptHookType.PROMPT_PRE_FETCH.value, payload, name)
+    return name
+
+
+def observe_response_body(buffer: bytes, toolname: str) -> None:
+    """Submit the post-invoke hook for an observed tool result in audit mode."""
+    if not buffer:
+        return
+    data = parse_response_body(buffer)
+    if data and is_tool_result(data):
+        payload = ToolPostInvokePayload(name=toolname, result=data["result"])
+        submit_audit_hook(ToolHookType.TOOL_POST_INVOKE.value, payload, toolname)
 
 
 # ============================================================================
@@ -336,117 +1376,228 @@ class ExtProcServicer(ep_grpc.ExternalProcessorServicer):
         - Response headers: Add custom headers to outgoing responses
         - Request body: Process MCP tool/prompt invocations
         - Response body: Process MCP tool results
+
+        Bodies are BUFFERED unless Envoy reports FULL_DUPLEX_STREAMED for a
+        direction in ``protocol_config`` (or ``adapter_settings.full_duplex_streamed``
+        is set), in which case chunks are answered with streamed body mutations
+        as soon as they have been inspected.
+
+        Streams opened by Envoy in observability mode are handed to
+        ``_observe_stream`` and never receive a response.
         """
-        req_body_buf = bytearray()
-        resp_body_buf = bytearray()
-        current_tool_name = "changeme"  # Track tool name for response processing
+        state = StreamState(streamed=adapter_settings.full_duplex_streamed)
+        limits = adapter_settings.body_limits
+        active_streams.add(state)
+        request_record.set(state.record)
+        stream_calls.set(state.calls)
 
         try:
             async for request in request_iterator:
+                state.phase = request.WhichOneof("request")
+                if traffic_profile is not None:
+                    started = time.perf_counter()
+                    if state.phase in ("request_body", "response_body"):
+                        state.body_bytes += len(getattr(request, state.phase).body)
+                if request.observability_mode:
+                    await self._observe_stream(state, request, request_iterator)
+                    return
+                if request.HasField("protocol_config"):
+                    config = request.protocol_config
+                    state.req_stream = StreamedBody() if config.request_body_mode == FULL_DUPLEX_STREAMED else None
+                    state.resp_stream = StreamedBody() if config.response_body_mode == FULL_DUPLEX_STREAMED else None
                 # ----------------------------------------------------------------
                 # Request Headers Processing
                 # ----------------------------------------------------------------
                 if request.HasField("request_headers"):
                     _headers = request.request_headers.headers
-                    yield ep.ProcessingResponse(
-                        request_headers=ep.HeadersResponse(
-                            response=ep.CommonResponse(
-                                header_mutation=ep.HeaderMutation(
-                                    set_headers=[
-                                        core.HeaderValueOption(
-                                            header=core.HeaderValue(
-                                                key="x-ext-proc-header",
-                                                raw_value="hello-from-ext-proc".encode("utf-8"),
-                                            ),
-                                            append_action=core.HeaderValueOption.APPEND_IF_EXISTS_OR_ADD,
-                                        )
-                                    ]
-                                )
-                            )
-                        )
-                    )
+                    state.calls.session_id = get_header(_headers, "mcp-session-id")
+                    state.calls.request_id = get_header(_headers, "x-request-id")
+                    if traffic_profile is not None and adapter_settings.traffic_profile.tenant_header:
+                        state.tenant = get_header(_headers, adapter_settings.traffic_profile.tenant_header) or ""
+                    if state.req_stream is not None:
+                        state.req_stream.content_type = get_header(_headers, "content-type") or ""
+                    yield REQUEST_HEADERS_RESPONSE
                 # ----------------------------------------------------------------
                 # Response Headers Processing
                 # ----------------------------------------------------------------
                 elif request.HasField("response_headers"):
                     _headers = request.response_headers.headers
-                    yield ep.ProcessingResponse(
-                        response_headers=ep.HeadersResponse(
-                            response=ep.CommonResponse(
-                                header_mutation=ep.HeaderMutation(
-                                    set_headers=[
-                                        core.HeaderValueOption(
-                                            header=core.HeaderValue(
-                                                key="x-ext-proc-response-header",
-                                                raw_value="processed-by-ext-proc".encode("utf-8"),
-                                            ),
-                                            append_action=core.HeaderValueOption.APPEND_IF_EXISTS_OR_ADD,
-                                        )
-                                    ]
-                                )
-                            )
+                    state.resp_coding = normalize(get_header(_headers, "content-encoding"))
+                    resp_stream = state.resp_stream
+                    if resp_stream is not None:
+                        resp_stream.content_type = get_header(_headers, "content-type") or ""
+                        resp_stream.set_content_encoding(state.resp_coding, adapter_settings.max_decoded_body_bytes)
+                    if resp_stream is not None and resp_stream.encoder is not None:
+                        # Streamed bodies are re-encoded, so the upstream length no longer holds
+                        headers_resp = header_mutation_response(
+                            "response_headers",
+                            "x-ext-proc-response-header",
+                            "processed-by-ext-proc",
+                            remove_headers=["content-length"],
                         )
+                    else:
+                        headers_resp = RESPONSE_HEADERS_RESPONSE
+                    yield annotate_response(headers_resp, state.record)
+                    if resp_stream is not None and state.record is not None:
+                        # Streamed bodies follow headers already sent to the client
+                        state.record.stop_timings()
+
+                # ----------------------------------------------------------------
+                # Request Body Processing, FULL_DUPLEX_STREAMED
+                # ----------------------------------------------------------------
+                elif request.HasField("request_body") and state.req_stream is not None:
+                    responses, name = await process_streamed_request_chunk(
+                        state.req_stream,
+                        request.request_body.body,
+                        request.request_body.end_of_stream,
+                        calls=state.calls,
                     )
+                    state.tool_name = name or state.tool_name
+                    for body_resp in responses:
+                        yield annotate_response(body_resp, state.record)
 
                 # ----------------------------------------------------------------
                 # Request Body Processing (MCP Tool/Prompt Invocations)
                 # ----------------------------------------------------------------
                 elif request.HasField("request_body") and request.request_body.body:
-                    chunk = request.request_body.body
-                    req_body_buf.extend(chunk)
+                    if not state.req_body.append(request.request_body.body) and limits.over_limit != "prefix":
+                        state.req_body.clear()
 
                     if getattr(request.request_body, "end_of_stream", False):
-                        try:
-                            text = req_body_buf.decode("utf-8")
-                        except UnicodeDecodeError:
-                            logger.debug("Request body not UTF-8; skipping")
+                        if state.req_body.over_limit:
+                            yield annotate_response(
+                                await process_over_limit_body(state.req_body, "request_body"), state.record
+                            )
                         else:
-                            logger.info(json.loads(text))
-                            body = json.loads(text)
-                            if "params" in body and "name" in body["params"]:
-                                current_tool_name = body["params"]["name"]
-                            if "method" in body and body["method"] == "tools/call":
-                                body_resp = await getToolPreInvokeResponse(body)
-                            elif "method" in body and body["method"] == "prompts/get":
-                                body_resp = await getPromptPreFetchResponse(body)
-                            else:
-                                body_resp = ep.ProcessingResponse(
-                                    request_body=ep.BodyResponse(response=ep.CommonResponse())
-                                )
-                            yield body_resp
-
-                        req_body_buf.clear()
+                            body = await state.req_body.join()
+                            body_resp, name = await process_request_body_buffer(body, state.calls)
+                            state.tool_name = name or state.tool_name
+                            if body_resp is not None:
+                                yield annotate_response(body_resp, state.record)
+
+                        state.req_body.clear()
+
+                # ----------------------------------------------------------------
+                # Response Body Processing, FULL_DUPLEX_STREAMED
+                # ----------------------------------------------------------------
+                elif request.HasField("response_body") and state.resp_stream is not None:
+                    for body_resp in await process_streamed_response_chunk(
+                        state.resp_stream,
+                        request.response_body.body,
+                        request.response_body.end_of_stream,
+                        state.tool_name,
+                        calls=state.calls,
+                    ):
+                        # The response headers are already on their way to the client
+                        yield annotate_response(body_resp, state.record, headers=False)
 
                 # ----------------------------------------------------------------
                 # Response Body Processing (MCP Tool Results)
                 # ----------------------------------------------------------------
                 elif request.HasField("response_body"):
-                    logger.debug(f"Processing response body: {request}")
+                    payload_logger.debug("Processing response body: %s", request)
 
                     # Buffer content if present in this chunk
-                    if request.response_body.body:
-                        chunk = request.response_body.body
-                        resp_body_buf.extend(chunk)
-                        logger.debug(f"Buffered chunk ({len(chunk)} bytes)")
+                    chunk = request.response_body.body
+                    if chunk:
+                        if state.resp_body.append(chunk):
+                            stream_logger.debug("Buffered chunk (%d bytes)", len(chunk))
+                        elif limits.over_limit != "prefix":
+                            # Over the limits: keep nothing, the body cannot be checked
+                            state.resp_body.clear()
 
                     # Check for end of stream (regardless of whether this chunk has content)
                     if getattr(request.response_body, "end_of_stream", False):
-                        logger.debug("End of stream reached, processing complete buffered response")
+                        stream_logger.debug("End of stream reached, processing complete buffered response")
 
                         # Process the buffered content
-                        body_resp = await process_response_body_buffer(resp_body_buf, current_tool_name)
-                        yield body_resp
-                        resp_body_buf.clear()
+                        if state.resp_body.over_limit:
+                            body_resp = await process_over_limit_body(
+                                state.resp_body, "response_body", state.tool_name, state.resp_coding
+                            )
+                        else:
+                            body_resp = await process_encoded_response_body(
+                                await state.resp_body.join(), state.tool_name, state.resp_coding, state.calls
+                            )
+                        yield annotate_response(body_resp, state.record)
+                        state.resp_body.clear()
                     else:
                         # Intermediate chunk - acknowledge but don't process yet
-                        logger.debug("Buffering intermediate chunk, waiting for end_of_stream")
-                        yield ep.ProcessingResponse(response_body=ep.BodyResponse(response=ep.CommonResponse()))
+                        stream_logger.debug("Buffering intermediate chunk, waiting for end_of_stream")
+                        yield EMPTY_RESPONSE_BODY_RESPONSE
+
+                # ----------------------------------------------------------------
+                # Trailers (sent when the body mode is FULL_DUPLEX_STREAMED);
+                # they end the body, so flush anything still held back first
+                # ----------------------------------------------------------------
+                elif request.HasField("request_trailers"):
+                    if state.req_stream is not None:
+                        responses, name = await process_streamed_request_chunk(
+                            state.req_stream, b"", False, trailers=True, calls=state.calls
+                        )
+                        state.tool_name = name or state.tool_name
+                        for body_resp in responses:
+                            yield annotate_response(body_resp, state.record)
+                    yield REQUEST_TRAILERS_RESPONSE
+                elif request.HasField("response_trailers"):
+                    if state.resp_stream is not None:
+                        for body_resp in await process_streamed_response_chunk(
+                            state.resp_stream, b"", False, state.tool_name, trailers=True, calls=state.calls
+                        ):
+                            yield annotate_response(body_resp, state.record, headers=False)
+                    yield RESPONSE_TRAILERS_RESPONSE
                 else:
                     # Unhandled request types
-                    logger.warning("Not processed")
-                    logger.warning(request)
+                    logger.warning("Not processed: %s", request.WhichOneof("request"))
+                    payload_logger.debug("Unprocessed request: %s", request)
+                if traffic_profile is not None:
+                    state.busy += time.perf_counter() - started
         except asyncio.CancelledError:
             logger.info("Process stream cancelled (client disconnect or pod rollover)")
+        finally:
+            active_streams.discard(state)
+            if traffic_profile is not None:
+                profile_stream(state)
+
+    async def _observe_stream(
+        self,
+        state: StreamState,
+        request: ep.ProcessingRequest,
+        request_iterator: AsyncIterator[ep.ProcessingRequest],
+    ) -> None:
+        """
+        Consume an observability-mode stream without responding.
+
+        Envoy does not wait for responses in observability mode, so bodies are
+        only buffered until end of stream and the hooks are submitted to the
+        bounded audit runner. Verdicts are recorded, never enforced. ``state``
+        is the stream's entry in ``active_streams``, so the stream shows up in
+        the admin endpoints and the traffic profile like any other.
+        """
+        while request is not None:
+            started = time.perf_counter()
+            if request.HasField("request_headers"):
+                _headers = request.request_headers.headers
+                state.calls.request_id = get_header(_headers, "x-request-id")
+                if traffic_profile is not None and adapter_settings.traffic_profile.tenant_header:
+                    state.tenant = get_header(_headers, adapter_settings.traffic_profile.tenant_header) or ""
+            elif request.HasField("request_body"):
+                state.req_body.append(request.request_body.body)
+                if request.request_body.end_of_stream:
+                    state.tool_name = observe_request_body(await state.req_body.join()) or state.tool_name
+                    state.req_body.clear()
+            elif request.HasField("response_body"):
+                state.resp_body.append(request.response_body.body)
+                if request.response_body.end_of_stream:
+                    observe_response_body(await state.resp_body.join(), state.tool_name)
+                    state.resp_body.clear()
+            if traffic_profile is not None:
+                state.busy += time.perf_counter() - started
+            request = await anext(request_iterator, None)
+            if request is not None:
+                state.phase = request.WhichOneof("request")
+                if traffic_profile is not None and state.phase in ("request_body", "response_body"):
+                    state.body_bytes += len(getattr(request, state.phase).body)
 
 
 # ============================================================================
@@ -454,6 +1605,197 @@ class ExtProcServicer(ep_grpc.ExternalProcessorServicer):
 # ============================================================================
 
 
+async def start_offload(plugin: PluginConfig, executor: str, plugin_dirs: list[str]):
+    """Start the worker processes or subinterpreters of ``plugin``.
+
+    Returns:
+        The started offload.
+
+    Raises:
+        ValueError: If the plugin is configured with ``executor: subinterpreter``
+            and this Python, or the plugin, cannot run in subinterpreters.
+    """
+    if executor == "process":
+        processes = adapter_settings.process_pool
+        offload = ProcessOffload(
+            plugin,
+            plugin_dirs,
+            workers=processes.workers,
+            transfer_threshold=processes.transfer_threshold,
+            health_interval=processes.health_interval,
+            health_timeout=processes.health_timeout,
+            start_timeout=processes.start_timeout,
+        )
+        await offload.start()
+        logger.info("Running hooks of %s in %d worker processes", plugin.name, processes.workers)
+        return offload
+    if not interpreters_supported():
+        raise ValueError(
+            f"Plugin {plugin.name!r}: executor 'subinterpreter' needs Python 3.14, or 3.13 with "
+            "interpreters-pep-734; use 'process' or 'thread'"
+        )
+    offload = InterpreterOffload(plugin, plugin_dirs, adapter_settings.subinterpreters.interpreters)
+    try:
+        await offload.start()
+    except Exception as e:
+        await offload.shutdown()
+        raise ValueError(
+            f"Plugin {plugin.name!r} cannot be loaded in a subinterpreter ({e!r}); use executor 'process' or 'thread'"
+        ) from e
+    logger.info("Running hooks of %s in %d subinterpreters", plugin.name, offload.interpreters)
+    return offload
+
+
+async def executor_options() -> dict:
+    """``AdapterExecutor`` options for ``adapter_settings`` and ``plugin_executors``.
+
+    Starts the worker processes and subinterpreters of the plugins configured to use them.
+
+    Returns:
+        The options, or an empty dict if the plugin manager's own executor will do.
+    """
+    options = {}
+    if adapter_settings.first_deny_wins:
+        options["first_deny_wins"] = True
+    ordering = adapter_settings.plugin_ordering
+    if ordering.enabled:
+        options["cost_model"] = PluginCostModel(ordering.reorderable, ordering.alpha, ordering.min_samples)
+    if adapter_settings.admin.port:
+        options["activity"] = PluginActivity()
+    if records_requests():
+        options["record_requests"] = True
+    if adapter_settings.audit_log.path:
+        settings = adapter_settings.audit_log
+        audit_log = AuditLog(
+            settings.path,
+            settings.format,
+            settings.max_queue,
+            settings.batch_size,
+            settings.flush_interval,
+            settings.max_bytes,
+            settings.backups,
+        )
+        audit_log.start()
+        options["audit_log"] = audit_log
+        logger.info("Writing audit records to %s", settings.path)
+    offloads = {}
+    threaded = [name for name, executor in plugin_executors.items() if executor == "thread"]
+    config = manager.config
+    for plugin in (config.plugins or []) if config else []:
+        executor = plugin_executors.get(plugin.name)
+        if executor in ("process", "subinterpreter") and plugin.mode != PluginMode.DISABLED:
+            offloads[plugin.name] = await start_offload(plugin, executor, config.plugin_dirs)
+    if threaded:
+        pool = ThreadOffload(adapter_settings.thread_pool.max_workers, adapter_settings.thread_pool.max_queue)
+        offloads.update(dict.fromkeys(threaded, pool))
+        logger.info("Running hooks of %s on a %d-thread pool", ", ".join(threaded), pool.max_workers)
+    if offloads:
+        options["offloads"] = offloads
+    return options
+
+
+def add_admin_routes(admin: AdminServer, loop_monitor: Optional[LoopMonitor] = None) -> None:
+    """Add the ``/admin/...`` endpoints reporting the live state of the adapter to ``admin``."""
+    loop = asyncio.get_running_loop()
+    executor = manager.executor if isinstance(manager.executor, AdapterExecutor) else None
+
+    def streams(query: dict[str, str]) -> dict:
+        limit = int(query.get("limit", 100))
+        now = time.monotonic()
+        oldest = sorted(active_streams, key=lambda state: state.opened)[:limit]
+        return {"count": len(active_streams), "streams": [state.describe(now) for state in oldest]}
+
+    def plugins(query: dict[str, str]) -> dict:
+        activity = executor.activity.snapshot() if executor and executor.activity else {}
+        blocking: dict[str, float] = {}
+        for (plugin, _), seconds in (loop_monitor.blocking if loop_monitor else {}).items():
+            blocking[plugin] = blocking.get(plugin, 0.0) + seconds
+        described = {}
+        for plugin in (manager.config.plugins or []) if manager.config else []:
+            described[plugin.name] = {
+                "mode": plugin.mode,
+                "executor": plugin_executors.get(plugin.name, "inline"),
+                **activity.get(plugin.name, {}),
+                "loop_blocked_seconds": blocking.get(plugin.name, 0.0),
+            }
+        return described
+
+    def caches(query: dict[str, str]) -> dict:
+        lookups = correlation_table.hits + correlation_table.misses
+        patterns = pattern_cache_info()
+        described = {
+            "correlation": {
+                "entries": len(correlation_table),
+                "max_entries": correlation_table.max_entries,
+                "hits": correlation_table.hits,
+                "misses": correlation_table.misses,
+                "hit_rate": correlation_table.hits / lookups if lookups else None,
+            },
+            "opaque_patterns": {"entries": patterns.currsize, "hits": patterns.hits, "misses": patterns.misses},
+        }
+        if executor and executor.cost_model:
+            described["plugin_ordering"] = {
+                "keys": len(executor.cost_model),
+                "max_keys": executor.cost_model.max_keys,
+                "saving_seconds": {
+                    f"{hook}/{tool}": order.saving for (hook, tool), order in executor.cost_model.orders().items()
+                },
+            }
+        return described
+
+    def limiters(query: dict[str, str]) -> dict:
+        described = {
+            "body_budget": {"used_bytes": body_budget.used, "max_bytes": body_budget.max_bytes},
+            "audit": {
+                "pending": shadow_runner.pending,
+                "max_pending": shadow_runner.max_pending,
+                "max_concurrency": shadow_runner.max_concurrency,
+                "dropped": shadow_runner.dropped,
+            },
+        }
+        if executor is None:
+            return described
+        described["abandoned_plugins"] = executor.abandoned
+        if executor.audit_log is not None:
+            audit_log = executor.audit_log
+            described["audit_log"] = {
+                "pending": audit_log.pending,
+                "max_queue": audit_log.max_queue,
+                "written": audit_log.written,
+                "dropped": audit_log.dropped,
+            }
+        for plugin, offload in executor.offloads.items():
+            if isinstance(offload, ThreadOffload):
+                state = {"pending": offload.pending, "max_workers": offload.max_workers, "max_queue": offload.max_queue}
+                described["thread_pool"] = state
+            elif isinstance(offload, ProcessOffload):
+                described.setdefault("process_pools", {})[plugin] = {"workers": offload.workers, "idle": offload.idle}
+            else:
+                described.setdefault("subinterpreters", {})[plugin] = {"interpreters": offload.interpreters}
+        return described
+
+    def traffic(query: dict[str, str]) -> dict:
+        if traffic_profile is None:
+            raise RuntimeError("The traffic profile is not enabled")
+        return traffic_profile.snapshot(int(query.get("limit", 20)))
+
+    def channelz(query: dict[str, str]) -> dict:
+        state = channelz_state()
+        if state is None:
+            raise RuntimeError("Channelz needs the grpcio-channelz package")
+        return state
+
+    for path, state in (
+        ("/admin/streams", streams),
+        ("/admin/plugins", plugins),
+        ("/admin/caches", caches),
+        ("/admin/limiters", limiters),
+        ("/admin/traffic", traffic),
+        ("/admin/channelz", channelz),
+    ):
+        admin.route("GET", path, json_endpoint(loop, state))
+
+
 async def serve(host: str = "0.0.0.0", port: int = 50052):
     """
     Initialize and start the gRPC external processor server.
@@ -463,8 +1805,37 @@ async def serve(host: str = "0.0.0.0", port: int = 50052):
         port: Port number to listen on (default: 50052)
     """
     await manager.initialize()
-    logger.info(f"Manager config: {manager.config}")
-    logger.debug(f"Loaded {manager.plugin_count} plugins")
+    logger.info("Manager config: %s", manager.config)
+    logger.debug("Loaded %d plugins", manager.plugin_count)
+    options = await executor_options()
+    if options:
+        manager.executor = AdapterExecutor.replacing(manager.executor, **options)
+
+    # Free body buffers of streams that stall mid-body
+    reaper = None
+    if adapter_settings.body_limits.idle_timeout:
+        reaper = asyncio.ensure_future(body_budget.run_reaper(adapter_settings.body_limits.idle_timeout))
+
+    # Measure event-loop lag and name the plugins blocking the loop
+    loop_monitor = monitor = None
+    if adapter_settings.loop_monitor.enabled:
+        settings = adapter_settings.loop_monitor
+        loop_monitor = LoopMonitor(settings.interval, settings.threshold, settings.log_interval)
+        monitor = asyncio.ensure_future(loop_monitor.run())
+
+    if adapter_settings.metrics_port:
+        if traffic_profile is not None:
+            metrics.register_collector(TrafficCollector(traffic_profile))
+        metrics.start_metrics_server(adapter_settings.metrics_port)
+        logger.info("Serving Prometheus metrics on port %d", adapter_settings.metrics_port)
+
+    # Profiling and introspection endpoints, off unless a port is configured
+    admin = None
+    if adapter_settings.admin.port:
+        settings = adapter_settings.admin
+        admin = AdminServer(settings.host, settings.port, settings.max_profile_seconds)
+        admin.start()
+        logger.info("Serving admin endpoints on %s:%d", admin.host, admin.port)
 
     server = grpc.aio.server()
     ep_grpc.add_ExternalProcessorServicer_to_server(ExtProcServicer(), server)
@@ -473,6 +1844,10 @@ async def serve(host: str = "0.0.0.0", port: int = 50052):
     health_servicer = grpc_health.HealthServicer()
     health_pb2_grpc.add_HealthServicer_to_server(health_servicer, server)
 
+    if admin is not None:
+        # Channelz is only read through /admin/channelz, never served on the ext_proc port
+        add_admin_routes(admin, loop_monitor)
+
     listen_addr = f"{host}:{port}"
     server.add_insecure_port(listen_addr)
     logger.info("Starting ext_proc server on %s", listen_addr)
@@ -486,9 +1861,23 @@ async def serve(host: str = "0.0.0.0", port: int = 50052):
 
     async def _shutdown():
         logger.info("SIGTERM received — draining in-flight streams (grace=15s)")
-        await manager.shutdown()
         health_servicer.set("", health_pb2.HealthCheckResponse.NOT_SERVING)
         await server.stop(grace=15)
+        # Flush the audit-mode hooks of the drained streams while plugins are still loaded
+        await shadow_runner.drain(timeout=adapter_settings.audit_mode.drain_timeout)
+        # Only now can no hook be waiting for a thread, worker process or subinterpreter
+        for offload in set(options.get("offloads", {}).values()):
+            await offload.shutdown()
+        # Every hook has reported its verdict; later records are counted as dropped
+        if "audit_log" in options:
+            await asyncio.to_thread(options["audit_log"].close, adapter_settings.audit_log.drain_timeout)
+        await manager.shutdown()
+        if reaper is not None:
+            reaper.cancel()
+        if monitor is not None:
+            monitor.cancel()
+        if admin is not None:
+            admin.stop()
 
     loop.add_signal_handler(signal.SIGTERM, lambda: asyncio.ensure_future(_shutdown()))
     logger.info("SIGTERM handler registered; waiting for termination")
@@ -507,6 +1896,24 @@ if __name__ == "__main__":
         logger.info("Manager main")
         pm_config = os.environ.get("PLUGIN_MANAGER_CONFIG", "./resources/config/config.yaml")
         manager = PluginManager(pm_config)
+        adapter_settings = load_adapter_settings(pm_config)
+        settings = adapter_settings.logging
+        log_listener = configure_logging(
+            settings.categories, settings.payload_sample_rate, settings.payload_max_chars, settings.queue_size
+        )
+        if log_listener is not None:
+            # Write out the queued records on exit
+            atexit.register(log_listener.stop)
+        plugin_executors = load_plugin_executors(pm_config)
+        shadow_runner = ShadowRunner(
+            max_concurrency=adapter_settings.audit_mode.max_concurrency,
+            max_pending=adapter_settings.audit_mode.max_pending,
+        )
+        body_budget = BodyBudget(adapter_settings.body_limits.max_total_bytes)
+        correlation_table = CorrelationTable(adapter_settings.correlation.max_entries, adapter_settings.correlation.ttl)
+        if adapter_settings.traffic_profile.enabled:
+            settings = adapter_settings.traffic_profile
+            traffic_profile = TrafficProfile(settings.top_k, settings.relative_accuracy)
         asyncio.run(serve())
         # serve()
     except KeyboardInterrupt:
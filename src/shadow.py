@@ -0,0 +1,84 @@
+"""Bounded background runner for audit (shadow) mode hook invocations."""
+
+# Standard
+import asyncio
+import logging
+from contextvars import ContextVar
+from typing import Awaitable, Optional
+
+logger = logging.getLogger("ext-proc-PM")
+
+# False in the tasks of a ShadowRunner: the verdicts of their hooks are recorded, never enforced
+enforcing: ContextVar[bool] = ContextVar("enforcing", default=True)
+
+
+class ShadowRunner:
+    """Run coroutines off the request path with bounded concurrency.
+
+    At most ``max_concurrency`` coroutines run at once and at most ``max_pending``
+    are held (running or waiting). Submissions past that are dropped rather than
+    queued, so a slow guardrail can never grow memory without bound.
+    """
+
+    def __init__(self, max_concurrency: int = 8, max_pending: int = 256):
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self.dropped = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._tasks: set[asyncio.Task] = set()
+
+    @property
+    def pending(self) -> int:
+        """Number of submitted coroutines that have not finished yet."""
+        return len(self._tasks)
+
+    def submit(self, coro: Awaitable, label: str = "") -> bool:
+        """Schedule ``coro`` in the background.
+
+        Args:
+            coro: The coroutine to run.
+            label: Short description used in log messages.
+
+        Returns:
+            True if scheduled, False if dropped because the runner is full.
+        """
+        if len(self._tasks) >= self.max_pending:
+            self.dropped += 1
+            coro.close()
+            logger.warning("Audit queue full (%d pending); dropping %s", len(self._tasks), label)
+            return False
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        task = asyncio.get_running_loop().create_task(self._run(coro, label))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    async def _run(self, coro: Awaitable, label: str) -> None:
+        # Each submission runs in its own task, so this only affects ``coro``
+        enforcing.set(False)
+        async with self._semaphore:
+            try:
+                await coro
+            except asyncio.CancelledError:
+                logger.warning("Audit invocation %s cancelled", label)
+                raise
+            except Exception as e:
+                logger.error("Audit invocation %s failed: %s", label, e)
+
+    async def drain(self, timeout: float) -> int:
+        """Wait up to ``timeout`` seconds for outstanding work, then cancel the rest.
+
+        Returns:
+            The number of invocations that had to be cancelled.
+        """
+        if not self._tasks:
+            return 0
+        logger.info("Flushing %d audit invocation(s) (timeout=%ss)", len(self._tasks), timeout)
+        _, still_pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+        for task in still_pending:
+            task.cancel()
+        if still_pending:
+            await asyncio.gather(*still_pending, return_exceptions=True)
+            logger.warning("Cancelled %d audit invocation(s) still running at shutdown", len(still_pending))
+        return len(still_pending)
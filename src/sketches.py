@@ -0,0 +1,125 @@
+"""Streaming sketches: summaries of unbounded streams in bounded memory.
+
+``SpaceSaving`` finds the heaviest keys of a stream (top-K by count or by
+weight); ``QuantileSketch`` estimates quantiles of a stream of positive
+values with a bounded relative error. Update them from one thread only;
+other threads may read them.
+"""
+
+# Standard
+import math
+from typing import Generic, Hashable, Optional, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+
+
+class SpaceSaving(Generic[K]):
+    """Heaviest keys of a stream, keeping at most ``capacity`` of them (the Space-Saving algorithm).
+
+    When a new key arrives with all slots taken, it replaces the lightest key
+    and inherits its weight as an overestimate. A key's estimate is thus at
+    most ``error`` above its true weight, and every key heavier than
+    ``total / capacity`` is kept.
+
+    Attributes:
+        capacity: Most keys tracked.
+        total: Weight of the whole stream.
+    """
+
+    __slots__ = ("capacity", "total", "_weights")
+
+    def __init__(self, capacity: int = 100):
+        self.capacity = capacity
+        self.total = 0.0
+        # Estimated weight and overestimate of each key
+        self._weights: dict[K, list[float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._weights)
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._weights
+
+    def add(self, key: K, weight: float = 1.0) -> Optional[K]:
+        """Add ``weight`` to ``key``.
+
+        Returns:
+            The key evicted to make room for ``key``, if any.
+        """
+        self.total += weight
+        entry = self._weights.get(key)
+        if entry is not None:
+            entry[0] += weight
+            return None
+        if len(self._weights) < self.capacity:
+            self._weights[key] = [weight, 0.0]
+            return None
+        # O(capacity), only for keys not tracked yet
+        lightest = min(self._weights, key=lambda tracked: self._weights[tracked][0])
+        floor = self._weights.pop(lightest)[0]
+        self._weights[key] = [floor + weight, floor]
+        return lightest
+
+    def top(self, k: Optional[int] = None) -> list[tuple[K, float, float]]:
+        """The ``k`` heaviest keys (all tracked keys by default) as (key, estimate, error), heaviest first."""
+        # list() copies the items in one step, so other threads may read while the event loop adds
+        ranked = sorted(list(self._weights.items()), key=lambda item: item[1][0], reverse=True)
+        return [(key, weight, error) for key, (weight, error) in ranked[:k]]
+
+
+class QuantileSketch:
+    """Quantiles of positive values within ``relative_accuracy``, from logarithmic buckets (like DDSketch).
+
+    Values are counted in buckets whose bounds grow by a factor of
+    ``(1 + relative_accuracy) / (1 - relative_accuracy)``, so any quantile is
+    reported within ``relative_accuracy`` of a value of the stream. Past
+    ``max_buckets``, the lowest buckets are merged, which only costs accuracy
+    on the smallest values.
+
+    Attributes:
+        relative_accuracy: Relative error of the reported quantiles.
+        max_buckets: Most buckets kept.
+        count: Values added.
+    """
+
+    __slots__ = ("relative_accuracy", "max_buckets", "count", "_gamma", "_log_gamma", "_buckets", "_zeros")
+
+    # Values up to this are counted as zero
+    MIN_VALUE = 1e-9
+
+    def __init__(self, relative_accuracy: float = 0.01, max_buckets: int = 2048):
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.count = 0
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._buckets: dict[int, int] = {}
+        self._zeros = 0
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        if value <= self.MIN_VALUE:
+            self._zeros += 1
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self._buckets[index] = self._buckets.get(index, 0) + 1
+        if len(self._buckets) > self.max_buckets:
+            lowest, second = sorted(self._buckets)[:2]
+            self._buckets[second] += self._buckets.pop(lowest)
+
+    def quantile(self, q: float) -> float:
+        """The ``q`` quantile (0 to 1) of the values added; 0.0 if none were."""
+        if not self.count:
+            return 0.0
+        rank = q * (self.count - 1)
+        seen = self._zeros
+        if rank < seen:
+            return 0.0
+        buckets = list(self._buckets.items())
+        buckets.sort()
+        for index, count in buckets:
+            seen += count
+            if rank < seen:
+                # Middle of the bucket (gamma^(index-1), gamma^index], in relative terms
+                return 2 * self._gamma**index / (self._gamma + 1)
+        return 2 * self._gamma ** buckets[-1][0] / (self._gamma + 1)
@@ -0,0 +1,135 @@
+"""Server-Sent Events framing helpers.
+
+MCP streamable HTTP returns JSON-RPC messages as SSE events. These helpers
+split a byte stream into complete events and read or replace the ``data``
+field of a single event while leaving the rest of its framing untouched.
+"""
+
+# Standard
+import re
+from typing import Optional
+
+# Local
+import metrics
+from body_budget import BodyBudget
+
+# An event ends at the first blank line; accept LF, CRLF and CR line endings
+_EVENT_END = re.compile(rb"\r\n\r\n|\n\n|\r\r")
+_LINE_END = re.compile(rb"\r\n|\n|\r")
+
+
+def looks_like_sse(chunk: bytes) -> bool:
+    """Guess whether a body starts with SSE framing."""
+    return chunk.lstrip().startswith((b"event:", b"data:", b"id:", b"retry:", b":"))
+
+
+class SSEEventBuffer:
+    """Reassemble complete SSE events from arbitrarily split body chunks.
+
+    The incomplete event being buffered is bounded like a ``BodyBuffer``: by
+    ``max_bytes`` and by the shared ``budget``. A chunk that does not fit
+    sets ``over_limit``, and what to do with the event is left to the caller.
+
+    Attributes:
+        max_bytes: Longest incomplete event buffered; 0 means unlimited.
+        budget: Shared budget the buffered bytes are drawn from, if any.
+        over_limit: Set once an incomplete event did not fit; stays set.
+    """
+
+    def __init__(self, max_bytes: int = 0, budget: Optional[BodyBudget] = None):
+        self.max_bytes = max_bytes
+        self.budget = budget
+        self.over_limit = False
+        self._buf = bytearray()
+        # Where to resume looking for a terminator; earlier bytes hold none
+        self._scanned = 0
+        self._reserved = 0
+
+    def feed(self, chunk: bytes) -> list[bytes]:
+        """Add a chunk and return the events it completes, terminators included.
+
+        The events completed are returned even when the incomplete event
+        left over is past the limits, which sets ``over_limit``. A chunk the
+        budget refuses is held unscanned, for the caller to ``flush``.
+        """
+        if self.budget is not None and chunk:
+            if not self.budget.reserve(len(chunk)):
+                self.over_limit = True
+                self._buf.extend(chunk)
+                return []
+            self._reserved += len(chunk)
+            metrics.BUFFERED_BODY_BYTES.labels(storage="memory").inc(len(chunk))
+        self._buf.extend(chunk)
+        events = []
+        start = 0
+        for match in _EVENT_END.finditer(self._buf, self._scanned):
+            events.append(bytes(self._buf[start : match.end()]))
+            start = match.end()
+        if start:
+            del self._buf[:start]
+        # A terminator is at most 4 bytes, so the next one cannot start before the last 3
+        self._scanned = max(len(self._buf) - 3, 0)
+        self._release()
+        if self.max_bytes and len(self._buf) > self.max_bytes:
+            self.over_limit = True
+        return events
+
+    def flush(self) -> bytes:
+        """Return and clear whatever incomplete event is still buffered."""
+        rest = bytes(self._buf)
+        self._buf.clear()
+        self._scanned = 0
+        self._release()
+        return rest
+
+    def _release(self) -> None:
+        """Return the bytes no longer buffered to the budget."""
+        freed = self._reserved - len(self._buf)
+        if self.budget is not None and freed > 0:
+            self.budget.release(freed)
+            self._reserved -= freed
+            metrics.BUFFERED_BODY_BYTES.labels(storage="memory").dec(freed)
+
+    def __len__(self) -> int:
+        return len(self._buf)
+
+    def __del__(self):
+        self.flush()
+
+
+def event_data(event: bytes) -> Optional[str]:
+    """Return the event's ``data`` field (multiple ``data:`` lines joined by newlines)."""
+    data_lines = []
+    for line in _LINE_END.split(event):
+        if line.startswith(b"data:"):
+            value = line[5:]
+            data_lines.append(value[1:] if value.startswith(b" ") else value)
+    if not data_lines:
+        return None
+    return b"\n".join(data_lines).decode("utf-8")
+
+
+def replace_event_data(event: bytes, data: bytes) -> bytes:
+    """Replace the ``data`` field of one event, keeping its other fields and terminator.
+
+    The new data is written as a single ``data:`` line in place of the first
+    original one; any further ``data:`` lines are dropped.
+    """
+    lines = _LINE_END.split(event)
+    newline = _LINE_END.search(event)
+    sep = newline.group(0) if newline else b"\n"
+    out = []
+    replaced = False
+    for line in lines:
+        if line.startswith(b"data:"):
+            if not replaced:
+                out.append(b"data: " + data)
+                replaced = True
+            continue
+        out.append(line)
+    if not replaced:
+        # No data field: insert before the terminating blank line(s)
+        while out and out[-1] == b"":
+            out.pop()
+        out.extend([b"data: " + data, b"", b""])
+    return sep.join(out)
@@ -0,0 +1,126 @@
+"""Run a plugin's hooks in subinterpreters with their own GIL.
+
+Worker processes cost a whole interpreter's memory and a process per
+plugin; threads share one GIL. Plugins configured with
+``executor: subinterpreter`` run in an ``InterpreterOffload``: a few
+subinterpreters of the adapter process, each with its own GIL and its own
+instance of the plugin, loaded once by the pool's initializer.
+
+Calls and replies cross interpreters as pickled ``bytes`` and use the same
+``HookRunner`` protocol as ``process_pool.ProcessOffload``, so the plugin sees
+and returns its context the same way in both modes.
+
+This needs ``concurrent.futures.InterpreterPoolExecutor`` (Python 3.14+),
+or on Python 3.13 its backport from the ``subinterpreters`` extra
+(``interpreters-pep-734``). Python 3.12 is not supported: its interpreter
+modules only come as a source build against CPython internals. On those
+Pythons, and for plugins whose dependencies cannot be imported in an
+isolated subinterpreter (anything built on ``pydantic-core``, including the
+cpex plugin base classes, today), the adapter refuses to start rather than
+run the plugin somewhere other than configured.
+"""
+
+# Standard
+import asyncio
+import concurrent.futures
+import logging
+import pickle
+from typing import Any, Callable, Optional
+
+try:
+    # Standard
+    from concurrent.futures import InterpreterPoolExecutor
+except ImportError:
+    try:
+        # Third-Party
+        from interpreters_backport.concurrent.futures import InterpreterPoolExecutor
+    except ImportError:  # pragma: no cover - optional dependency, Python 3.13 only
+        InterpreterPoolExecutor = None
+
+# First-Party
+from cpex.framework.base import HookRef
+from cpex.framework.models import PluginConfig, PluginContext
+
+# Local
+from process_pool import HookRunner, apply_outcome, dumps, pack_reply, ship_context
+
+logger = logging.getLogger("ext-proc-PM")
+
+# The plugin instance of the interpreter running this module, set by ``_initialize``
+_runner: Optional[HookRunner] = None
+
+
+def interpreters_supported() -> bool:
+    """Return True if this Python can run plugins in subinterpreters."""
+    return InterpreterPoolExecutor is not None
+
+
+def _initialize(config: bytes, plugin_dirs: tuple[str, ...]) -> None:
+    """Load the plugin in the calling interpreter."""
+    global _runner
+    _runner = HookRunner(pickle.loads(config), list(plugin_dirs))
+
+
+def _ping() -> bool:
+    return _runner is not None
+
+
+def _call(hook_name: str, args: bytes) -> tuple[str, bytes]:
+    """Run a hook in the calling interpreter; arguments and reply value are pickles."""
+    try:
+        kind, value = _runner.run(hook_name, pickle.loads(args))
+    except Exception as e:
+        kind, value = "error", e
+    return pack_reply(kind, value, None)
+
+
+class InterpreterOffload:
+    """Subinterpreters running the hooks of one plugin.
+
+    Attributes:
+        config: The plugin's configuration, used to load it in each interpreter.
+        plugin_dirs: Plugin search path of the plugin manager.
+        interpreters: Number of subinterpreters.
+    """
+
+    def __init__(self, config: PluginConfig, plugin_dirs: Optional[list[str]] = None, interpreters: int = 1):
+        self.config = config
+        self.plugin_dirs = plugin_dirs or []
+        self.interpreters = interpreters
+        self._pool: Optional[concurrent.futures.Executor] = None
+
+    async def start(self) -> None:
+        """Create the interpreters and load the plugin in each.
+
+        Raises:
+            Exception: Whatever kept the plugin from loading in a subinterpreter,
+                typically an extension module without subinterpreter support.
+        """
+        self._pool = InterpreterPoolExecutor(
+            max_workers=self.interpreters,
+            initializer=_initialize,
+            initargs=(pickle.dumps(self.config), tuple(self.plugin_dirs)),
+        )
+        # Interpreters start on demand; occupy each once so they all load the plugin now
+        await asyncio.gather(*(asyncio.wrap_future(self._pool.submit(_ping)) for _ in range(self.interpreters)))
+
+    def wrap(self, hook_ref: HookRef) -> Callable[..., Any]:
+        """Return a callable running ``hook_ref``'s hook in a subinterpreter."""
+
+        def offloaded(*args: Any) -> Any:
+            return self.call(hook_ref.name, *args)
+
+        return offloaded
+
+    async def call(self, hook_name: str, payload: Any, context: PluginContext, *extensions: Any) -> Any:
+        """Run hook ``hook_name`` in a subinterpreter and apply its effects on ``context``."""
+        args = dumps((payload, ship_context(context), *extensions))
+        kind, packed = await asyncio.wrap_future(self._pool.submit(_call, hook_name, args))
+        value = pickle.loads(packed)
+        if kind == "error":
+            raise value
+        return apply_outcome(context, value)
+
+    async def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
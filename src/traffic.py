@@ -0,0 +1,123 @@
+"""Which tools dominate the adapter's traffic, in bounded memory.
+
+``TrafficProfile`` is updated by ``Process`` when a stream that called a
+tool (or fetched a prompt) ends. It keeps the heaviest (tenant, tool) pairs
+by calls and by body bytes in ``sketches.SpaceSaving`` summaries, and a
+``sketches.QuantileSketch`` of the adapter's time per stream for each of the
+busiest tools. Memory, and the label sets of the ``TrafficCollector``
+metrics, stay bounded by ``top_k`` however many tools and tenants there are.
+"""
+
+# Standard
+from typing import Any, Iterator, Optional
+
+# Third-Party
+from prometheus_client.core import GaugeMetricFamily
+
+# Local
+from sketches import QuantileSketch, SpaceSaving
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class TrafficProfile:
+    """Heavy hitters and latency quantiles of the tools called through the adapter.
+
+    Attributes:
+        top_k: Most (tenant, tool) pairs tracked by calls and by bytes, and most tools with a latency sketch.
+        relative_accuracy: Relative error of the latency quantiles.
+        calls: Calls by (tenant, tool).
+        bytes: Request plus response body bytes by (tenant, tool).
+    """
+
+    def __init__(self, top_k: int = 100, relative_accuracy: float = 0.01):
+        self.top_k = top_k
+        self.relative_accuracy = relative_accuracy
+        self.calls: SpaceSaving[tuple[str, str]] = SpaceSaving(top_k)
+        self.bytes: SpaceSaving[tuple[str, str]] = SpaceSaving(top_k)
+        # Tools by calls, whatever the tenant; only these keep a latency sketch
+        self._tools: SpaceSaving[str] = SpaceSaving(top_k)
+        self._latency: dict[str, QuantileSketch] = {}
+
+    def observe(self, tenant: str, tool: str, size: int, seconds: float) -> None:
+        """Count a stream of ``tenant`` calling ``tool``, with ``size`` body bytes and ``seconds`` of processing."""
+        key = (tenant, tool)
+        self.calls.add(key)
+        if size:
+            self.bytes.add(key, size)
+        evicted = self._tools.add(tool)
+        if evicted is not None:
+            self._latency.pop(evicted, None)
+        sketch = self._latency.get(tool)
+        if sketch is None:
+            sketch = self._latency[tool] = QuantileSketch(self.relative_accuracy)
+        sketch.add(seconds)
+
+    def busiest_tools(self, limit: Optional[int] = None) -> list[str]:
+        """The ``limit`` most called tools, whatever the tenant, most called first."""
+        return [tool for tool, _, _ in self._tools.top(limit)]
+
+    def latency(self, tool: str) -> Optional[QuantileSketch]:
+        """Latency sketch of ``tool``; None if it is not among the busiest tools."""
+        return self._latency.get(tool)
+
+    def snapshot(self, limit: Optional[int] = None) -> dict[str, Any]:
+        """The ``limit`` heaviest (tenant, tool) pairs by calls and by bytes, and tool latency quantiles in seconds."""
+
+        def ranked(summary: SpaceSaving) -> list[dict[str, Any]]:
+            return [
+                {"tenant": tenant, "tool": tool, "estimate": weight, "max_overestimate": error}
+                for (tenant, tool), weight, error in summary.top(limit)
+            ]
+
+        return {
+            "streams": self.calls.total,
+            "bytes_total": self.bytes.total,
+            "calls": ranked(self.calls),
+            "bytes": ranked(self.bytes),
+            "latency": {
+                tool: {"count": sketch.count, **{f"p{round(q * 100)}": sketch.quantile(q) for q in QUANTILES}}
+                for tool in self.busiest_tools(limit)
+                if (sketch := self._latency.get(tool)) is not None
+            },
+        }
+
+
+class TrafficCollector:
+    """Prometheus collector reporting the heavy hitters of a ``TrafficProfile``.
+
+    Reads the profile from the exporter's thread; a scrape may miss an update
+    made at the same time, which the next scrape reports.
+    """
+
+    def __init__(self, profile: TrafficProfile):
+        self.profile = profile
+
+    def collect(self) -> Iterator[GaugeMetricFamily]:
+        calls = GaugeMetricFamily(
+            "plugins_adapter_top_tool_calls",
+            "Estimated calls of the heaviest (tenant, tool) pairs since startup",
+            labels=["tenant", "tool"],
+        )
+        for (tenant, tool), weight, _ in self.profile.calls.top():
+            calls.add_metric([tenant, tool], weight)
+        size = GaugeMetricFamily(
+            "plugins_adapter_top_tool_bytes",
+            "Estimated body bytes of the heaviest (tenant, tool) pairs since startup",
+            labels=["tenant", "tool"],
+        )
+        for (tenant, tool), weight, _ in self.profile.bytes.top():
+            size.add_metric([tenant, tool], weight)
+        latency = GaugeMetricFamily(
+            "plugins_adapter_tool_latency_seconds",
+            "Quantiles of the adapter's processing time per stream, for the busiest tools",
+            labels=["tool", "quantile"],
+        )
+        for tool in self.profile.busiest_tools():
+            sketch = self.profile.latency(tool)
+            if sketch is not None:
+                for q in QUANTILES:
+                    latency.add_metric([tool, str(q)], sketch.quantile(q))
+        yield calls
+        yield size
+        yield latency
@@ -26,6 +26,14 @@ class PassthroughPlugin(Plugin):
     # Class-level toggles so tests can control behavior
     block_pre_invoke = False
     block_post_invoke = False
+    # Tool names blocked by both tool hooks, whatever the toggles above say
+    blocked_tools: set[str] = set()
+    # When set, tool_post_invoke replaces the tool result with this value (or with its return value if callable)
+    replace_post_invoke_result = None
+    # (hook, tool name) of every invocation, for tests that run hooks in the background
+    calls: list[tuple[str, str]] = []
+    # (hook, payload, plugin context) of every invocation
+    payloads: list[tuple[str, object, PluginContext]] = []
 
     def __init__(self, config: PluginConfig):
         super().__init__(config)
@@ -35,9 +43,17 @@ class PassthroughPlugin(Plugin):
         """Reset toggles to default passthrough mode."""
         cls.block_pre_invoke = False
         cls.block_post_invoke = False
+        cls.blocked_tools = set()
+        cls.replace_post_invoke_result = None
+        cls.calls = []
+        cls.payloads = []
 
     async def tool_pre_invoke(self, payload: ToolPreInvokePayload, context: PluginContext) -> ToolPreInvokeResult:
-        if self.block_pre_invoke:
+        self.calls.append(("tool_pre_invoke", payload.name))
+        self.payloads.append(("tool_pre_invoke", payload, context))
+        # Lets tests check that the post-invoke hook gets this context back
+        context.state["pre_invoke_tool"] = payload.name
+        if self.block_pre_invoke or payload.name in self.blocked_tools:
             violation = PluginViolation(
                 reason="Blocked by test",
                 description="Pre-invoke blocked for testing",
@@ -48,7 +64,9 @@ class PassthroughPlugin(Plugin):
         return ToolPreInvokeResult(continue_processing=True)
 
     async def tool_post_invoke(self, payload: ToolPostInvokePayload, context: PluginContext) -> ToolPostInvokeResult:
-        if self.block_post_invoke:
+        self.calls.append(("tool_post_invoke", payload.name))
+        self.payloads.append(("tool_post_invoke", payload, context))
+        if self.block_post_invoke or payload.name in self.blocked_tools:
             violation = PluginViolation(
                 reason="Blocked by test",
                 description="Post-invoke blocked for testing",
@@ -56,4 +74,10 @@ class PassthroughPlugin(Plugin):
                 mcp_error_code=-32603,
             )
             return ToolPostInvokeResult(continue_processing=False, violation=violation)
+        if self.replace_post_invoke_result is not None:
+            result = self.replace_post_invoke_result
+            if callable(result):
+                result = result(payload.result)
+            modified = ToolPostInvokePayload(name=payload.name, result=result)
+            return ToolPostInvokeResult(continue_processing=True, modified_payload=modified)
         return ToolPostInvokeResult(continue_processing=True)
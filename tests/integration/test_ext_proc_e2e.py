@@ -7,6 +7,7 @@ and exercise the full request/response flow.
 import asyncio
 import json
 
+import grpc
 import pytest
 from envoy.config.core.v3 import base_pb2 as core
 from envoy.service.ext_proc.v3 import external_processor_pb2 as ep
@@ -251,3 +252,918 @@ async def test_stream_cancel_does_not_crash_server(grpc_stub):
     )
     response = await send_one(grpc_stub, follow_up)
     assert response.HasField("request_headers")
+
+
+# ---------------------------------------------------------------------------
+# Observability mode (fire-and-forget)
+# ---------------------------------------------------------------------------
+
+
+def observed_tool_call(tool_name):
+    """Request and response body messages for one tool call, flagged as observability mode."""
+    call = {
+        "jsonrpc": "2.0",
+        "id": "obs-1",
+        "method": "tools/call",
+        "params": {"name": tool_name, "arguments": {"msg": "hi"}},
+    }
+    result = {"jsonrpc": "2.0", "id": "obs-1", "result": {"content": [{"type": "text", "text": "out"}]}}
+    return [
+        ep.ProcessingRequest(
+            observability_mode=True, request_headers=ep.HttpHeaders(headers=core.HeaderMap(headers=[]))
+        ),
+        ep.ProcessingRequest(
+            observability_mode=True,
+            request_body=ep.HttpBody(body=json.dumps(call).encode("utf-8"), end_of_stream=True),
+        ),
+        ep.ProcessingRequest(
+            observability_mode=True,
+            response_body=ep.HttpBody(body=json.dumps(result).encode("utf-8"), end_of_stream=True),
+        ),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_observability_mode_sends_no_responses_and_runs_hooks(grpc_stub):
+    """Observability-mode streams get no responses; hooks still run in the background."""
+    import src.server as server_module
+
+    PassthroughPlugin.reset()
+    call = grpc_stub.Process()
+    for request in observed_tool_call("observed_tool"):
+        await call.write(request)
+    await call.done_writing()
+
+    assert await call.read() == grpc.aio.EOF
+    await server_module.shadow_runner.drain(timeout=1)
+    assert ("tool_pre_invoke", "observed_tool") in PassthroughPlugin.calls
+    assert ("tool_post_invoke", "observed_tool") in PassthroughPlugin.calls
+
+
+@pytest.mark.asyncio
+async def test_observability_mode_streams_are_profiled(grpc_stub, monkeypatch):
+    """Observed streams count in the traffic profile under the tool they called."""
+    import src.server as server_module
+    from traffic import TrafficProfile
+
+    profile = TrafficProfile()
+    monkeypatch.setattr(server_module, "traffic_profile", profile)
+    try:
+        call = grpc_stub.Process()
+        for request in observed_tool_call("profiled_tool"):
+            await call.write(request)
+        await call.done_writing()
+
+        assert await call.read() == grpc.aio.EOF
+        await server_module.shadow_runner.drain(timeout=1)
+        ((key, calls, _),) = profile.calls.top()
+        assert (key, calls) == (("", "profiled_tool"), 1)
+        assert profile.bytes.total > 0
+    finally:
+        PassthroughPlugin.reset()
+
+
+@pytest.mark.asyncio
+async def test_observability_mode_records_but_does_not_enforce_block(grpc_stub):
+    """A blocking plugin in observability mode only produces a recorded deny verdict."""
+    import metrics
+    import src.server as server_module
+
+    PassthroughPlugin.block_pre_invoke = True
+    denies = metrics.AUDIT_VERDICTS.labels(hook="tool_pre_invoke", verdict="deny")
+    before = denies._value.get()
+    try:
+        call = grpc_stub.Process()
+        for request in observed_tool_call("blocked_tool")[:2]:
+            await call.write(request)
+        await call.done_writing()
+
+        assert await call.read() == grpc.aio.EOF
+        await server_module.shadow_runner.drain(timeout=1)
+        assert denies._value.get() == before + 1
+    finally:
+        PassthroughPlugin.reset()
+
+
+# ---------------------------------------------------------------------------
+# FULL_DUPLEX_STREAMED body mode
+# ---------------------------------------------------------------------------
+
+FULL_DUPLEX_STREAMED = 4  # ProcessingMode.BodySendMode
+
+
+def streamed_config():
+    return ep.ProtocolConfiguration(request_body_mode=FULL_DUPLEX_STREAMED, response_body_mode=FULL_DUPLEX_STREAMED)
+
+
+def sse_headers():
+    return ep.HttpHeaders(
+        headers=core.HeaderMap(headers=[core.HeaderValue(key="content-type", raw_value=b"text/event-stream")])
+    )
+
+
+async def exchange(stub, requests):
+    """Write every request, then read responses until the server closes the stream."""
+    call = stub.Process()
+    for request in requests:
+        await call.write(request)
+    await call.done_writing()
+    responses = []
+    while (response := await call.read()) != grpc.aio.EOF:
+        responses.append(response)
+    return responses
+
+
+def streamed_bodies(responses, phase):
+    return [getattr(r, phase).response.body_mutation.streamed_response for r in responses if r.HasField(phase)]
+
+
+@pytest.mark.asyncio
+async def test_streamed_request_body_is_reassembled_and_forwarded(grpc_stub):
+    """A tools/call split across chunks is checked once and forwarded as a streamed body."""
+    PassthroughPlugin.reset()
+    body = json.dumps(
+        {"jsonrpc": "2.0", "id": "fd-1", "method": "tools/call", "params": {"name": "echo", "arguments": {}}}
+    ).encode("utf-8")
+    responses = await exchange(
+        grpc_stub,
+        [
+            ep.ProcessingRequest(protocol_config=streamed_config(), request_headers=ep.HttpHeaders()),
+            ep.ProcessingRequest(request_body=ep.HttpBody(body=body[:10])),
+            ep.ProcessingRequest(request_body=ep.HttpBody(body=body[10:], end_of_stream=True)),
+        ],
+    )
+
+    streamed = streamed_bodies(responses, "request_body")
+    assert b"".join(s.body for s in streamed) == body
+    assert streamed[-1].end_of_stream
+    assert PassthroughPlugin.calls == [("tool_pre_invoke", "echo")]
+
+
+@pytest.mark.asyncio
+async def test_streamed_request_body_blocked(grpc_stub):
+    """Blocked tool calls still get an immediate response in streamed mode."""
+    PassthroughPlugin.block_pre_invoke = True
+    try:
+        body = json.dumps(
+            {"jsonrpc": "2.0", "id": "fd-2", "method": "tools/call", "params": {"name": "x", "arguments": {}}}
+        ).encode("utf-8")
+        responses = await exchange(
+            grpc_stub,
+            [
+                ep.ProcessingRequest(protocol_config=streamed_config(), request_headers=ep.HttpHeaders()),
+                ep.ProcessingRequest(request_body=ep.HttpBody(body=body, end_of_stream=True)),
+            ],
+        )
+
+        assert responses[-1].HasField("immediate_response")
+        assert json.loads(responses[-1].immediate_response.body)["error"]["code"] == -32602
+    finally:
+        PassthroughPlugin.reset()
+
+
+@pytest.mark.asyncio
+async def test_streamed_sse_response_forwards_events_as_they_complete(grpc_stub):
+    """SSE events are forwarded as soon as each one is complete, not at end of stream."""
+    PassthroughPlugin.reset()
+    result = {"jsonrpc": "2.0", "id": "fd-3", "result": {"content": [{"type": "text", "text": "out"}]}}
+    event = b"event: message\ndata: " + json.dumps(result).encode("utf-8") + b"\n\n"
+    responses = await exchange(
+        grpc_stub,
+        [
+            ep.ProcessingRequest(protocol_config=streamed_config(), response_headers=sse_headers()),
+            ep.ProcessingRequest(response_body=ep.HttpBody(body=b": ping\n\n" + event[:20])),
+            ep.ProcessingRequest(response_body=ep.HttpBody(body=event[20:])),
+            ep.ProcessingRequest(response_body=ep.HttpBody(body=b"", end_of_stream=True)),
+        ],
+    )
+
+    streamed = streamed_bodies(responses, "response_body")
+    assert [s.body for s in streamed] == [b": ping\n\n", event, b""]
+    assert [s.end_of_stream for s in streamed] == [False, False, True]
+    assert ("tool_post_invoke", "changeme") in PassthroughPlugin.calls
+
+
+@pytest.mark.asyncio
+async def test_streamed_sse_response_blocked_result_replaced_in_event(grpc_stub):
+    """A blocked tool result is replaced by the MCP error inside the same SSE event."""
+    PassthroughPlugin.block_post_invoke = True
+    try:
+        result = {"jsonrpc": "2.0", "id": "fd-4", "result": {"content": [{"type": "text", "text": "secret"}]}}
+        event = b"event: message\r\ndata: " + json.dumps(result).encode("utf-8") + b"\r\n\r\n"
+        responses = await exchange(
+            grpc_stub,
+            [
+                ep.ProcessingRequest(protocol_config=streamed_config(), response_headers=sse_headers()),
+                ep.ProcessingRequest(response_body=ep.HttpBody(body=event, end_of_stream=True)),
+            ],
+        )
+
+        (streamed,) = streamed_bodies(responses, "response_body")
+        assert streamed.body.startswith(b"event: message\r\ndata: ")
+        assert streamed.body.endswith(b"\r\n\r\n")
+        assert b"secret" not in streamed.body
+        error = json.loads(streamed.body.split(b"data: ", 1)[1])
+        assert error["error"]["code"] == -32603
+    finally:
+        PassthroughPlugin.reset()
+
+
+@pytest.mark.asyncio
+async def test_streamed_response_trailers_flush_buffered_body(grpc_stub):
+    """Trailers end a streamed body: the held JSON is processed before the trailers are answered."""
+    PassthroughPlugin.reset()
+    result = json.dumps({"jsonrpc": "2.0", "id": "fd-5", "result": {"content": []}}).encode("utf-8")
+    responses = await exchange(
+        grpc_stub,
+        [
+            ep.ProcessingRequest(protocol_config=streamed_config(), response_headers=ep.HttpHeaders()),
+            ep.ProcessingRequest(response_body=ep.HttpBody(body=result)),
+            ep.ProcessingRequest(response_trailers=ep.HttpTrailers()),
+        ],
+    )
+
+    assert [s.body for s in streamed_bodies(responses, "response_body")] == [result]
+    assert responses[-1].HasField("response_trailers")
+
+
+# ---------------------------------------------------------------------------
+# Content-encoded response bodies
+# ---------------------------------------------------------------------------
+
+
+def gzip_headers(content_type="application/json"):
+    return ep.HttpHeaders(
+        headers=core.HeaderMap(
+            headers=[
+                core.HeaderValue(key="content-encoding", raw_value=b"gzip"),
+                core.HeaderValue(key="content-type", raw_value=content_type.encode("utf-8")),
+            ]
+        )
+    )
+
+
+@pytest.mark.asyncio
+async def test_gzip_response_is_checked(grpc_stub):
+    """A gzip tool result is decoded for the post-invoke hook and left untouched if allowed."""
+    import gzip
+
+    PassthroughPlugin.reset()
+    result = {"jsonrpc": "2.0", "id": "gz-1", "result": {"content": [{"type": "text", "text": "out"}]}}
+    responses = await exchange(
+        grpc_stub,
+        [
+            ep.ProcessingRequest(response_headers=gzip_headers()),
+            ep.ProcessingRequest(
+                response_body=ep.HttpBody(body=gzip.compress(json.dumps(result).encode("utf-8")), end_of_stream=True)
+            ),
+        ],
+    )
+
+    assert ("tool_post_invoke", "changeme") in PassthroughPlugin.calls
+    assert not responses[-1].response_body.response.HasField("body_mutation")
+
+
+@pytest.mark.asyncio
+async def test_gzip_response_mutation_is_recompressed(grpc_stub):
+    """A mutated gzip body is re-encoded with gzip and content-length is dropped."""
+    import gzip
+
+    PassthroughPlugin.replace_post_invoke_result = {"content": [{"type": "text", "text": "[redacted]"}]}
+    try:
+        result = {"jsonrpc": "2.0", "id": "gz-2", "result": {"content": [{"type": "text", "text": "secret"}]}}
+        responses = await exchange(
+            grpc_stub,
+            [
+                ep.ProcessingRequest(response_headers=gzip_headers()),
+                ep.ProcessingRequest(
+                    response_body=ep.HttpBody(
+                        body=gzip.compress(json.dumps(result).encode("utf-8")), end_of_stream=True
+                    )
+                ),
+            ],
+        )
+
+        common = responses[-1].response_body.response
+        assert json.loads(gzip.decompress(common.body_mutation.body))["result"]["content"][0]["text"] == "[redacted]"
+        assert "content-length" in common.header_mutation.remove_headers
+    finally:
+        PassthroughPlugin.reset()
+
+
+@pytest.mark.asyncio
+async def test_gzip_sse_streamed_is_reencoded(grpc_stub):
+    """Streamed gzip SSE is decoded per chunk, checked per event, and re-encoded as one gzip stream."""
+    import gzip
+
+    PassthroughPlugin.block_post_invoke = True
+    try:
+        result = {"jsonrpc": "2.0", "id": "gz-3", "result": {"content": [{"type": "text", "text": "secret"}]}}
+        sse = b"event: message\ndata: " + json.dumps(result).encode("utf-8") + b"\n\n"
+        encoded = gzip.compress(sse)
+        responses = await exchange(
+            grpc_stub,
+            [
+                ep.ProcessingRequest(
+                    protocol_config=streamed_config(), response_headers=gzip_headers("text/event-stream")
+                ),
+                ep.ProcessingRequest(response_body=ep.HttpBody(body=encoded[:15])),
+                ep.ProcessingRequest(response_body=ep.HttpBody(body=encoded[15:], end_of_stream=True)),
+            ],
+        )
+
+        assert "content-length" in responses[0].response_headers.response.header_mutation.remove_headers
+        forwarded = gzip.decompress(b"".join(s.body for s in streamed_bodies(responses, "response_body")))
+        assert b"secret" not in forwarded
+        assert json.loads(forwarded.split(b"data: ", 1)[1])["error"]["code"] == -32603
+    finally:
+        PassthroughPlugin.reset()
+
+
+@pytest.fixture
+def small_decoded_limit():
+    import src.server as server_module
+    from adapter_settings import AdapterSettings
+
+    original = server_module.adapter_settings
+    server_module.adapter_settings = AdapterSettings(max_decoded_body_bytes=256)
+    yield
+    server_module.adapter_settings = original
+
+
+def gzip_sse_stream(count):
+    """``count`` small SSE events compressed as one gzip stream, one flushed piece per event."""
+    from content_encoding import Encoder
+
+    encoder = Encoder("gzip")
+    events = [b"event: message\ndata: " + json.dumps({"n": n}).encode("utf-8") + b"\n\n" for n in range(count)]
+    pieces = [encoder.encode(event) for event in events]
+    pieces[-1] += encoder.finish()
+    return events, pieces
+
+
+@pytest.mark.asyncio
+async def test_long_gzip_sse_stream_is_capped_per_event(grpc_stub, small_decoded_limit):
+    """The decoded-size cap applies to each event, so a long stream of small events is checked throughout."""
+    import gzip
+
+    events, pieces = gzip_sse_stream(50)
+    headers = gzip_headers("text/event-stream")
+    requests = [ep.ProcessingRequest(protocol_config=streamed_config(), response_headers=headers)]
+    requests += [ep.ProcessingRequest(response_body=ep.HttpBody(body=piece)) for piece in pieces]
+    requests[-1].response_body.end_of_stream = True
+    responses = await exchange(grpc_stub, requests)
+
+    forwarded = gzip.decompress(b"".join(s.body for s in streamed_bodies(responses, "response_body")))
+    assert forwarded == b"".join(events)
+
+
+@pytest.mark.asyncio
+async def test_gzip_sse_decode_failure_ends_stream_with_error(grpc_stub):
+    """Raw bytes never follow re-encoded ones: a stream that stops decoding is ended with an error event."""
+    import gzip
+
+    events, pieces = gzip_sse_stream(2)
+    responses = await exchange(
+        grpc_stub,
+        [
+            ep.ProcessingRequest(protocol_config=streamed_config(), response_headers=gzip_headers("text/event-stream")),
+            ep.ProcessingRequest(response_body=ep.HttpBody(body=pieces[0])),
+            ep.ProcessingRequest(response_body=ep.HttpBody(body=b"not gzip at all")),
+            ep.ProcessingRequest(response_body=ep.HttpBody(body=pieces[1], end_of_stream=True)),
+        ],
+    )
+
+    bodies = streamed_bodies(responses, "response_body")
+    assert bodies[-1].end_of_stream
+    forwarded = gzip.decompress(b"".join(s.body for s in bodies))
+    assert forwarded.startswith(events[0])
+    error = forwarded[len(events[0]) :].split(b"data: ", 1)[1]
+    assert json.loads(error)["error"]["message"] == "Body could not be checked"
+
+
+# ---------------------------------------------------------------------------
+# Modified results keep the body layout
+# ---------------------------------------------------------------------------
+
+
+@pytest.mark.asyncio
+async def test_modified_sse_result_keeps_framing(grpc_stub):
+    """A modified result in a buffered SSE body is spliced in; the SSE envelope is kept."""
+    PassthroughPlugin.replace_post_invoke_result = {"content": [{"type": "text", "text": "[redacted]"}]}
+    try:
+        result = {"jsonrpc": "2.0", "id": "rw-1", "result": {"content": [{"type": "text", "text": "secret"}]}}
+        body = b"event: message\nid: 9\ndata: " + json.dumps(result).encode("utf-8") + b"\n\n"
+        response = await send_one(
+            grpc_stub, ep.ProcessingRequest(response_body=ep.HttpBody(body=body, end_of_stream=True))
+        )
+
+        mutated = response.response_body.response.body_mutation.body
+        assert mutated.startswith(b"event: message\nid: 9\ndata: ")
+        assert mutated.endswith(b"\n\n")
+        assert b"[redacted]" in mutated and b"secret" not in mutated
+    finally:
+        PassthroughPlugin.reset()
+
+
+@pytest.mark.asyncio
+async def test_unchanged_modified_result_is_not_a_mutation(grpc_stub):
+    """A plugin returning the same result as modified_payload causes no body mutation."""
+    content = {"content": [{"type": "text", "text": "same"}]}
+    PassthroughPlugin.replace_post_invoke_result = content
+    try:
+        body = json.dumps({"jsonrpc": "2.0", "id": "rw-2", "result": content}).encode("utf-8")
+        response = await send_one(
+            grpc_stub, ep.ProcessingRequest(response_body=ep.HttpBody(body=body, end_of_stream=True))
+        )
+
+        assert response.HasField("response_body")
+        assert not response.response_body.response.HasField("body_mutation")
+    finally:
+        PassthroughPlugin.reset()
+
+
+# ---------------------------------------------------------------------------
+# Body buffering limits
+# ---------------------------------------------------------------------------
+
+
+@pytest.fixture
+def small_body_limit():
+    """Limit buffered bodies to 128 bytes; yields a setter for the over-limit policy."""
+    import src.server as server_module
+    from adapter_settings import AdapterSettings, BodyLimitSettings
+
+    original = server_module.adapter_settings
+
+    def set_policy(policy):
+        server_module.adapter_settings = AdapterSettings(
+            body_limits=BodyLimitSettings(max_stream_bytes=128, over_limit=policy)
+        )
+
+    yield set_policy
+    server_module.adapter_settings = original
+
+
+def large_tool_result():
+    result = {"jsonrpc": "2.0", "id": "big-1", "result": {"content": [{"type": "text", "text": "x" * 200}]}}
+    body = json.dumps(result).encode("utf-8")
+    return [
+        ep.ProcessingRequest(response_body=ep.HttpBody(body=body[:40])),
+        ep.ProcessingRequest(response_body=ep.HttpBody(body=body[40:], end_of_stream=True)),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_over_limit_body_passthrough(grpc_stub, small_body_limit):
+    small_body_limit("passthrough")
+    PassthroughPlugin.block_post_invoke = True
+    try:
+        responses = await exchange(grpc_stub, large_tool_result())
+
+        assert [r.HasField("response_body") for r in responses] == [True, True]
+        assert PassthroughPlugin.calls == []
+    finally:
+        PassthroughPlugin.reset()
+
+
+@pytest.mark.asyncio
+async def test_over_limit_body_deny(grpc_stub, small_body_limit):
+    small_body_limit("deny")
+    responses = await exchange(grpc_stub, large_tool_result())
+
+    assert responses[-1].HasField("immediate_response")
+    assert "too large" in json.loads(responses[-1].immediate_response.body)["error"]["message"]
+
+
+@pytest.mark.asyncio
+async def test_over_limit_body_prefix_is_checked(grpc_stub, small_body_limit):
+    """With the prefix policy the buffered part is still parsed when it holds a whole message."""
+    small_body_limit("prefix")
+    PassthroughPlugin.block_post_invoke = True
+    try:
+        result = {"jsonrpc": "2.0", "id": "big-2", "result": {"content": []}}
+        event = b"data: " + json.dumps(result).encode("utf-8") + b"\n\n"
+        responses = await exchange(
+            grpc_stub,
+            [
+                ep.ProcessingRequest(response_body=ep.HttpBody(body=event)),
+                ep.ProcessingRequest(response_body=ep.HttpBody(body=b"data: " + b"x" * 200, end_of_stream=True)),
+            ],
+        )
+
+        assert responses[-1].HasField("immediate_response")
+        assert json.loads(responses[-1].immediate_response.body)["error"]["code"] == -32603
+    finally:
+        PassthroughPlugin.reset()
+
+
+@pytest.mark.asyncio
+async def test_over_limit_json_prefix_is_checked(grpc_stub, small_body_limit):
+    """With the prefix policy a JSON body cut off by the limit is closed and checked."""
+    small_body_limit("prefix")
+    PassthroughPlugin.block_post_invoke = True
+    body = b"".join(r.response_body.body for r in large_tool_result())
+    requests = [ep.ProcessingRequest(response_body=ep.HttpBody(body=body[i : i + 40])) for i in range(0, len(body), 40)]
+    requests[-1].response_body.end_of_stream = True
+    try:
+        responses = await exchange(grpc_stub, requests)
+
+        assert responses[-1].HasField("immediate_response")
+        hook, payload, _ = PassthroughPlugin.payloads[0]
+        assert payload.result["content"][0]["text"].startswith("xxx")
+    finally:
+        PassthroughPlugin.reset()
+
+
+@pytest.mark.asyncio
+async def test_over_limit_streamed_body_is_flushed(grpc_stub, small_body_limit):
+    """In FULL_DUPLEX_STREAMED mode the held chunks are forwarded once the body goes over the limit."""
+    small_body_limit("passthrough")
+    requests = large_tool_result()
+    body = requests[0].response_body.body + requests[1].response_body.body
+    responses = await exchange(
+        grpc_stub,
+        [ep.ProcessingRequest(protocol_config=streamed_config(), response_headers=ep.HttpHeaders())] + requests,
+    )
+
+    assert b"".join(s.body for s in streamed_bodies(responses, "response_body")) == body
+
+
+def large_sse_result():
+    """A checked event, then one event too large to hold."""
+    result = {"jsonrpc": "2.0", "id": "sse-1", "result": {"content": [{"type": "text", "text": "ok"}]}}
+    event = b"event: message\ndata: " + json.dumps(result).encode("utf-8") + b"\n\n"
+    return [
+        ep.ProcessingRequest(protocol_config=streamed_config(), response_headers=sse_headers()),
+        ep.ProcessingRequest(response_body=ep.HttpBody(body=event + b"data: " + b"x" * 100)),
+        ep.ProcessingRequest(response_body=ep.HttpBody(body=b"x" * 100)),
+        ep.ProcessingRequest(response_body=ep.HttpBody(body=b"\n\n", end_of_stream=True)),
+    ], event
+
+
+@pytest.mark.asyncio
+async def test_over_limit_streamed_sse_forwards_rest_unchecked(grpc_stub, small_body_limit):
+    """Events completed before the limit are checked; the event over it and the rest are passed through."""
+    small_body_limit("passthrough")
+    requests, event = large_sse_result()
+    try:
+        responses = await exchange(grpc_stub, requests)
+
+        bodies = streamed_bodies(responses, "response_body")
+        assert b"".join(s.body for s in bodies) == event + b"data: " + b"x" * 200 + b"\n\n"
+        assert bodies[-1].end_of_stream
+        assert len(PassthroughPlugin.calls) == 1
+    finally:
+        PassthroughPlugin.reset()
+
+
+@pytest.mark.asyncio
+async def test_over_limit_streamed_sse_deny_ends_with_error_event(grpc_stub, small_body_limit):
+    small_body_limit("deny")
+    requests, event = large_sse_result()
+    try:
+        responses = await exchange(grpc_stub, requests)
+
+        bodies = streamed_bodies(responses, "response_body")
+        assert [s.end_of_stream for s in bodies] == [False, True]
+        assert bodies[0].body == event
+        error = bodies[1].body.split(b"data: ", 1)[1]
+        assert "too large" in json.loads(error)["error"]["message"]
+    finally:
+        PassthroughPlugin.reset()
+
+
+# ---------------------------------------------------------------------------
+# Opaque binary content
+# ---------------------------------------------------------------------------
+
+IMAGE_DATA = "iVBORw0KGgo" + "A" * 8001
+
+
+def image_tool_result(request_id):
+    content = [{"type": "text", "text": "secret"}, {"type": "image", "mimeType": "image/png", "data": IMAGE_DATA}]
+    return json.dumps({"jsonrpc": "2.0", "id": request_id, "result": {"content": content}}).encode("utf-8")
+
+
+@pytest.mark.asyncio
+async def test_image_content_reaches_plugins_as_placeholder(grpc_stub):
+    """Plugins see a placeholder for base64 image data; the base64 text is in the context metadata."""
+    try:
+        body = image_tool_result("op-1")
+        response = await send_one(
+            grpc_stub, ep.ProcessingRequest(response_body=ep.HttpBody(body=body, end_of_stream=True))
+        )
+
+        assert not response.response_body.response.HasField("body_mutation")
+        hook, payload, context = PassthroughPlugin.payloads[0]
+        placeholder = payload.result["content"][1]["data"]
+        assert placeholder.startswith("<opaque:") and IMAGE_DATA not in str(payload.result)
+        assert bytes(context.global_context.metadata["opaque_content"][placeholder]) == IMAGE_DATA.encode("ascii")
+    finally:
+        PassthroughPlugin.reset()
+
+
+@pytest.mark.asyncio
+async def test_modified_result_restores_image_content(grpc_stub):
+    """A plugin that edits the text of a result keeps the image; its base64 is restored byte for byte."""
+
+    def redact_text(result):
+        return {"content": [dict(item, text="[redacted]") if "text" in item else item for item in result["content"]]}
+
+    PassthroughPlugin.replace_post_invoke_result = staticmethod(redact_text)
+    try:
+        response = await send_one(
+            grpc_stub,
+            ep.ProcessingRequest(response_body=ep.HttpBody(body=image_tool_result("op-2"), end_of_stream=True)),
+        )
+
+        mutated = json.loads(response.response_body.response.body_mutation.body)
+        assert mutated["result"]["content"][0]["text"] == "[redacted]"
+        assert mutated["result"]["content"][1]["data"] == IMAGE_DATA
+    finally:
+        PassthroughPlugin.reset()
+
+
+def upload_call(request_id, key):
+    request = {
+        "jsonrpc": "2.0",
+        "id": request_id,
+        "method": "tools/call",
+        "params": {"name": "upload", "arguments": {key: IMAGE_DATA}},
+    }
+    return ep.ProcessingRequest(request_body=ep.HttpBody(body=json.dumps(request).encode("utf-8"), end_of_stream=True))
+
+
+@pytest.mark.asyncio
+async def test_tool_call_arguments_reach_plugins_in_full(grpc_stub):
+    """By default request bodies are not stripped: base64-looking arguments are checked like any other."""
+    try:
+        response = await send_one(grpc_stub, upload_call("op-3", "data"))
+
+        assert response.HasField("request_body")
+        _, payload, _ = PassthroughPlugin.payloads[0]
+        assert payload.args["tool_args"]["data"] == IMAGE_DATA
+    finally:
+        PassthroughPlugin.reset()
+
+
+@pytest.mark.asyncio
+async def test_tool_call_binary_members_are_forwarded_when_enabled(grpc_stub):
+    """With ``opaque_requests``, large base64 ``data`` arguments are hidden from plugins and forwarded as-is."""
+    import src.server as server_module
+    from adapter_settings import AdapterSettings
+
+    original = server_module.adapter_settings
+    server_module.adapter_settings = AdapterSettings(opaque_requests=True)
+    try:
+        data = await send_one(grpc_stub, upload_call("op-4", "data"))
+        await send_one(grpc_stub, upload_call("op-5", "file"))
+
+        assert not data.request_body.response.HasField("body_mutation")
+        (_, data_payload, _), (_, other_payload, _) = PassthroughPlugin.payloads
+        assert data_payload.args["tool_args"]["data"].startswith("<opaque:")
+        assert other_payload.args["tool_args"]["file"] == IMAGE_DATA
+    finally:
+        server_module.adapter_settings = original
+        PassthroughPlugin.reset()
+
+
+# ---------------------------------------------------------------------------
+# JSON-RPC batches
+# ---------------------------------------------------------------------------
+
+
+def tool_call(request_id, name):
+    return {"jsonrpc": "2.0", "id": request_id, "method": "tools/call", "params": {"name": name, "arguments": {}}}
+
+
+def tool_result(request_id, text="ok"):
+    return {"jsonrpc": "2.0", "id": request_id, "result": {"content": [{"type": "text", "text": text}]}}
+
+
+def request_then_response(request_batch, response_body):
+    return [
+        ep.ProcessingRequest(
+            request_body=ep.HttpBody(body=json.dumps(request_batch).encode("utf-8"), end_of_stream=True)
+        ),
+        ep.ProcessingRequest(response_body=ep.HttpBody(body=response_body, end_of_stream=True)),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_batch_request_passthrough_checks_every_call(grpc_stub):
+    try:
+        batch = [tool_call(1, "alpha"), {"jsonrpc": "2.0", "method": "notifications/initialized"}, tool_call(2, "beta")]
+        response = await send_one(
+            grpc_stub,
+            ep.ProcessingRequest(request_body=ep.HttpBody(body=json.dumps(batch).encode("utf-8"), end_of_stream=True)),
+        )
+
+        assert response.HasField("request_body")
+        assert not response.request_body.response.HasField("body_mutation")
+        assert sorted(PassthroughPlugin.calls) == [("tool_pre_invoke", "alpha"), ("tool_pre_invoke", "beta")]
+    finally:
+        PassthroughPlugin.reset()
+
+
+@pytest.mark.asyncio
+async def test_batch_request_blocked_entry_answered_in_response(grpc_stub):
+    """A blocked entry is dropped from the forwarded batch and its error added to the batch response."""
+    PassthroughPlugin.blocked_tools = {"beta"}
+    try:
+        requests = request_then_response(
+            [tool_call(1, "alpha"), tool_call(2, "beta")], json.dumps([tool_result(1)]).encode("utf-8")
+        )
+        responses = await exchange(grpc_stub, requests)
+
+        forwarded = json.loads(responses[0].request_body.response.body_mutation.body)
+        assert [entry["id"] for entry in forwarded] == [1]
+        answered = json.loads(responses[1].response_body.response.body_mutation.body)
+        assert answered[0] == tool_result(1)
+        assert answered[1]["id"] == 2 and answered[1]["error"]["code"] == -32602
+    finally:
+        PassthroughPlugin.reset()
+
+
+@pytest.mark.asyncio
+async def test_batch_request_all_blocked_is_answered_immediately(grpc_stub):
+    PassthroughPlugin.block_pre_invoke = True
+    try:
+        batch = [tool_call(1, "alpha"), tool_call(2, "beta")]
+        response = await send_one(
+            grpc_stub,
+            ep.ProcessingRequest(request_body=ep.HttpBody(body=json.dumps(batch).encode("utf-8"), end_of_stream=True)),
+        )
+
+        errors = json.loads(response.immediate_response.body)
+        assert sorted(error["id"] for error in errors) == [1, 2]
+    finally:
+        PassthroughPlugin.reset()
+
+
+@pytest.mark.asyncio
+async def test_batch_response_results_checked_under_their_tool_names(grpc_stub):
+    """Each result in a batch response is checked as the tool its request called; blocked ones become errors."""
+    try:
+        # beta is only blocked on the way back: the block list is set after the request passed
+        call = grpc_stub.Process()
+        batch = [tool_call(1, "alpha"), tool_call(2, "beta")]
+        await call.write(
+            ep.ProcessingRequest(request_body=ep.HttpBody(body=json.dumps(batch).encode("utf-8"), end_of_stream=True))
+        )
+        await call.read()
+        PassthroughPlugin.blocked_tools = {"beta"}
+        body = b"event: message\ndata: " + json.dumps([tool_result(1), tool_result(2)]).encode("utf-8") + b"\n\n"
+        await call.write(ep.ProcessingRequest(response_body=ep.HttpBody(body=body, end_of_stream=True)))
+        await call.done_writing()
+        response = await call.read()
+
+        mutated = response.response_body.response.body_mutation.body
+        assert mutated.startswith(b"event: message\ndata: [")
+        answered = json.loads(mutated[len(b"event: message\ndata: ") :])
+        assert answered[0] == tool_result(1)
+        assert answered[1]["id"] == 2 and answered[1]["error"]["code"] == -32603
+        assert ("tool_post_invoke", "alpha") in PassthroughPlugin.calls
+        assert ("tool_post_invoke", "beta") in PassthroughPlugin.calls
+    finally:
+        PassthroughPlugin.reset()
+
+
+@pytest.mark.asyncio
+async def test_batch_errors_appended_to_sse_response_as_event(grpc_stub):
+    PassthroughPlugin.blocked_tools = {"beta"}
+    try:
+        event = b"event: message\ndata: " + json.dumps(tool_result(1)).encode("utf-8") + b"\n\n"
+        batch = [tool_call(1, "alpha"), tool_call(2, "beta")]
+        responses = await exchange(grpc_stub, request_then_response(batch, event))
+
+        mutated = responses[1].response_body.response.body_mutation.body
+        assert mutated.startswith(event)
+        errors = json.loads(mutated[len(event) :].split(b"data: ", 1)[1])
+        assert [error["id"] for error in errors] == [2]
+    finally:
+        PassthroughPlugin.reset()
+
+
+# ---------------------------------------------------------------------------
+# Cross-stream correlation
+# ---------------------------------------------------------------------------
+
+
+def session_headers(session_id):
+    return ep.HttpHeaders(
+        headers=core.HeaderMap(headers=[core.HeaderValue(key="mcp-session-id", raw_value=session_id.encode("utf-8"))])
+    )
+
+
+@pytest.mark.asyncio
+async def test_result_on_other_stream_is_checked_under_called_tool(grpc_stub):
+    """A result arriving on the session's GET SSE stream is checked under the tool its request called."""
+    try:
+        call = {"jsonrpc": "2.0", "id": 41, "method": "tools/call", "params": {"name": "secret_tool", "arguments": {}}}
+        await exchange(
+            grpc_stub,
+            [
+                ep.ProcessingRequest(request_headers=session_headers("sess-1")),
+                ep.ProcessingRequest(
+                    request_body=ep.HttpBody(body=json.dumps(call).encode("utf-8"), end_of_stream=True)
+                ),
+            ],
+        )
+        # Only block the tool once its call has gone through
+        PassthroughPlugin.blocked_tools = {"secret_tool"}
+
+        event = b"event: message\ndata: " + json.dumps(tool_result(41)).encode("utf-8") + b"\n\n"
+        responses = await exchange(
+            grpc_stub,
+            [
+                ep.ProcessingRequest(request_headers=session_headers("sess-1")),
+                ep.ProcessingRequest(response_body=ep.HttpBody(body=event, end_of_stream=True)),
+            ],
+        )
+
+        assert ("tool_post_invoke", "secret_tool") in PassthroughPlugin.calls
+        assert responses[-1].HasField("immediate_response")
+    finally:
+        PassthroughPlugin.reset()
+
+
+@pytest.mark.asyncio
+async def test_correlation_is_per_session(grpc_stub):
+    try:
+        call = {"jsonrpc": "2.0", "id": 42, "method": "tools/call", "params": {"name": "some_tool", "arguments": {}}}
+        await exchange(
+            grpc_stub,
+            [
+                ep.ProcessingRequest(request_headers=session_headers("sess-a")),
+                ep.ProcessingRequest(
+                    request_body=ep.HttpBody(body=json.dumps(call).encode("utf-8"), end_of_stream=True)
+                ),
+            ],
+        )
+        await exchange(
+            grpc_stub,
+            [
+                ep.ProcessingRequest(request_headers=session_headers("sess-b")),
+                ep.ProcessingRequest(
+                    response_body=ep.HttpBody(body=json.dumps(tool_result(42)).encode("utf-8"), end_of_stream=True)
+                ),
+            ],
+        )
+
+        assert ("tool_post_invoke", "some_tool") not in PassthroughPlugin.calls
+    finally:
+        PassthroughPlugin.reset()
+
+
+@pytest.mark.asyncio
+async def test_post_invoke_gets_pre_invoke_context(grpc_stub):
+    """The post-invoke hook of a call sees the plugin context its pre-invoke hook left, under the same request id."""
+    try:
+        call = {"jsonrpc": "2.0", "id": 43, "method": "tools/call", "params": {"name": "ctx_tool", "arguments": {}}}
+        headers = ep.HttpHeaders(
+            headers=core.HeaderMap(headers=[core.HeaderValue(key="x-request-id", raw_value=b"req-43")])
+        )
+        await exchange(
+            grpc_stub,
+            [ep.ProcessingRequest(request_headers=headers)]
+            + request_then_response(call, json.dumps(tool_result(43)).encode("utf-8")),
+        )
+
+        (_, _, pre_context), (_, _, post_context) = PassthroughPlugin.payloads
+        assert post_context.state["pre_invoke_tool"] == "ctx_tool"
+        assert pre_context.global_context.request_id == post_context.global_context.request_id == "req-43"
+    finally:
+        PassthroughPlugin.reset()
+
+
+@pytest.mark.asyncio
+async def test_post_invoke_on_other_stream_gets_pre_invoke_context(grpc_stub):
+    try:
+        call = {"jsonrpc": "2.0", "id": 44, "method": "tools/call", "params": {"name": "ctx_tool", "arguments": {}}}
+        await exchange(
+            grpc_stub,
+            [
+                ep.ProcessingRequest(request_headers=session_headers("sess-ctx")),
+                ep.ProcessingRequest(
+                    request_body=ep.HttpBody(body=json.dumps(call).encode("utf-8"), end_of_stream=True)
+                ),
+            ],
+        )
+        await exchange(
+            grpc_stub,
+            [
+                ep.ProcessingRequest(request_headers=session_headers("sess-ctx")),
+                ep.ProcessingRequest(
+                    response_body=ep.HttpBody(body=json.dumps(tool_result(44)).encode("utf-8"), end_of_stream=True)
+                ),
+            ],
+        )
+
+        (_, _, pre_context), (_, payload, post_context) = PassthroughPlugin.payloads
+        assert payload.name == "ctx_tool"
+        assert post_context.state["pre_invoke_tool"] == "ctx_tool"
+        assert post_context.global_context.request_id == pre_context.global_context.request_id
+    finally:
+        PassthroughPlugin.reset()
@@ -0,0 +1,85 @@
+"""Unit tests for the admin profiling endpoints."""
+
+# Standard
+import threading
+import tracemalloc
+import urllib.error
+import urllib.request
+
+# Third-Party
+import pytest
+
+# Local
+from admin import AdminServer
+from profiling import collapsed, sample_stacks
+
+
+@pytest.fixture
+def admin():
+    server = AdminServer(max_profile_seconds=2)
+    server.start()
+    yield server
+    server.stop()
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def request(admin, method, path):
+    req = urllib.request.Request(f"http://127.0.0.1:{admin.port}{path}", method=method)
+    try:
+        with urllib.request.urlopen(req) as response:
+            return response.status, response.read().decode()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read().decode()
+
+
+def spin(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_sample_stacks_sees_busy_thread():
+    stop = threading.Event()
+    threading.Thread(target=spin, args=(stop,), name="busy").start()
+
+    counts = sample_stacks(0.2, interval=0.01)
+    stop.set()
+
+    busy = [stack for stack in counts if stack.startswith("busy;")]
+    assert busy and all("spin (test_admin.py)" in stack for stack in busy)
+    assert collapsed(counts).splitlines()[0].rsplit(" ", 1)[1].isdigit()
+
+
+def test_profile_endpoint_returns_collapsed_stacks(admin):
+    status, body = request(admin, "GET", "/debug/profile?seconds=0.2&interval=0.01")
+
+    assert status == 200
+    assert "MainThread;" in body
+
+
+def test_profile_duration_is_capped(admin):
+    status, body = request(admin, "GET", "/debug/profile?seconds=5")
+
+    assert status == 400
+    assert "seconds must be in" in body
+
+
+def test_heap_snapshots_and_diff(admin):
+    assert request(admin, "GET", "/debug/heap")[0] == 409
+    assert request(admin, "POST", "/debug/heap/start")[0] == 200
+
+    request(admin, "GET", "/debug/heap")
+    retained = [bytearray(1024) for _ in range(1000)]
+    status, body = request(admin, "GET", "/debug/heap?diff=1&top=5")
+
+    assert status == 200
+    assert "changes since the previous snapshot" in body
+    assert "test_admin.py" in body
+    assert request(admin, "POST", "/debug/heap/stop")[0] == 200
+    assert not tracemalloc.is_tracing()
+    del retained
+
+
+def test_bad_requests(admin):
+    assert request(admin, "GET", "/debug/nothing")[0] == 404
+    assert request(admin, "GET", "/debug/heap?group=module")[0] == 400
@@ -0,0 +1,139 @@
+"""Unit tests for the audit log of plugin verdicts."""
+
+# Standard
+import json
+import struct
+from types import SimpleNamespace
+
+# Third-Party
+import pytest
+from cpex.framework import ToolPreInvokePayload
+from cpex.framework.models import GlobalContext, PluginMode, PluginResult, PluginViolation
+
+# Local
+from audit_log import AuditLog
+from executor import AdapterExecutor
+from shadow import ShadowRunner
+
+
+def read_jsonl(path):
+    with open(path, encoding="utf-8") as file:
+        return [json.loads(line) for line in file]
+
+
+def test_records_are_written_as_json_lines(tmp_path):
+    path = tmp_path / "audit.jsonl"
+    audit_log = AuditLog(str(path), flush_interval=0.01)
+    audit_log.start()
+
+    audit_log.record("7", "get_weather", "tool_pre_invoke", "Nemo Check", "deny", "PII", 0.0124)
+    audit_log.record("8", "get_weather", "tool_pre_invoke", None, "allow", None, 0.002)
+    audit_log.close()
+
+    first, second = read_jsonl(path)
+    assert {key: value for key, value in first.items() if key != "ts"} == {
+        "request_id": "7",
+        "tool": "get_weather",
+        "hook": "tool_pre_invoke",
+        "plugin": "Nemo Check",
+        "verdict": "deny",
+        "enforced": True,
+        "violation_code": "PII",
+        "latency_ms": 12.4,
+    }
+    assert (second["verdict"], second["plugin"]) == ("allow", None)
+    assert audit_log.written == 2
+
+
+def test_length_prefixed_records(tmp_path):
+    path = tmp_path / "audit.bin"
+    audit_log = AuditLog(str(path), format="length_prefixed", flush_interval=0.01)
+    audit_log.start()
+
+    for request_id in ("1", "2"):
+        audit_log.record(request_id, "tool", "tool_post_invoke", None, "allow", None, 0.001)
+    audit_log.close()
+
+    data, records = path.read_bytes(), []
+    while data:
+        (length,) = struct.unpack(">I", data[:4])
+        records.append(json.loads(data[4 : 4 + length]))
+        data = data[4 + length :]
+    assert [record["request_id"] for record in records] == ["1", "2"]
+
+
+def test_full_queue_drops_and_counts_records(tmp_path):
+    audit_log = AuditLog(str(tmp_path / "audit.jsonl"), max_queue=2)
+
+    accepted = [audit_log.record(str(i), "tool", "tool_pre_invoke", None, "allow", None, 0.001) for i in range(4)]
+
+    assert accepted == [True, True, False, False]
+    assert (audit_log.pending, audit_log.dropped) == (2, 2)
+
+
+def test_records_made_while_closing_are_dropped(tmp_path):
+    audit_log = AuditLog(str(tmp_path / "audit.jsonl"))
+    audit_log.start()
+    audit_log.close()
+
+    assert not audit_log.record("1", "tool", "tool_pre_invoke", None, "allow", None, 0.001)
+    assert (audit_log.pending, audit_log.dropped) == (0, 1)
+
+
+def test_files_are_rotated_by_size(tmp_path):
+    path = tmp_path / "audit.jsonl"
+    audit_log = AuditLog(str(path), batch_size=1, flush_interval=0.01, max_bytes=1, backups=2)
+    audit_log.start()
+
+    for request_id in ("1", "2", "3"):
+        audit_log.record(request_id, "tool", "tool_pre_invoke", None, "allow", None, 0.001)
+    audit_log.close()
+
+    # Each record fills a file: the oldest rotated out, the newest in audit.jsonl.1
+    assert path.read_text() == ""
+    assert [read_jsonl(f"{path}.{index}")[0]["request_id"] for index in (1, 2)] == ["3", "2"]
+
+
+def test_unknown_format_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="format"):
+        AuditLog(str(tmp_path / "audit.log"), format="csv")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("audit_mode", [False, True])
+async def test_executor_records_blocking_plugin(tmp_path, audit_mode):
+    async def hook(payload, context):
+        violation = PluginViolation(reason="PII", description="email", code="PII")
+        return PluginResult(continue_processing=False, violation=violation)
+
+    plugin_ref = SimpleNamespace(
+        name="Guard",
+        uuid="Guard",
+        mode=PluginMode.SEQUENTIAL,
+        priority=0,
+        conditions=None,
+        capabilities=None,
+        on_error="fail",
+        plugin=SimpleNamespace(name="Guard"),
+    )
+    hook_ref = SimpleNamespace(name="tool_pre_invoke", plugin_ref=plugin_ref, hook=hook, accepts_extensions=False)
+    path = tmp_path / "audit.jsonl"
+    audit_log = AuditLog(str(path), flush_interval=0.01)
+    audit_log.start()
+    executor = AdapterExecutor(audit_log=audit_log)
+
+    payload = ToolPreInvokePayload(name="get_weather", args={})
+    run = executor.execute([hook_ref], payload, GlobalContext(request_id="7"), "tool_pre_invoke")
+    if audit_mode:
+        runner = ShadowRunner()
+        runner.submit(run)
+        await runner.drain(timeout=1)
+    else:
+        await run
+    audit_log.close()
+
+    (record,) = read_jsonl(path)
+    assert (record["request_id"], record["tool"], record["verdict"]) == ("7", "get_weather", "deny")
+    # A would-have-denied is told apart from a real deny
+    assert record["enforced"] is not audit_mode
+    assert (record["plugin"], record["violation_code"]) == ("Guard", "PII")
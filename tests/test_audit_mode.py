@@ -0,0 +1,177 @@
+"""Unit tests for audit (shadow) mode of the tool hooks.
+
+Covers: per-hook and per-tool audit mode, bounded background execution,
+drop-on-overflow, and the shutdown flush.
+"""
+
+# Standard
+import asyncio
+from unittest.mock import Mock
+
+# Third-Party
+import pytest
+from conftest import make_hook_result
+from cpex.framework import PluginViolation
+
+# Local
+from adapter_settings import AdapterSettings, AuditModeSettings, load_adapter_settings
+from shadow import ShadowRunner
+
+
+@pytest.fixture
+def tool_call_body():
+    """Sample MCP tools/call request body."""
+    return {
+        "jsonrpc": "2.0",
+        "id": "audit-1",
+        "method": "tools/call",
+        "params": {"name": "low_risk_tool", "arguments": {"q": "weather"}},
+    }
+
+
+def blocking_result():
+    violation = PluginViolation(reason="Blocked", description="would block", code="AUDIT_TEST")
+    return make_hook_result(continue_processing=False, violation=violation)
+
+
+@pytest.mark.asyncio
+async def test_pre_invoke_audit_mode_forwards_body_unchanged(mock_envoy_modules, mock_manager, tool_call_body):
+    """A tool in audit mode is forwarded even when the plugin would block it."""
+    import src.server
+
+    mock_manager.invoke_hook.return_value = (blocking_result(), None)
+    src.server.manager = mock_manager
+    src.server.adapter_settings = AdapterSettings(audit_mode=AuditModeSettings(tools=["low_risk_tool"]))
+    src.server.shadow_runner = ShadowRunner()
+    src.server.create_mcp_immediate_error_response = Mock()
+    src.server.get_modified_response = Mock()
+
+    await src.server.getToolPreInvokeResponse(tool_call_body)
+
+    # No MCP error was built and the body was not mutated
+    assert not src.server.create_mcp_immediate_error_response.called
+    assert not src.server.get_modified_response.called
+
+    # The hook still runs in the background
+    assert await src.server.shadow_runner.drain(timeout=1) == 0
+    assert mock_manager.invoke_hook.call_count == 1
+    assert mock_manager.invoke_hook.call_args[0][1].name == "low_risk_tool"
+
+
+@pytest.mark.asyncio
+async def test_audit_hook_gets_the_request_id_of_its_stream(mock_envoy_modules, mock_manager, tool_call_body):
+    """Audit-mode hooks run in their own task, under the x-request-id of the stream that submitted them."""
+    import src.server
+
+    mock_manager.invoke_hook.return_value = (blocking_result(), None)
+    src.server.manager = mock_manager
+    src.server.adapter_settings = AdapterSettings(audit_mode=AuditModeSettings(tools=["low_risk_tool"]))
+    src.server.shadow_runner = ShadowRunner()
+    token = src.server.stream_calls.set(src.server.RequestCalls(request_id="req-7"))
+    try:
+        await src.server.getToolPreInvokeResponse(tool_call_body)
+    finally:
+        src.server.stream_calls.reset(token)
+
+    assert await src.server.shadow_runner.drain(timeout=1) == 0
+    assert mock_manager.invoke_hook.call_args.kwargs["global_context"].request_id == "req-7"
+
+
+@pytest.mark.asyncio
+async def test_post_invoke_audit_mode_per_hook(mock_envoy_modules, mock_manager, sample_tool_result_body):
+    """Configuring a hook type puts every invocation of that hook in audit mode."""
+    import src.server
+
+    mock_manager.invoke_hook.return_value = (blocking_result(), None)
+    src.server.manager = mock_manager
+    src.server.adapter_settings = AdapterSettings(audit_mode=AuditModeSettings(hooks=["tool_post_invoke"]))
+    src.server.shadow_runner = ShadowRunner()
+    src.server.create_mcp_immediate_error_response = Mock()
+
+    await src.server.getToolPostInvokeResponse(sample_tool_result_body, "any_tool")
+    await src.server.shadow_runner.drain(timeout=1)
+
+    assert not src.server.create_mcp_immediate_error_response.called
+    assert mock_manager.invoke_hook.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_audit_mode_not_applied_to_other_tools(mock_envoy_modules, mock_manager, tool_call_body):
+    """Tools not listed keep the enforcing path."""
+    import src.server
+
+    mock_manager.invoke_hook.return_value = (blocking_result(), None)
+    src.server.manager = mock_manager
+    src.server.adapter_settings = AdapterSettings(audit_mode=AuditModeSettings(tools=["other_tool"]))
+    src.server.create_mcp_immediate_error_response = Mock()
+
+    await src.server.getToolPreInvokeResponse(tool_call_body)
+
+    assert src.server.create_mcp_immediate_error_response.called
+    assert src.server.shadow_runner.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_shadow_runner_drops_on_overflow():
+    """Submissions past max_pending are dropped and counted."""
+    runner = ShadowRunner(max_concurrency=1, max_pending=1)
+    release = asyncio.Event()
+
+    assert runner.submit(release.wait(), label="first")
+    assert not runner.submit(release.wait(), label="second")
+    assert runner.dropped == 1
+
+    release.set()
+    assert await runner.drain(timeout=1) == 0
+    assert runner.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_shadow_runner_bounds_concurrency():
+    """No more than max_concurrency coroutines run at once."""
+    runner = ShadowRunner(max_concurrency=2, max_pending=10)
+    running = 0
+    peak = 0
+
+    async def work():
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    for _ in range(6):
+        runner.submit(work())
+    await runner.drain(timeout=1)
+
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_shadow_runner_drain_cancels_after_timeout():
+    """drain() cancels work still running after the timeout."""
+    runner = ShadowRunner()
+    runner.submit(asyncio.sleep(10), label="stuck")
+
+    assert await runner.drain(timeout=0.01) == 1
+    assert runner.pending == 0
+
+
+def test_load_adapter_settings(tmp_path):
+    """adapter_settings is read from the plugin config; unknown keys are ignored."""
+    config = tmp_path / "config.yaml"
+    config.write_text(
+        "plugins: []\n"
+        "adapter_settings:\n"
+        "  audit_mode:\n"
+        "    tools: [get_weather]\n"
+        "    max_pending: 4\n"
+        "    not_a_setting: true\n"
+    )
+
+    settings = load_adapter_settings(str(config))
+
+    assert settings.audit_mode.tools == ["get_weather"]
+    assert settings.audit_mode.max_pending == 4
+    assert settings.audit_mode.applies_to("tool_pre_invoke", "get_weather")
+    assert not settings.audit_mode.applies_to("tool_pre_invoke", "other")
@@ -0,0 +1,115 @@
+"""Unit tests for the buffered body budget."""
+
+# Standard
+import mmap
+from concurrent.futures import ThreadPoolExecutor
+
+# Third-Party
+import pytest
+
+# Local
+import body_budget
+import metrics
+from adapter_settings import BodyLimitSettings
+from body_budget import BodyBudget, BodyBuffer, _spill_writer
+
+
+def gauge(storage):
+    return metrics.BUFFERED_BODY_BYTES.labels(storage=storage)._value.get()
+
+
+@pytest.mark.asyncio
+async def test_per_stream_cap_keeps_prefix():
+    """A chunk that would pass the per-stream cap is refused; earlier chunks are kept."""
+    buffer = BodyBuffer(BodyBudget(), max_bytes=10)
+
+    assert buffer.append(b"12345")
+    assert not buffer.append(b"678901")
+    assert buffer.over_limit
+    assert not buffer.append(b"1")
+    assert await buffer.join() == b"12345"
+
+
+def test_global_budget_is_shared_and_released():
+    budget = BodyBudget(max_bytes=10)
+    first = BodyBuffer(budget)
+    second = BodyBuffer(budget)
+
+    assert first.append(b"x" * 8)
+    assert not second.append(b"x" * 4)
+    assert budget.used == 8
+
+    first.clear()
+    assert budget.used == 0
+    assert BodyBuffer(budget).append(b"x" * 4)
+
+
+@pytest.mark.asyncio
+async def test_spill_to_mmap():
+    """Past the spill threshold the body moves to disk and is read back through mmap."""
+    memory_before, disk_before = gauge("memory"), gauge("disk")
+    buffer = BodyBuffer(BodyBudget(), spill_threshold=8)
+
+    buffer.append(b"abcdef")
+    assert not buffer.spilled
+    buffer.append(b"ghij")
+    buffer.append(b"klm")
+    body = await buffer.join()
+
+    assert buffer.spilled
+    assert isinstance(body, mmap.mmap)
+    assert body[:] == b"abcdefghijklm"
+    assert gauge("disk") == disk_before + 13
+    assert gauge("memory") == memory_before
+
+    del body
+    buffer.clear()
+    assert gauge("disk") == disk_before
+
+
+def test_spill_file_is_closed_after_queued_writes():
+    """Spill writes run on the spill thread; clear closes the file only once they are done."""
+    buffer = BodyBuffer(BodyBudget(), spill_threshold=4)
+    buffer.append(b"abcdef")
+    spill_file = buffer._file
+    for _ in range(100):
+        buffer.append(b"x" * 1024)
+
+    buffer.clear()
+    _spill_writer.submit(lambda: None).result()
+
+    assert spill_file.closed
+
+
+def test_clear_closes_the_spill_file_once_the_spill_thread_is_gone(monkeypatch):
+    """At interpreter exit the spill thread no longer takes work, so the file is closed right away."""
+    buffer = BodyBuffer(BodyBudget(), spill_threshold=4)
+    buffer.append(b"abcdef")
+    spill_file = buffer._file
+    _spill_writer.submit(lambda: None).result()
+    stopped = ThreadPoolExecutor(max_workers=1)
+    stopped.shutdown()
+    monkeypatch.setattr(body_budget, "_spill_writer", stopped)
+
+    buffer.clear()
+
+    assert spill_file.closed
+
+
+def test_reap_idle_frees_stalled_buffers():
+    budget = BodyBudget()
+    stalled = BodyBuffer(budget)
+    stalled.append(b"partial body")
+    active = BodyBuffer(budget)
+    active.append(b"x")
+    active.last_active = stalled.last_active + 100
+
+    assert budget.reap_idle(idle_timeout=50, now=stalled.last_active + 60) == 1
+    assert stalled.over_limit and not stalled
+    assert active
+    assert budget.used == 1
+
+
+def test_unknown_over_limit_policy_rejected():
+    with pytest.raises(ValueError):
+        BodyLimitSettings(over_limit="truncate")
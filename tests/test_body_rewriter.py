@@ -0,0 +1,107 @@
+"""Unit tests for locating JSON-RPC messages and splicing modified results."""
+
+# Standard
+import json
+
+# Third-Party
+import pytest
+
+# Local
+from body_rewriter import complete_prefix, locate_message, member_span, splice_message, splice_result
+
+RESULT = {"content": [{"type": "text", "text": "secret"}]}
+REDACTED = {"content": [{"type": "text", "text": "[redacted]"}]}
+
+
+def test_locate_plain_json_message():
+    body = b'  {"jsonrpc": "2.0", "id": 1, "result": {"content": []}}\n'
+
+    message = locate_message(body)
+
+    assert message.data["id"] == 1
+    assert body[message.start : message.end] == body.strip()
+
+
+def test_locate_sse_message_skips_empty_data():
+    body = b'id: 1\ndata: \n\nevent: message\r\ndata: {"id": 2, "result": {}}\r\n\r\n'
+
+    message = locate_message(body)
+
+    assert message.data == {"id": 2, "result": {}}
+    assert body[message.start : message.end] == b'{"id": 2, "result": {}}'
+
+
+def test_locate_message_returns_none_for_non_json():
+    assert locate_message(b"not json") is None
+    assert locate_message(b"\xff\xfe") is None
+    assert locate_message(b"event: message\n\n") is None
+
+
+def test_member_span_only_matches_top_level_keys():
+    text = '{"id": {"result": 1}, "result" : [1, 2] }'
+
+    start, end, value = member_span(text, "result")
+
+    assert text[start:end] == "[1, 2]"
+    assert value == [1, 2]
+    assert member_span(text, "missing") is None
+    assert member_span("[1]", "result") is None
+
+
+def test_splice_keeps_sse_framing_and_other_bytes():
+    """Only the result value changes; the SSE envelope and message layout are untouched."""
+    body = (
+        b'event: message\r\nid: 42\r\ndata: {"jsonrpc":"2.0",  "result": '
+        + json.dumps(RESULT).encode()
+        + b', "id": 7}\r\n\r\n'
+    )
+
+    new_body = splice_result(locate_message(body), REDACTED)
+
+    assert new_body == body.replace(json.dumps(RESULT).encode(), json.dumps(REDACTED).encode())
+
+
+def test_splice_handles_non_ascii_offsets():
+    body = json.dumps({"id": "é", "result": RESULT, "note": "ü"}, ensure_ascii=False).encode("utf-8")
+
+    new_body = splice_result(locate_message(body), REDACTED)
+
+    assert json.loads(new_body) == {"id": "é", "result": REDACTED, "note": "ü"}
+    assert new_body.endswith('"note": "ü"}'.encode("utf-8"))
+
+
+def test_splice_detects_no_op_modification():
+    """A modified payload equal to the original is not a change, whatever its formatting."""
+    body = b'{"id": 1, "result": {"content" : [ {"type":"text","text":"secret"} ]}}'
+
+    assert splice_result(locate_message(body), RESULT) is None
+
+
+def test_splice_message_replaces_whole_batch():
+    body = b'data: [{"id": 1, "result": {}}, {"id": 2, "result": {}}]\n\n'
+    message = locate_message(body)
+
+    new_body = splice_message(message, message.data[:1])
+
+    assert new_body == b'data: [{"id": 1, "result": {}}]\n\n'
+
+
+@pytest.mark.parametrize(
+    "body,expected",
+    [
+        (b'{"id": 1, "result": {"content": [{"text": "sec', {"id": 1, "result": {"content": [{"text": "sec"}]}}),
+        (b'{"id": 1, "params": {"arguments": {"a": [1, 2', {"id": 1, "params": {"arguments": {"a": [1]}}}),
+        (b'{"id": 1, "par', {"id": 1}),
+        (b'{"id": 1, "text": "x\\u00', {"id": 1, "text": "x"}),
+        (b'{"text": "caf\xc3', {"text": "caf"}),
+        (b'event: message\ndata: {"result": {"text": "sec', {"result": {"text": "sec"}}),
+        (b'{"id": 1}', {"id": 1}),
+    ],
+)
+def test_complete_prefix_closes_cut_off_message(body, expected):
+    assert json.loads(complete_prefix(body)) == expected
+
+
+def test_complete_prefix_needs_a_container():
+    assert complete_prefix(b"not json") is None
+    assert complete_prefix(b'"just a string') is None
@@ -0,0 +1,34 @@
+"""Unit tests for ChunkBuffer."""
+
+# Local
+from chunks import ChunkBuffer
+
+
+def test_join_concatenates_chunks_once():
+    buffer = ChunkBuffer()
+    buffer.append(b"ab")
+    buffer.append(b"")
+    buffer.append(bytearray(b"cd"))
+
+    body = buffer.join()
+
+    assert body == b"abcd"
+    assert len(buffer) == 4
+    assert buffer.join() is body
+
+
+def test_single_chunk_is_returned_without_copy():
+    chunk = b"whole body"
+    buffer = ChunkBuffer()
+    buffer.append(chunk)
+
+    assert buffer.join() is chunk
+
+
+def test_clear():
+    buffer = ChunkBuffer()
+    buffer.append(b"x")
+    buffer.clear()
+
+    assert not buffer
+    assert buffer.join() == b""
@@ -0,0 +1,89 @@
+"""Unit tests for content-encoded response body handling."""
+
+# Standard
+import gzip
+import zlib
+
+# Third-Party
+import pytest
+
+# Local
+from content_encoding import BodyTooLarge, Decoder, Encoder, decode_body, encode_body, is_supported, normalize
+
+BODY = b'{"jsonrpc": "2.0", "id": 1, "result": {"content": [{"type": "text", "text": "hello"}]}}'
+
+
+@pytest.mark.parametrize(
+    "header,expected",
+    [(None, None), ("identity", None), ("GZIP", "gzip"), ("x-gzip", "gzip"), (" br ", "br"), ("gzip, br", "gzip, br")],
+)
+def test_normalize(header, expected):
+    assert normalize(header) == expected
+
+
+def test_stacked_and_unknown_codings_are_unsupported():
+    assert not is_supported("gzip, br")
+    assert not is_supported("compress")
+
+
+def test_gzip_decodes_incrementally():
+    """A gzip body split at arbitrary points decodes to the original."""
+    encoded = gzip.compress(BODY)
+    decoder = Decoder("gzip", max_size=1024)
+
+    decoded = b"".join(decoder.decode(encoded[i : i + 7]) for i in range(0, len(encoded), 7))
+
+    assert decoded == BODY
+    assert decoder.size == len(BODY)
+
+
+def test_deflate_round_trip():
+    assert decode_body("deflate", zlib.compress(BODY), 1024) == BODY
+    assert decode_body("deflate", encode_body("deflate", BODY), 1024) == BODY
+
+
+@pytest.mark.parametrize("coding", ["gzip", "br", "zstd"])
+def test_round_trip(coding):
+    if not is_supported(coding):
+        pytest.skip(f"{coding} support not installed")
+
+    assert decode_body(coding, encode_body(coding, BODY), 1024) == BODY
+
+
+@pytest.mark.parametrize("coding", ["gzip", "br", "zstd"])
+def test_decompression_bomb_is_capped(coding):
+    """A highly compressible body fails once its decoded size passes the cap."""
+    if not is_supported(coding):
+        pytest.skip(f"{coding} support not installed")
+    bomb = encode_body(coding, b"\0" * (4 * 1024 * 1024))
+
+    with pytest.raises(BodyTooLarge):
+        decode_body(coding, bomb, max_size=64 * 1024)
+
+
+def test_consumed_bytes_no_longer_count_toward_cap():
+    """A stream checked piece by piece is capped per piece."""
+    encoder = Encoder("gzip")
+    decoder = Decoder("gzip", max_size=16)
+
+    for _ in range(4):
+        piece = decoder.decode(encoder.encode(b"data: 1234567\n\n"))
+        decoder.consumed(len(piece))
+    assert decoder.size == 0
+    with pytest.raises(BodyTooLarge):
+        decoder.decode(encoder.encode(b"data: " + b"x" * 16))
+
+
+def test_invalid_body_raises_value_error():
+    with pytest.raises(ValueError):
+        decode_body("gzip", b"not gzip at all", 1024)
+
+
+def test_encoder_flushes_each_piece():
+    """Each encoded piece is decodable on its own, so it can be forwarded right away."""
+    encoder = Encoder("gzip")
+    decoder = Decoder("gzip", max_size=1024)
+
+    assert decoder.decode(encoder.encode(b"data: one\n\n")) == b"data: one\n\n"
+    assert decoder.decode(encoder.encode(b"data: two\n\n")) == b"data: two\n\n"
+    assert decoder.decode(encoder.finish()) == b""
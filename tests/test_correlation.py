@@ -0,0 +1,67 @@
+"""Unit tests for the cross-stream tool call correlation table."""
+
+# Local
+from correlation import Call, CorrelationTable
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_pop_returns_and_forgets_entry():
+    table = CorrelationTable(max_entries=10, ttl=60)
+    table.put("s1", 1, Call("get_weather", "r"))
+
+    assert table.pop("s2", 1) is None
+    assert table.pop("s1", "1") is None
+    assert table.pop("s1", 1) == Call("get_weather", "r")
+    assert table.pop("s1", 1) is None
+    assert len(table) == 0
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    table = CorrelationTable(max_entries=10, ttl=60, clock=clock)
+    table.put("s1", 1, Call("a", "r"))
+    clock.now = 30
+    table.put("s1", 2, Call("b", "r"))
+
+    clock.now = 61
+    assert table.pop("s1", 1) is None
+    table.put("s1", 3, Call("c", "r"))
+    # Expired entries at the front are dropped as new ones arrive
+    assert len(table) == 2
+    assert table.pop("s1", 2) == Call("b", "r")
+
+
+def test_oldest_entries_dropped_past_max_entries():
+    table = CorrelationTable(max_entries=2, ttl=60)
+    table.put("s1", 1, Call("a", "r"))
+    table.put("s1", 2, Call("b", "r"))
+    table.put("s1", 1, Call("a2", "r"))
+    table.put("s1", 3, Call("c", "r"))
+
+    assert len(table) == 2
+    assert table.pop("s1", 2) is None
+    assert table.pop("s1", 1) == Call("a2", "r")
+
+
+def test_disabled_with_zero_max_entries():
+    table = CorrelationTable(max_entries=0, ttl=60)
+    table.put("s1", 1, Call("a", "r"))
+
+    assert table.pop("s1", 1) is None
+
+
+def test_lookups_are_counted():
+    table = CorrelationTable()
+    table.put("s", 1, Call("tool", "r1"))
+
+    table.pop("s", 1)
+    table.pop("s", 1)
+
+    assert (table.hits, table.misses) == (1, 1)
@@ -0,0 +1,197 @@
+"""Unit tests for the adapter's plugin executor: first-deny-wins bands and cost-aware ordering."""
+
+# Standard
+import asyncio
+from types import SimpleNamespace
+
+# Third-Party
+import pytest
+from cpex.framework import PluginViolation, ToolPreInvokePayload
+from cpex.framework.models import GlobalContext, PluginMode, PluginResult
+
+# Local
+import metrics
+from executor import AdapterExecutor
+from ordering import PluginCostModel, PluginOrder
+
+HOOK = "tool_pre_invoke"
+
+
+def hook_ref(name, mode=PluginMode.CONCURRENT):
+    plugin_ref = SimpleNamespace(
+        name=name, uuid=name, mode=mode, priority=0, conditions=None, plugin=SimpleNamespace(name=name)
+    )
+    return SimpleNamespace(name=HOOK, plugin_ref=plugin_ref)
+
+
+def abandoned(plugin, outcome):
+    return metrics.PLUGINS_ABANDONED.labels(hook=HOOK, plugin=plugin, outcome=outcome)._value.get()
+
+
+def blocked():
+    return PluginResult(continue_processing=False, violation=PluginViolation(reason="r", description="d", code="C"))
+
+
+async def deny(ref):
+    await asyncio.sleep(0)
+    return blocked()
+
+
+async def hang(ref):
+    await asyncio.Event().wait()
+
+
+async def ignore_cancel(ref):
+    try:
+        await asyncio.Event().wait()
+    except asyncio.CancelledError:
+        return PluginResult(continue_processing=True)
+
+
+def executor_with(plugins, **options):
+    """An executor whose plugins are the coroutine functions in ``plugins``, by plugin name."""
+    options.setdefault("first_deny_wins", True)
+    executor = AdapterExecutor(**options)
+
+    async def execute_with_timeout(ref, payload, local_context, extensions=None):
+        return await plugins[ref.plugin_ref.name](ref)
+
+    executor._execute_with_timeout = execute_with_timeout
+    return executor
+
+
+async def run(executor, refs):
+    payload = ToolPreInvokePayload(name="tool", args={})
+    return await asyncio.wait_for(executor.execute(refs, payload, GlobalContext(request_id="1"), HOOK), timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_first_deny_returns_without_waiting_for_the_band():
+    executor = executor_with({"deny": deny, "hang": hang})
+    before = abandoned("hang", "cancelled")
+
+    result, contexts = await run(executor, [hook_ref("deny"), hook_ref("hang")])
+
+    assert not result.continue_processing
+    assert result.violation.code == "C"
+    assert set(contexts) == {"1deny", "1hang"}
+    await asyncio.sleep(0)
+    assert executor.abandoned == 0
+    assert abandoned("hang", "cancelled") == before + 1
+
+
+@pytest.mark.asyncio
+async def test_plugin_finishing_after_the_deny_is_recorded_with_its_verdict():
+    executor = executor_with({"deny": deny, "stubborn": ignore_cancel})
+    before = abandoned("stubborn", "allowed")
+
+    result, _ = await run(executor, [hook_ref("deny"), hook_ref("stubborn")])
+
+    assert not result.continue_processing
+    await asyncio.sleep(0)
+    assert abandoned("stubborn", "allowed") == before + 1
+
+
+@pytest.mark.asyncio
+async def test_band_without_deny_continues():
+    async def allow(ref):
+        return PluginResult(continue_processing=True)
+
+    executor = executor_with({"a": allow, "b": allow})
+
+    result, _ = await run(executor, [hook_ref("a"), hook_ref("b")])
+
+    assert result.continue_processing
+    assert result.violation is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("band", ["allow", "deny"])
+async def test_fire_and_forget_plugins_wait_for_the_band(band):
+    ran = []
+
+    async def allow(ref):
+        await asyncio.sleep(0)
+        ran.append(ref.plugin_ref.name)
+        return PluginResult(continue_processing=True)
+
+    async def notify(ref):
+        ran.append(ref.plugin_ref.name)
+        return PluginResult(continue_processing=True)
+
+    executor = executor_with({"band": allow if band == "allow" else deny, "notify": notify})
+
+    result, _ = await run(executor, [hook_ref("notify", PluginMode.FIRE_AND_FORGET), hook_ref("band")])
+    await asyncio.gather(*result.background_tasks)
+
+    assert result.continue_processing == (band == "allow")
+    assert ran == (["band", "notify"] if band == "allow" else [])
+
+
+@pytest.mark.asyncio
+async def test_serial_block_skips_the_band():
+    ran = []
+
+    async def record(ref):
+        ran.append(ref.plugin_ref.name)
+        return PluginResult(continue_processing=True)
+
+    executor = executor_with({"enforce": deny, "band": record})
+
+    result, _ = await run(executor, [hook_ref("enforce", PluginMode.SEQUENTIAL), hook_ref("band")])
+
+    assert not result.continue_processing
+    assert ran == []
+
+
+@pytest.mark.asyncio
+async def test_sequential_plugins_reordered_by_cost():
+    ran = []
+
+    def plugin(delay, verdict):
+        async def run_plugin(ref):
+            ran.append(ref.plugin_ref.name)
+            await asyncio.sleep(delay)
+            return verdict()
+
+        return run_plugin
+
+    def allowed():
+        return PluginResult(continue_processing=True)
+
+    executor = executor_with(
+        {"slow": plugin(0.01, allowed), "cheap": plugin(0, blocked)},
+        first_deny_wins=False,
+        cost_model=PluginCostModel(["slow", "cheap"], min_samples=2),
+    )
+    refs = [hook_ref("slow", PluginMode.SEQUENTIAL), hook_ref("cheap", PluginMode.SEQUENTIAL)]
+
+    for _ in range(2):
+        await run(executor, refs)
+    assert ran == ["slow", "cheap"] * 2
+
+    ran.clear()
+    result, _ = await run(executor, refs)
+
+    assert not result.continue_processing
+    assert ran == ["cheap"]
+    order = executor.cost_model.orders()[(HOOK, "tool")]
+    assert order.chosen == ["cheap", "slow"]
+    assert order.saving > 0
+
+
+@pytest.mark.asyncio
+async def test_negative_saving_is_not_counted(monkeypatch):
+    async def allow(ref):
+        return PluginResult(continue_processing=True)
+
+    cost_model = PluginCostModel(["a", "b"])
+    monkeypatch.setattr(cost_model, "order", lambda hook, tool, plugins: PluginOrder(plugins, plugins[::-1], -0.1))
+    executor = executor_with({"a": allow, "b": allow}, first_deny_wins=False, cost_model=cost_model)
+    saved = metrics.PLUGIN_ORDER_SAVED.labels(hook=HOOK)
+    before = saved._value.get()
+
+    result, _ = await run(executor, [hook_ref("a", PluginMode.SEQUENTIAL), hook_ref("b", PluginMode.SEQUENTIAL)])
+
+    assert result.continue_processing
+    assert saved._value.get() == before
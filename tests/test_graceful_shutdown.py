@@ -107,3 +107,93 @@ async def test_serve_sigterm_triggers_graceful_stop(mock_envoy_modules, mock_man
     last_set = set_calls[-1]
     assert last_set[0][0] == ""  # empty service name
     assert last_set[0][1] == mock_hcr.NOT_SERVING
+
+
+def step(order, name):
+    """A side effect recording ``name`` in ``order`` when the mocked coroutine is awaited."""
+
+    async def record(*args, **kwargs):
+        order.append(name)
+
+    return record
+
+
+async def run_sigterm(mock_manager, options=None, order=None):
+    """Run serve() until its SIGTERM handler is done; return the shutdown steps in the order they ran."""
+    order = [] if order is None else order
+
+    mock_server = MagicMock()
+    mock_server.start = AsyncMock()
+    mock_server.stop = AsyncMock(side_effect=step(order, "server.stop"))
+    termination_event = asyncio.Event()
+
+    async def fake_wait():
+        await termination_event.wait()
+
+    mock_server.wait_for_termination = fake_wait
+    captured_handlers = {}
+
+    with (
+        patch("grpc.aio.server", return_value=mock_server),
+        patch("src.server.grpc_health.HealthServicer", return_value=MagicMock()),
+        patch("src.server.health_pb2_grpc.add_HealthServicer_to_server"),
+        patch("src.server.executor_options", AsyncMock(return_value=options or {})),
+        patch("src.server.AdapterExecutor"),
+    ):
+        import src.server
+
+        src.server.manager = mock_manager
+        mock_manager.initialize = AsyncMock()
+        mock_manager.shutdown = AsyncMock(side_effect=step(order, "manager.shutdown"))
+        mock_manager.config = {}
+        mock_manager.plugin_count = 0
+
+        loop = asyncio.get_event_loop()
+        original_add = loop.add_signal_handler
+        loop.add_signal_handler = lambda sig, cb: captured_handlers.setdefault(sig, cb)
+        try:
+            drain = AsyncMock(side_effect=step(order, "audit_mode.drain"))
+            with patch.object(src.server.shadow_runner, "drain", drain):
+                serve_task = asyncio.ensure_future(src.server.serve())
+                await asyncio.sleep(0)
+                captured_handlers[signal_mod.SIGTERM]()
+                await asyncio.sleep(0.1)
+                termination_event.set()
+                await serve_task
+        finally:
+            loop.add_signal_handler = original_add
+    return order
+
+
+@pytest.mark.asyncio
+async def test_sigterm_drains_audit_hooks_after_the_server_stops(mock_envoy_modules, mock_manager):
+    """Audit-mode hooks submitted by draining streams are flushed before the plugins shut down."""
+    order = await run_sigterm(mock_manager)
+
+    assert order == ["server.stop", "audit_mode.drain", "manager.shutdown"]
+
+
+@pytest.mark.asyncio
+async def test_sigterm_stops_offloads_after_the_audit_hooks(mock_envoy_modules, mock_manager):
+    """Hooks of draining streams and audit mode still get their thread, worker or subinterpreter."""
+    order = []
+    offload = MagicMock()
+    offload.shutdown = AsyncMock(side_effect=step(order, "offloads.shutdown"))
+
+    await run_sigterm(mock_manager, {"offloads": {"SlowPlugin": offload}}, order)
+
+    assert order == ["server.stop", "audit_mode.drain", "offloads.shutdown", "manager.shutdown"]
+
+
+@pytest.mark.asyncio
+async def test_sigterm_closes_the_audit_log_after_the_last_hooks(mock_envoy_modules, mock_manager):
+    """Verdicts of draining streams and audit-mode hooks still reach the audit log."""
+    order = []
+    audit_log = MagicMock()
+    audit_log.close = MagicMock(side_effect=lambda timeout: order.append("audit_log.close"))
+    offload = MagicMock()
+    offload.shutdown = AsyncMock(side_effect=step(order, "offloads.shutdown"))
+
+    await run_sigterm(mock_manager, {"audit_log": audit_log, "offloads": {"SlowPlugin": offload}}, order)
+
+    assert order == ["server.stop", "audit_mode.drain", "offloads.shutdown", "audit_log.close", "manager.shutdown"]
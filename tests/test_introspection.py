@@ -0,0 +1,109 @@
+"""Unit tests for the admin introspection endpoints."""
+
+# Standard
+import asyncio
+import json
+from types import SimpleNamespace
+
+# Third-Party
+import pytest
+from cpex.framework import PluginConfig
+from cpex.framework.errors import PluginViolationError
+from cpex.framework.models import PluginResult
+
+# Local
+import server
+from admin import AdminServer
+from executor import AdapterExecutor
+from introspection import PluginActivity
+from offload import ThreadOffload
+from tests.test_admin import request
+
+
+async def result(continue_processing=True):
+    return PluginResult(continue_processing=continue_processing)
+
+
+async def violation():
+    raise PluginViolationError("blocked")
+
+
+async def failure():
+    raise ValueError("broken")
+
+
+@pytest.mark.asyncio
+async def test_plugin_activity_counts_outcomes():
+    activity = PluginActivity()
+
+    await activity.track("Guard", result())
+    await activity.track("Guard", result(continue_processing=False))
+    with pytest.raises(PluginViolationError):
+        await activity.track("Guard", violation())
+    with pytest.raises(ValueError):
+        await activity.track("Guard", failure())
+
+    guard = activity.snapshot()["Guard"]
+    assert (guard["calls"], guard["blocked"], guard["errors"], guard["in_flight"]) == (4, 2, 1, 0)
+    assert guard["latency"]["samples"] == 4
+    assert guard["latency"]["p50"] <= guard["latency"]["max"]
+
+
+@pytest.mark.asyncio
+async def test_plugin_activity_counts_in_flight():
+    activity = PluginActivity()
+    release = asyncio.Event()
+
+    async def slow():
+        await release.wait()
+        return PluginResult()
+
+    running = asyncio.ensure_future(activity.track("Guard", slow()))
+    await asyncio.sleep(0)
+    assert activity.snapshot()["Guard"]["in_flight"] == 1
+
+    release.set()
+    await running
+    assert activity.snapshot()["Guard"]["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_admin_endpoints_report_live_state(monkeypatch):
+    pool = ThreadOffload(max_workers=2)
+    executor = AdapterExecutor(activity=PluginActivity(), offloads={"Guard": pool})
+    await executor.activity.track("Guard", result())
+    config = SimpleNamespace(plugins=[PluginConfig(name="Guard", kind="test")])
+    monkeypatch.setattr(server, "manager", SimpleNamespace(config=config, executor=executor), raising=False)
+    monkeypatch.setattr(server, "plugin_executors", {"Guard": "thread"})
+    state = server.StreamState()
+    state.phase = "request_body"
+    server.active_streams.add(state)
+    admin = AdminServer()
+    admin.start()
+    server.add_admin_routes(admin)
+
+    async def get(path):
+        status, body = await asyncio.to_thread(request, admin, "GET", path)
+        assert status == 200, body
+        return json.loads(body)
+
+    try:
+        streams = await get("/admin/streams")
+        plugins = await get("/admin/plugins")
+        caches = await get("/admin/caches")
+        limiters = await get("/admin/limiters")
+        channelz = await asyncio.to_thread(request, admin, "GET", "/admin/channelz")
+    finally:
+        server.active_streams.discard(state)
+        admin.stop()
+        await pool.shutdown()
+
+    assert streams["count"] == 1
+    assert streams["streams"][0]["phase"] == "request_body"
+    assert plugins["Guard"]["executor"] == "thread"
+    assert plugins["Guard"]["calls"] == 1
+    assert caches["correlation"]["max_entries"] == server.correlation_table.max_entries
+    assert limiters["thread_pool"] == {"pending": 0, "max_workers": 2, "max_queue": 64}
+    assert limiters["audit"]["max_pending"] == server.shadow_runner.max_pending
+    # 409 without the optional grpcio-channelz package
+    assert channelz[0] in (200, 409)
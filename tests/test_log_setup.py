@@ -0,0 +1,94 @@
+"""Unit tests for the request-path logging setup."""
+
+# Standard
+import logging
+import queue
+
+# Third-Party
+import pytest
+from envoy.service.ext_proc.v3 import external_processor_pb2
+
+# Local
+from log_setup import DroppingQueueHandler, PayloadFilter, category_logger, configure_logging
+
+
+def record(*args):
+    return logging.LogRecord("ext-proc-PM.payload", logging.DEBUG, __file__, 1, "Body: %s (%d)", args, None)
+
+
+def test_payload_filter_truncates_arguments():
+    logged = record("x" * 100, 100)
+
+    assert PayloadFilter(max_chars=10).filter(logged)
+    assert logged.getMessage() == "Body: xxxxxxxxxx... (100 chars) (100)"
+
+
+def test_payload_filter_does_not_format_large_arguments():
+    formatted = []
+
+    class Value:
+        def __repr__(self):
+            formatted.append(self)
+            return "value"
+
+    request = external_processor_pb2.ProcessingRequest()
+    request.request_body.body = b"x" * 1_000_000
+    logged = record(request, 1)
+    assert PayloadFilter(max_chars=50).filter(logged)
+    assert logged.getMessage() == "Body: ProcessingRequest(request_body=HttpBody(body=b'xxx... (1)"
+
+    logged = record(b"y" * 1000, 1)
+    assert PayloadFilter(max_chars=4).filter(logged)
+    assert logged.getMessage() == "Body: b'yyyy'... (1000 bytes) (1)"
+
+    values = [Value() for _ in range(1000)]
+    assert PayloadFilter(max_chars=40).filter(record(values, 1))
+    assert len(formatted) < 10
+
+
+def test_payload_filter_samples():
+    kept = sum(PayloadFilter(sample_rate=0.25).filter(record("body", 1)) for _ in range(4000))
+
+    assert 800 < kept < 1200
+    assert not PayloadFilter(sample_rate=0.0).filter(record("body", 1))
+
+
+def test_full_queue_drops_records():
+    handler = DroppingQueueHandler(queue.Queue(1))
+
+    for _ in range(3):
+        handler.handle(record("body", 1))
+
+    assert (handler.queue.qsize(), handler.dropped) == (1, 2)
+
+
+class Collect(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+@pytest.fixture
+def restore_logging():
+    root = logging.getLogger()
+    handlers, payload = list(root.handlers), category_logger("payload")
+    yield
+    root.handlers[:] = handlers
+    payload.filters.clear()
+    payload.setLevel(logging.NOTSET)
+
+
+def test_configure_logging_writes_from_a_thread(restore_logging):
+    listener = configure_logging({"payload": "debug"}, payload_max_chars=4, queue_size=100)
+    collect = Collect()
+    listener.handlers = (collect,)
+    try:
+        category_logger("payload").debug("Body: %s", "abcdefgh")
+    finally:
+        listener.stop()
+
+    assert category_logger("payload").level == logging.DEBUG
+    assert collect.messages == ["Body: abcd... (8 chars)"]
@@ -0,0 +1,68 @@
+"""Unit tests for the event-loop lag monitor."""
+
+# Standard
+import asyncio
+import time
+
+# Third-Party
+import pytest
+from cpex.framework import Plugin, PluginConfig, PluginContext, ToolPreInvokePayload, ToolPreInvokeResult
+from cpex.framework.models import GlobalContext
+
+# Local
+import metrics
+from loop_monitor import LoopMonitor
+
+
+class BlockingPlugin(Plugin):
+    """Blocks the event loop like a synchronous HTTP client would."""
+
+    async def tool_pre_invoke(self, payload: ToolPreInvokePayload, context: PluginContext) -> ToolPreInvokeResult:
+        self._call_guardrails()
+        return ToolPreInvokeResult()
+
+    def _call_guardrails(self):
+        time.sleep(0.3)
+
+
+async def monitored(coro):
+    monitor = LoopMonitor(interval=0.02, threshold=0.05, log_interval=0)
+    task = asyncio.ensure_future(monitor.run())
+    await asyncio.sleep(0.05)
+    await coro
+    await asyncio.sleep(0.05)
+    task.cancel()
+    return monitor
+
+
+@pytest.mark.asyncio
+async def test_stall_is_attributed_to_the_blocking_hook(caplog):
+    plugin = BlockingPlugin(PluginConfig(name="Blocker", kind="test", hooks=["tool_pre_invoke"]))
+    before = metrics.LOOP_BLOCKED_SECONDS.labels(plugin="Blocker", hook="tool_pre_invoke")._value.get()
+    context = PluginContext(global_context=GlobalContext(request_id="1"))
+
+    monitor = await monitored(plugin.tool_pre_invoke(ToolPreInvokePayload(name="tool", args={}), context))
+
+    blocked = monitor.blocking[("Blocker", "tool_pre_invoke")]
+    assert 0.2 < blocked < 0.5
+    assert metrics.LOOP_BLOCKED_SECONDS.labels(plugin="Blocker", hook="tool_pre_invoke")._value.get() == pytest.approx(
+        before + blocked
+    )
+    assert "_call_guardrails" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_stall_outside_plugins_is_unattributed():
+    async def block():
+        time.sleep(0.2)
+
+    monitor = await monitored(block())
+
+    assert list(monitor.blocking) == [("unknown", "")]
+
+
+@pytest.mark.asyncio
+async def test_idle_loop_counts_nothing():
+    monitor = await monitored(asyncio.sleep(0.2))
+
+    assert monitor.blocking == {}
@@ -0,0 +1,124 @@
+"""Unit tests for running plugin hooks on a thread pool."""
+
+# Standard
+import asyncio
+import threading
+from types import SimpleNamespace
+
+# Third-Party
+import pytest
+from cpex.framework import ToolPreInvokePayload
+from cpex.framework.models import GlobalContext, PluginMode, PluginResult
+
+# Local
+import metrics
+from adapter_settings import load_plugin_executors
+from executor import AdapterExecutor
+from offload import PoolSaturatedError, ThreadOffload
+
+
+async def thread_name():
+    return threading.current_thread().name
+
+
+@pytest.mark.asyncio
+async def test_hook_runs_on_a_worker_thread():
+    offload = ThreadOffload(max_workers=1)
+
+    assert (await offload.run(thread_name())).startswith("plugin-hook")
+    assert offload.pending == 0
+    await offload.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_full_pool_rejects_hooks():
+    offload = ThreadOffload(max_workers=1, max_queue=0)
+    release = threading.Event()
+
+    async def blocking():
+        release.wait()
+        return "done"
+
+    rejected = metrics.THREAD_POOL_REJECTED._value.get()
+    running = asyncio.ensure_future(offload.run(blocking()))
+    await asyncio.sleep(0)
+
+    with pytest.raises(PoolSaturatedError):
+        await offload.run(thread_name())
+    assert metrics.THREAD_POOL_REJECTED._value.get() == rejected + 1
+
+    release.set()
+    assert await running == "done"
+    await offload.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_hook_stays_pending_after_its_caller_times_out():
+    """A timed-out hook keeps its thread, so it counts against the pool until it returns."""
+    offload = ThreadOffload(max_workers=1, max_queue=0)
+    release = threading.Event()
+
+    async def blocking():
+        release.wait()
+
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(offload.run(blocking()), timeout=0.05)
+    assert offload.pending == 1
+    with pytest.raises(PoolSaturatedError):
+        await offload.run(thread_name())
+
+    release.set()
+    for _ in range(100):
+        if not offload.pending:
+            break
+        await asyncio.sleep(0.01)
+    assert offload.pending == 0
+    await offload.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_executor_offloads_configured_plugins():
+    threads = {}
+
+    async def hook(payload, context):
+        threads[payload.name] = threading.current_thread().name
+        return PluginResult(continue_processing=True)
+
+    def hook_ref(name):
+        plugin_ref = SimpleNamespace(
+            name=name, uuid=name, mode=PluginMode.SEQUENTIAL, priority=0, conditions=None, capabilities=None
+        )
+        return SimpleNamespace(name="tool_pre_invoke", plugin_ref=plugin_ref, hook=hook, accepts_extensions=False)
+
+    offload = ThreadOffload(max_workers=1)
+    executor = AdapterExecutor(offloads={"threaded": offload})
+
+    for name in ("threaded", "inline"):
+        payload = ToolPreInvokePayload(name=name, args={})
+        await executor.execute([hook_ref(name)], payload, GlobalContext(request_id="1"), "tool_pre_invoke")
+
+    assert threads["threaded"].startswith("plugin-hook")
+    assert threads["inline"] == threading.current_thread().name
+    await offload.shutdown()
+
+
+def test_load_plugin_executors(tmp_path):
+    config = tmp_path / "config.yaml"
+    config.write_text(
+        "plugins:\n"
+        "  - name: NemoCheck\n"
+        "    executor: thread\n"
+        "  - name: Other\n"
+        "    executor: inline\n"
+        "  - name: Default\n"
+    )
+
+    assert load_plugin_executors(str(config)) == {"NemoCheck": "thread"}
+
+
+def test_unknown_plugin_executor_rejected(tmp_path):
+    config = tmp_path / "config.yaml"
+    config.write_text("plugins:\n  - name: NemoCheck\n    executor: gpu\n")
+
+    with pytest.raises(ValueError, match="executor must be one of"):
+        load_plugin_executors(str(config))
@@ -0,0 +1,112 @@
+"""Unit tests for keeping large base64 strings out of parsed payloads."""
+
+# Standard
+import base64
+import json
+
+# Third-Party
+import pytest
+
+# Local
+from opaque import BINARY_CONTENT_KEYS, strip_opaque
+
+IMAGE = base64.b64encode(bytes(range(256)) * 8)
+
+
+def tool_result(data=IMAGE):
+    return (
+        b'{"jsonrpc": "2.0", "id": 1, "result": {"content": ['
+        b'{"type": "text", "text": "caption"}, '
+        b'{"type": "image", "mimeType": "image/png", "data": "' + data + b'"}]}}'
+    )
+
+
+def test_strip_replaces_binary_content_with_placeholder():
+    body = tool_result()
+
+    opaque = strip_opaque(body, 1024, BINARY_CONTENT_KEYS)
+
+    data = json.loads(opaque.text)
+    image = data["result"]["content"][1]
+    assert image["data"] == opaque.placeholder(0)
+    assert f"{len(IMAGE)} bytes" in image["data"]
+    assert data["result"]["content"][0]["text"] == "caption"
+    assert len(opaque.text) < 200
+
+
+def test_restore_puts_back_original_bytes():
+    body = tool_result()
+    opaque = strip_opaque(body, 1024, BINARY_CONTENT_KEYS)
+    data = json.loads(opaque.text)
+    data["result"]["content"][0]["text"] = "[redacted]"
+
+    restored = opaque.restore(json.dumps(data).encode("utf-8"))
+
+    assert json.loads(restored)["result"]["content"][1]["data"] == IMAGE.decode()
+    assert json.loads(restored)["result"]["content"][0]["text"] == "[redacted]"
+
+
+def test_restore_without_placeholders_returns_data():
+    opaque = strip_opaque(tool_result(), 1024, BINARY_CONTENT_KEYS)
+
+    assert opaque.restore(b'{"result": {}}') == b'{"result": {}}'
+
+
+def test_blobs_map_placeholders_to_base64_text():
+    opaque = strip_opaque(tool_result(), 1024, BINARY_CONTENT_KEYS)
+
+    blobs = opaque.blobs()
+
+    assert bytes(blobs[opaque.placeholder(0)]) == IMAGE
+
+
+def test_short_strings_and_other_keys_are_kept():
+    body = tool_result(data=b"aGVsbG8=")
+    assert strip_opaque(body, 1024, BINARY_CONTENT_KEYS) is None
+
+    text = b'{"result": {"content": [{"type": "text", "text": "' + IMAGE + b'"}]}}'
+    assert strip_opaque(text, 1024, BINARY_CONTENT_KEYS) is None
+    assert strip_opaque(text, 1024) is not None
+
+
+def test_disabled_with_zero_min_bytes():
+    assert strip_opaque(tool_result(), 0, BINARY_CONTENT_KEYS) is None
+
+
+def test_escaped_quotes_are_not_string_boundaries():
+    # The run of base64-looking text ends at an escaped quote inside a longer string
+    body = json.dumps({"text": 'x"' + "A" * 2000 + '" and more'}).encode("utf-8")
+
+    assert strip_opaque(body, 1024) is None
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        b"ab\\/cd" * 400,  # JSON escapes
+        b"ab-_cd" * 400,  # base64url
+        IMAGE[:-1],  # not whole quanta
+        b"QUJD=" + IMAGE,  # padding before the end
+    ],
+)
+def test_only_valid_base64_is_stripped(value):
+    """Text that merely looks like base64 stays visible to the plugins."""
+    assert strip_opaque(b'{"blob": "' + value + b'"}', 1024, BINARY_CONTENT_KEYS) is None
+
+
+def test_padded_base64_is_stripped():
+    value = base64.b64encode(bytes(range(256)) * 8 + b"xy")
+
+    opaque = strip_opaque(b'{"blob": "' + value + b'"}', 1024, BINARY_CONTENT_KEYS)
+
+    assert value.endswith(b"==")
+    assert bytes(opaque.blobs()[opaque.placeholder(0)]) == value
+
+
+def test_sse_body_is_stripped_in_place():
+    body = b"event: message\ndata: " + tool_result() + b"\n\n"
+
+    opaque = strip_opaque(body, 1024, BINARY_CONTENT_KEYS)
+
+    assert opaque.text.startswith(b"event: message\ndata: {")
+    assert opaque.text.endswith(b"}\n\n")
@@ -0,0 +1,78 @@
+"""Unit tests for the cost model ordering sequential plugins."""
+
+# Third-Party
+import pytest
+
+# Local
+from ordering import PluginCost, PluginCostModel, expected_latency
+
+
+def model_with(runs, **options):
+    """A model that has seen each plugin in ``runs`` (name -> (seconds, blocked)) ten times."""
+    options.setdefault("min_samples", 10)
+    options.setdefault("reorderable", list(runs))
+    model = PluginCostModel(**options)
+    for _ in range(10):
+        for plugin, (seconds, blocked) in runs.items():
+            model.record("tool_pre_invoke", "t", plugin, seconds, blocked, modified=False)
+    return model
+
+
+def test_expected_latency_stops_at_blocks():
+    costs = [PluginCost(latency=1.0, block_rate=0.5), PluginCost(latency=2.0, block_rate=0.0)]
+
+    assert expected_latency(costs) == pytest.approx(2.0)
+
+
+def test_cheap_blocking_plugin_moves_first():
+    model = model_with({"remote": (0.5, False), "local": (0.001, True)})
+
+    order = model.order("tool_pre_invoke", "t", ["remote", "local"])
+
+    assert order.chosen == ["local", "remote"]
+    assert order.saving == pytest.approx(0.5)
+    assert model.orders()[("tool_pre_invoke", "t")] is order
+
+
+def test_configured_order_kept_until_enough_samples():
+    model = model_with({"remote": (0.5, False), "local": (0.001, True)}, min_samples=20)
+
+    assert model.order("tool_pre_invoke", "t", ["remote", "local"]).chosen == ["remote", "local"]
+
+
+def test_plugins_stay_in_place_unless_reorderable():
+    model = model_with({"remote": (0.5, False), "local": (0.001, True)}, reorderable=[])
+
+    assert model.order("tool_pre_invoke", "t", ["remote", "local"]).chosen == ["remote", "local"]
+
+
+def test_plugin_not_reorderable_is_a_barrier():
+    runs = {"a": (0.5, False), "pin": (0.5, False), "b": (0.1, True), "c": (0.001, True)}
+    model = model_with(runs, reorderable=["a", "b", "c"])
+
+    order = model.order("tool_pre_invoke", "t", ["a", "pin", "b", "c"])
+
+    assert order.chosen == ["a", "pin", "c", "b"]
+
+
+def test_mutating_plugin_is_pinned():
+    model = model_with({"a": (0.5, False), "b": (0.001, True)})
+    model.record("tool_pre_invoke", "t", "a", 0.5, blocked=False, modified=True)
+
+    assert model.order("tool_pre_invoke", "t", ["a", "b"]).chosen == ["a", "b"]
+
+
+def test_orders_are_per_tool():
+    model = model_with({"remote": (0.5, False), "local": (0.001, True)})
+
+    assert model.order("tool_pre_invoke", "other", ["remote", "local"]).chosen == ["remote", "local"]
+    assert ("tool_pre_invoke", "other") not in model.orders()
+
+
+def test_least_recently_used_keys_dropped():
+    model = PluginCostModel(max_keys=1)
+    model.record("h", "t1", "p", 0.1, False, False)
+    model.record("h", "t2", "p", 0.1, False, False)
+
+    assert model.costs("h", "t1") is None
+    assert model.costs("h", "t2")["p"].samples == 1
@@ -0,0 +1,184 @@
+"""Unit tests for running plugin hooks in worker processes."""
+
+# Standard
+import asyncio
+import os
+import signal
+from multiprocessing.shared_memory import SharedMemory
+
+# Third-Party
+import pytest
+from cpex.framework import (
+    Plugin,
+    PluginConfig,
+    PluginContext,
+    ToolPreInvokePayload,
+    ToolPreInvokeResult,
+)
+from cpex.framework.models import GlobalContext
+
+# Local
+import metrics
+from process_pool import ProcessOffload, WorkerError, discard, pack
+
+
+class WorkerPlugin(Plugin):
+    """Loaded in the worker processes; behaves according to the tool name."""
+
+    async def tool_pre_invoke(self, payload: ToolPreInvokePayload, context: PluginContext) -> ToolPreInvokeResult:
+        if payload.name == "crash":
+            os._exit(1)
+        if payload.name == "fail":
+            raise ValueError("plugin failed")
+        if payload.name == "slow":
+            await asyncio.sleep(0.5)
+        blob = context.global_context.metadata.get("blob", b"")
+        context.state["pid"] = os.getpid()
+        context.global_context.state["seen"] = payload.name
+        context.global_context.metadata["blob_size"] = len(blob)
+        args = dict(payload.args, echoed=len(payload.args.get("text", "")))
+        return ToolPreInvokeResult(modified_payload=payload.model_copy(update={"args": args}))
+
+
+CONFIG = PluginConfig(
+    name="WorkerPlugin",
+    kind="tests.test_process_pool.WorkerPlugin",
+    hooks=["tool_pre_invoke"],
+)
+
+
+def call_args(name, text="", **metadata):
+    payload = ToolPreInvokePayload(name=name, args={"text": text})
+    context = PluginContext(global_context=GlobalContext(request_id="1", metadata=metadata))
+    return payload, context
+
+
+async def started(**options):
+    offload = ProcessOffload(CONFIG, workers=1, **options)
+    await offload.start()
+    return offload
+
+
+@pytest.mark.asyncio
+async def test_hook_runs_in_worker_and_updates_context():
+    offload = await started()
+    payload, context = call_args("tool", text="hello")
+
+    result = await offload.call("tool_pre_invoke", payload, context)
+
+    assert result.modified_payload.args["echoed"] == 5
+    assert context.state["pid"] != os.getpid()
+    assert context.global_context.state["seen"] == "tool"
+    assert context.global_context.metadata["blob_size"] == 0
+    await offload.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_large_payload_goes_through_shared_memory():
+    offload = await started(transfer_threshold=1024)
+    blob = b"x" * 100_000
+    payload, context = call_args("tool", text="y" * 100_000, blob=memoryview(blob))
+
+    result = await offload.call("tool_pre_invoke", payload, context)
+
+    assert result.modified_payload.args["echoed"] == 100_000
+    # The opaque memoryview arrives as bytes and is not copied back
+    assert context.global_context.metadata["blob_size"] == len(blob)
+    assert isinstance(context.global_context.metadata["blob"], memoryview)
+    await offload.shutdown()
+
+
+def test_discard_frees_unsent_shared_memory():
+    packed = pack(b"x" * 4096, 1024)
+
+    discard(packed)
+
+    with pytest.raises(FileNotFoundError):
+        SharedMemory(name=packed[0])
+    discard(packed)
+
+
+@pytest.mark.asyncio
+async def test_call_cancelled_while_waiting_for_a_worker_leaves_no_shared_memory():
+    offload = await started(transfer_threshold=1024)
+    busy = asyncio.ensure_future(offload.call("tool_pre_invoke", *call_args("slow")))
+    await asyncio.sleep(0.1)
+    blocks = set(os.listdir("/dev/shm")) if os.path.isdir("/dev/shm") else set()
+
+    waiting = asyncio.ensure_future(offload.call("tool_pre_invoke", *call_args("tool", text="y" * 100_000)))
+    await asyncio.sleep(0.1)
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+
+    if os.path.isdir("/dev/shm"):
+        assert set(os.listdir("/dev/shm")) <= blocks
+    assert (await busy).modified_payload is not None
+    await offload.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_hung_worker_replaced_before_unpacking_leaves_no_shared_memory():
+    offload = await started(transfer_threshold=1024, health_timeout=0.2)
+    restarts = metrics.PROCESS_POOL_RESTARTS.labels(plugin="WorkerPlugin", reason="hung")._value.get()
+    (worker,) = offload._all
+    # A stopped worker never reads the call, so the arguments stay in shared memory
+    os.kill(worker.process.pid, signal.SIGSTOP)
+
+    call = asyncio.ensure_future(offload.call("tool_pre_invoke", *call_args("tool", text="y" * 100_000)))
+    await asyncio.sleep(0.1)
+    name = worker.pending[0]
+    call.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await call
+    for _ in range(50):
+        await asyncio.sleep(0.1)
+        if worker not in offload._all:
+            break
+
+    assert metrics.PROCESS_POOL_RESTARTS.labels(plugin="WorkerPlugin", reason="hung")._value.get() == restarts + 1
+    with pytest.raises(FileNotFoundError):
+        SharedMemory(name=name)
+    await offload.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_plugin_exception_is_raised_in_caller():
+    offload = await started()
+
+    with pytest.raises(ValueError, match="plugin failed"):
+        await offload.call("tool_pre_invoke", *call_args("fail"))
+    # The worker is still usable
+    assert (await offload.call("tool_pre_invoke", *call_args("tool"))).modified_payload is not None
+    await offload.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_crashed_worker_is_replaced():
+    offload = await started()
+    restarts = metrics.PROCESS_POOL_RESTARTS.labels(plugin="WorkerPlugin", reason="died")._value.get()
+
+    with pytest.raises(WorkerError):
+        await offload.call("tool_pre_invoke", *call_args("crash"))
+
+    result = await asyncio.wait_for(offload.call("tool_pre_invoke", *call_args("tool")), timeout=30)
+    assert result.modified_payload is not None
+    assert metrics.PROCESS_POOL_RESTARTS.labels(plugin="WorkerPlugin", reason="died")._value.get() == restarts + 1
+    await offload.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_health_check_replaces_dead_idle_worker():
+    offload = await started(health_interval=0.1, health_timeout=1)
+    restarts = metrics.PROCESS_POOL_RESTARTS.labels(plugin="WorkerPlugin", reason="unhealthy")._value.get()
+    (worker,) = offload._all
+
+    worker.process.kill()
+    for _ in range(300):
+        await asyncio.sleep(0.1)
+        if worker not in offload._all and offload._idle.qsize():
+            break
+
+    assert metrics.PROCESS_POOL_RESTARTS.labels(plugin="WorkerPlugin", reason="unhealthy")._value.get() == restarts + 1
+    assert (await offload.call("tool_pre_invoke", *call_args("tool"))).modified_payload is not None
+    await offload.shutdown()
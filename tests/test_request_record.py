@@ -0,0 +1,159 @@
+"""Unit tests for reporting plugin durations and verdicts to Envoy."""
+
+# Standard
+from types import SimpleNamespace
+
+# Third-Party
+import pytest
+from cpex.framework import ToolPreInvokePayload
+from cpex.framework.models import GlobalContext, PluginMode, PluginResult, PluginViolation
+from google.protobuf import json_format
+
+# Local
+import server
+from adapter_settings import AdapterSettings, DynamicMetadataSettings, ServerTimingSettings
+from executor import AdapterExecutor
+from request_record import RequestRecord, request_record
+
+
+@pytest.fixture
+def reporting(monkeypatch):
+    settings = AdapterSettings(
+        server_timing=ServerTimingSettings(enabled=True),
+        dynamic_metadata=DynamicMetadataSettings(enabled=True, metadata_keys=["rails_status"]),
+    )
+    monkeypatch.setattr(server, "adapter_settings", settings)
+    return settings
+
+
+def blocked_record():
+    record = RequestRecord()
+    record.add_timing("tool_pre_invoke.Nemo Check", 0.0119)
+    record.add_timing("tool_pre_invoke", 0.0124)
+    violation = PluginViolation(reason="PII", description="email", code="PII")
+    violation.plugin_name = "Nemo Check"
+    record.add_verdict("tool_pre_invoke", 0.0124, True, violation, {"rails_status": {"pii": "blocked"}, "x": 1})
+    return record
+
+
+def test_server_timing_reports_new_durations_once():
+    record = blocked_record()
+
+    assert record.server_timing() == "tool_pre_invoke.Nemo_Check;dur=11.9, tool_pre_invoke;dur=12.4"
+    assert record.server_timing() == ""
+    record.add_timing("tool_post_invoke", 0.002)
+    assert record.server_timing() == "tool_post_invoke;dur=2.0"
+
+
+def test_dynamic_metadata_reports_verdict_and_selected_metadata():
+    record = blocked_record()
+
+    assert record.dynamic_metadata(["rails_status"]) == {
+        "tool_pre_invoke": {
+            "verdict": "deny",
+            "duration_ms": 12.4,
+            "invocations": 1,
+            "violation_code": "PII",
+            "plugin": "Nemo Check",
+            "violation_codes": ["PII"],
+            "plugins": {"Nemo Check": 11.9},
+            "metadata": {"rails_status": {"pii": "blocked"}},
+        }
+    }
+    assert record.dynamic_metadata(["rails_status"]) == {}
+
+
+def test_later_verdicts_of_a_hook_do_not_override_a_deny():
+    record = blocked_record()
+    record.add_timing("tool_pre_invoke.Nemo Check", 0.001)
+    record.add_verdict("tool_pre_invoke", 0.002, False, None, {"rails_status": "ok"})
+    violation = PluginViolation(reason="Secret", description="key", code="SECRET")
+    violation.plugin_name = "Secrets"
+    record.add_verdict("tool_pre_invoke", 0.003, True, violation, None)
+
+    verdict = record.dynamic_metadata(["rails_status"])["tool_pre_invoke"]
+
+    assert (verdict["verdict"], verdict["violation_code"], verdict["plugin"]) == ("deny", "PII", "Nemo Check")
+    assert verdict["violation_codes"] == ["PII", "SECRET"]
+    assert (verdict["invocations"], verdict["duration_ms"], verdict["plugins"]) == (3, 17.4, {"Nemo Check": 12.9})
+    assert verdict["metadata"] == {"rails_status": "ok"}
+
+
+def header(response, kind):
+    mutation = (
+        response.immediate_response.headers
+        if kind == "immediate_response"
+        else getattr(response, kind).response.header_mutation
+    )
+    return {h.header.key: h.header.raw_value.decode() for h in mutation.set_headers}
+
+
+def test_response_headers_get_a_copy_with_timings(reporting):
+    response = server.annotate_response(server.RESPONSE_HEADERS_RESPONSE, blocked_record())
+
+    assert header(response, "response_headers")["server-timing"].startswith("tool_pre_invoke.Nemo_Check;dur=11.9")
+    assert "server-timing" not in header(server.RESPONSE_HEADERS_RESPONSE, "response_headers")
+    metadata = json_format.MessageToDict(response.dynamic_metadata)
+    assert metadata["plugins_adapter"]["tool_pre_invoke"]["verdict"] == "deny"
+
+
+def test_request_body_responses_carry_only_dynamic_metadata(reporting):
+    record = blocked_record()
+
+    response = server.annotate_response(server.EMPTY_REQUEST_BODY_RESPONSE, record)
+
+    assert not response.request_body.response.header_mutation.set_headers
+    assert "plugins_adapter" in json_format.MessageToDict(response.dynamic_metadata)
+    # The durations wait for the response headers
+    assert record.server_timing().startswith("tool_pre_invoke.Nemo_Check")
+
+
+def test_streamed_response_bodies_carry_no_headers(reporting):
+    record = RequestRecord()
+    record.add_timing("tool_post_invoke", 0.001)
+
+    response = server.annotate_response(server.EMPTY_RESPONSE_BODY_RESPONSE, record, headers=False)
+    record.add_timing("tool_post_invoke", 0.001)
+
+    assert response is server.EMPTY_RESPONSE_BODY_RESPONSE
+    # No later response can carry the durations, so they are not kept
+    assert (record.timings, record.keeps_timings) == ([], False)
+
+
+def test_reported_verdicts_are_forgotten(reporting):
+    record = blocked_record()
+
+    server.annotate_response(server.RESPONSE_HEADERS_RESPONSE, record)
+
+    assert (record.timings, record.dynamic_metadata()) == ([], {})
+
+
+def test_disabled_reporting_leaves_response_unchanged():
+    response = server.EMPTY_RESPONSE_BODY_RESPONSE
+
+    assert server.annotate_response(response, None) is response
+    assert server.annotate_response(response, blocked_record()) is response
+
+
+@pytest.mark.asyncio
+async def test_executor_records_durations_and_verdict():
+    async def hook(payload, context):
+        return PluginResult(continue_processing=True, metadata={"rails_status": "ok"})
+
+    plugin_ref = SimpleNamespace(
+        name="Guard", uuid="Guard", mode=PluginMode.SEQUENTIAL, priority=0, conditions=None, capabilities=None
+    )
+    hook_ref = SimpleNamespace(name="tool_pre_invoke", plugin_ref=plugin_ref, hook=hook, accepts_extensions=False)
+    executor = AdapterExecutor(record_requests=True)
+    record = RequestRecord()
+    token = request_record.set(record)
+    try:
+        payload = ToolPreInvokePayload(name="tool", args={})
+        await executor.execute([hook_ref], payload, GlobalContext(request_id="1"), "tool_pre_invoke")
+    finally:
+        request_record.reset(token)
+
+    assert [name for name, _ in record.timings] == ["tool_pre_invoke.Guard", "tool_pre_invoke"]
+    verdict = record.verdicts["tool_pre_invoke"]
+    assert (verdict["verdict"], list(verdict["plugins"])) == ("allow", ["Guard"])
+    assert verdict["metadata"] == {"rails_status": "ok"}
@@ -0,0 +1,57 @@
+"""Unit tests for the streaming sketches."""
+
+# Standard
+import random
+
+# Local
+from sketches import QuantileSketch, SpaceSaving
+
+
+def test_space_saving_keeps_heavy_hitters():
+    summary = SpaceSaving(capacity=3)
+    stream = ["a"] * 50 + ["b"] * 30 + [f"rare{i}" for i in range(20)]
+    random.Random(1).shuffle(stream)
+
+    for key in stream:
+        summary.add(key)
+
+    (first, first_weight, first_error), (second, second_weight, second_error), _ = summary.top()
+    assert (first, second) == ("a", "b")
+    assert first_weight - first_error <= 50 <= first_weight
+    assert second_weight - second_error <= 30 <= second_weight
+    assert (len(summary), summary.total) == (3, 100)
+
+
+def test_space_saving_reports_evictions_and_weights():
+    summary = SpaceSaving(capacity=1)
+
+    assert summary.add("a", 5) is None
+    assert summary.add("b", 2) == "a"
+    assert summary.top() == [("b", 7, 5)]
+
+
+def test_quantile_sketch_is_within_relative_accuracy():
+    sketch = QuantileSketch(relative_accuracy=0.01)
+    values = [random.Random(i).lognormvariate(-4, 1) for i in range(10_000)]
+
+    for value in values:
+        sketch.add(value)
+
+    ordered = sorted(values)
+    for q in (0.5, 0.9, 0.99):
+        exact = ordered[int(q * (len(ordered) - 1))]
+        assert abs(sketch.quantile(q) - exact) <= 0.011 * exact
+    assert sketch.count == 10_000
+
+
+def test_quantile_sketch_merges_lowest_buckets():
+    sketch = QuantileSketch(relative_accuracy=0.01, max_buckets=8)
+
+    for exponent in range(-6, 2):
+        sketch.add(10.0**exponent)
+    sketch.add(0.0)
+    sketch.add(100.0)
+
+    assert sketch.quantile(0.0) == 0.0
+    assert abs(sketch.quantile(1.0) - 100.0) <= 1.0
+    assert QuantileSketch().quantile(0.5) == 0.0
@@ -0,0 +1,91 @@
+"""Unit tests for the SSE framing helpers."""
+
+# Third-Party
+import pytest
+
+# Local
+from body_budget import BodyBudget
+from sse import SSEEventBuffer, event_data, looks_like_sse, replace_event_data
+
+
+def test_event_buffer_reassembles_split_events():
+    """Events split across chunks are returned only once complete."""
+    buffer = SSEEventBuffer()
+
+    assert buffer.feed(b'event: message\ndata: {"a"') == []
+    assert buffer.feed(b": 1}\n\nda") == [b'event: message\ndata: {"a": 1}\n\n']
+    assert len(buffer) == 2
+    assert buffer.feed(b"ta: 2\r\n\r\ndata: 3\r\r") == [b"data: 2\r\n\r\n", b"data: 3\r\r"]
+    assert buffer.flush() == b""
+
+
+def test_event_buffer_flush_returns_incomplete_tail():
+    buffer = SSEEventBuffer()
+    buffer.feed(b"data: partial")
+
+    assert buffer.flush() == b"data: partial"
+    assert len(buffer) == 0
+
+
+def test_event_buffer_finds_terminator_split_across_chunks():
+    """The scan resumes a few bytes before the previous end, so a split terminator is found."""
+    buffer = SSEEventBuffer()
+
+    assert buffer.feed(b"data: 1\r\n") == []
+    assert buffer.feed(b"\r") == []
+    assert buffer.feed(b"\ndata: 2") == [b"data: 1\r\n\r\n"]
+    assert buffer.feed(b"\n") == []
+    assert buffer.feed(b"\n") == [b"data: 2\n\n"]
+
+
+def test_event_buffer_over_max_bytes():
+    """Completed events are still returned; the pending event past ``max_bytes`` sets ``over_limit``."""
+    buffer = SSEEventBuffer(max_bytes=8)
+
+    assert buffer.feed(b"data: 1\n\ndata: 2") == [b"data: 1\n\n"]
+    assert not buffer.over_limit
+    assert buffer.feed(b"23456") == []
+    assert buffer.over_limit
+    assert buffer.flush() == b"data: 223456"
+
+
+def test_event_buffer_draws_from_budget():
+    budget = BodyBudget(max_bytes=16)
+    buffer = SSEEventBuffer(budget=budget)
+
+    assert buffer.feed(b"data: 1\n\ndata: 2") == [b"data: 1\n\n"]
+    assert budget.used == len(b"data: 2")
+    assert buffer.feed(b"x" * 10) == []
+    assert buffer.over_limit
+    assert buffer.flush() == b"data: 2" + b"x" * 10
+    assert budget.used == 0
+
+
+@pytest.mark.parametrize(
+    "event,expected",
+    [
+        (b"event: message\ndata: {}\n\n", "{}"),
+        (b"data:no-space\n\n", "no-space"),
+        (b"data: line1\ndata: line2\n\n", "line1\nline2"),
+        (b": comment only\n\n", None),
+    ],
+)
+def test_event_data(event, expected):
+    assert event_data(event) == expected
+
+
+def test_replace_event_data_keeps_framing():
+    """Other fields, line endings and the terminator are preserved."""
+    event = b"event: message\r\nid: 7\r\ndata: old\r\ndata: more\r\n\r\n"
+
+    assert replace_event_data(event, b"new") == b"event: message\r\nid: 7\r\ndata: new\r\n\r\n"
+
+
+def test_replace_event_data_inserts_missing_data():
+    assert replace_event_data(b"event: message\n\n", b"{}") == b"event: message\ndata: {}\n\n"
+
+
+def test_looks_like_sse():
+    assert looks_like_sse(b"event: message\n")
+    assert looks_like_sse(b": ping\n\n")
+    assert not looks_like_sse(b'{"jsonrpc": "2.0"}')
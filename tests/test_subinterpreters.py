@@ -0,0 +1,74 @@
+"""Unit tests for running plugin hooks in subinterpreters."""
+
+# Standard
+import concurrent.futures
+import pickle
+import sys
+from types import SimpleNamespace
+
+# Third-Party
+import pytest
+
+# Local
+import server
+import subinterpreters
+from process_pool import dumps, ship_context
+from subinterpreters import InterpreterOffload, interpreters_supported
+from tests.test_process_pool import CONFIG, call_args
+
+
+def test_interpreters_supported_follows_stdlib_or_backport():
+    if hasattr(concurrent.futures, "InterpreterPoolExecutor"):
+        assert interpreters_supported()
+    elif sys.version_info < (3, 13):
+        assert not interpreters_supported()
+
+
+def test_hook_call_crosses_as_bytes():
+    # The functions the subinterpreters run, called in this interpreter
+    subinterpreters._initialize(pickle.dumps(CONFIG), ())
+    payload, context = call_args("tool", text="hello")
+
+    kind, packed = subinterpreters._call("tool_pre_invoke", dumps((payload, ship_context(context))))
+
+    assert kind == "ok"
+    result, state, _, gc_state, _ = pickle.loads(packed)
+    assert result.modified_payload.args["echoed"] == 5
+    assert "pid" in state
+    assert gc_state["seen"] == "tool"
+
+
+def test_plugin_exception_is_returned_as_error():
+    subinterpreters._initialize(pickle.dumps(CONFIG), ())
+    payload, context = call_args("fail")
+
+    kind, packed = subinterpreters._call("tool_pre_invoke", dumps((payload, ship_context(context))))
+
+    assert kind == "error"
+    assert str(pickle.loads(packed)) == "plugin failed"
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(not interpreters_supported(), reason="needs InterpreterPoolExecutor")
+async def test_hook_runs_in_subinterpreter():
+    offload = InterpreterOffload(CONFIG)
+    await offload.start()
+    payload, context = call_args("tool", text="hello")
+
+    result = await offload.call("tool_pre_invoke", payload, context)
+
+    assert result.modified_payload.args["echoed"] == 5
+    assert context.global_context.state["seen"] == "tool"
+    await offload.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_unavailable_subinterpreters_fail_startup(monkeypatch):
+    monkeypatch.setattr(server, "interpreters_supported", lambda: False)
+    monkeypatch.setattr(server, "plugin_executors", {"WorkerPlugin": "subinterpreter"})
+    manager = SimpleNamespace(config=SimpleNamespace(plugins=[CONFIG], plugin_dirs=[]))
+    # The plugin manager is created by the server's entry point
+    monkeypatch.setattr(server, "manager", manager, raising=False)
+
+    with pytest.raises(ValueError, match="WorkerPlugin.*subinterpreter"):
+        await server.executor_options()
@@ -0,0 +1,53 @@
+"""Unit tests for the per-tool traffic profile."""
+
+# Standard
+from types import SimpleNamespace
+
+# Third-Party
+from prometheus_client import CollectorRegistry, generate_latest
+
+# Local
+import server
+from traffic import TrafficCollector, TrafficProfile
+
+
+def test_profile_stays_bounded():
+    profile = TrafficProfile(top_k=2)
+
+    for _ in range(10):
+        profile.observe("acme", "get_weather", 1000, 0.01)
+    for i in range(10):
+        profile.observe("acme", f"tool{i}", 10, 0.001)
+
+    snapshot = profile.snapshot()
+    assert snapshot["streams"] == 20
+    assert snapshot["calls"][0] == {"tenant": "acme", "tool": "get_weather", "estimate": 10, "max_overestimate": 0}
+    assert snapshot["bytes"][0]["estimate"] == 10_000
+    assert len(snapshot["calls"]) == len(snapshot["latency"]) == 2
+    assert abs(snapshot["latency"]["get_weather"]["p50"] - 0.01) < 0.0002
+
+
+def test_collector_reports_heavy_hitters():
+    profile = TrafficProfile()
+    profile.observe("acme", "get_weather", 1000, 0.01)
+    registry = CollectorRegistry()
+    registry.register(TrafficCollector(profile))
+
+    text = generate_latest(registry).decode()
+
+    assert 'plugins_adapter_top_tool_calls{tenant="acme",tool="get_weather"} 1.0' in text
+    assert 'plugins_adapter_top_tool_bytes{tenant="acme",tool="get_weather"} 1000.0' in text
+    assert 'plugins_adapter_tool_latency_seconds{quantile="0.5",tool="get_weather"}' in text
+
+
+def test_batch_streams_are_split_between_calls(monkeypatch):
+    profile = TrafficProfile()
+    monkeypatch.setattr(server, "traffic_profile", profile)
+    state = server.StreamState()
+    state.tenant, state.body_bytes, state.busy = "acme", 300, 0.02
+    state.calls.calls = {1: SimpleNamespace(tool_name="a"), 2: SimpleNamespace(tool_name="b")}
+
+    server.profile_stream(state)
+
+    assert [(tool, weight) for (_, tool), weight, _ in profile.bytes.top()] == [("a", 150), ("b", 150)]
+    assert abs(profile.latency("a").quantile(0.5) - 0.01) < 0.0002